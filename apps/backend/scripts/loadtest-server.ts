@@ -0,0 +1,49 @@
+import express from "express";
+import cors from "cors";
+import { PrismaClient } from "@prisma/client";
+import systemRoutes from "../src/routes/system";
+import ingestRoutes from "../src/routes/ingest";
+import appointmentRoutes from "../src/routes/appointments";
+import dataHealthRoutes from "../src/routes/dataHealth";
+
+// Load-test entrypoint used by loadtest_api.py --start-backend.
+// Same routes as src/server.ts plus the query routers that are not mounted in
+// production yet, so their latency can be measured under ingest load.
+
+const app = express();
+const prisma = new PrismaClient();
+const PORT = process.env.PORT || 3000;
+
+app.use(cors());
+app.use(express.json());
+
+// Routes
+app.use("/api/system", systemRoutes);
+app.use("/api/ingest", ingestRoutes);
+app.use("/api/appointments", appointmentRoutes);
+app.use("/api/data", dataHealthRoutes);
+
+// Health Checks (mirrors src/server.ts)
+app.get("/api/health", (req, res) => {
+  res.json({ ok: true, ts: Date.now() });
+});
+
+app.get("/api/health/db", async (req, res) => {
+  try {
+    const count = await prisma.appointment.count();
+    const lastImport = await prisma.import.findFirst({ orderBy: { started_at: 'desc' }, select: { id: true, status: true } });
+    res.json({
+      ok: true,
+      appointmentCount: count,
+      latestImportId: lastImport?.id,
+      latestImportStatus: lastImport?.status
+    });
+  } catch (e: any) {
+    res.status(500).json({ ok: false, message: e.message });
+  }
+});
+
+app.listen(PORT, () => {
+  console.log(`Load-test backend running on port ${PORT}`);
+  console.log(`DB URL: ${process.env.DATABASE_URL}`);
+});
@@ -0,0 +1,265 @@
+"""Rolling-window backtest for the appointment forecast parameters.
+
+For every forecast origin the model is re-fitted on the preceding training
+window, the same way forecast_config.json is built: average realized visits per
+open day, dayWeights, monthlyFactors and realizationRate. It then predicts the
+holdout days that follow:
+
+    predicted_completed = base * dayWeight[weekday] * monthlyFactor[month]
+    predicted_total     = predicted_completed / realizationRate   (non-cancelled visits)
+
+All origins of one parameter set are evaluated at once with cumulative-sum
+arrays. Parameter sets (window length, horizon, factor shrinkage, baseline)
+are spread across a process pool. Scores are MAE, MAPE and bias for completed
+and total visits, plus how often the predicted risk_level matches the
+realized one. The existing analysis_result.json is scored against the
+realized days it covers.
+
+Usage:
+    python backtest_forecast.py --csv public/data/appointments.csv --workers 8
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+from extract_forecast_params import apply_status_delta, empty_state, load_state, scan_appointments
+
+# analyze-appointments.js capacity thresholds on predicted_completed
+RISK_HIGH = 35
+RISK_MEDIUM = 25
+RISK_LEVELS = ["low", "medium", "high"]
+
+RECENT_BASELINE_DAYS = 30  # calculateBaseline30Days
+
+_series = None  # per-process copy of the daily arrays, set by _init_worker
+
+
+def parse_list(cast):
+    return lambda value: [cast(v) for v in value.split(',') if v.strip()]
+
+
+def daily_series(days):
+    """Dense calendar arrays (one slot per day) from {date: [valid, realized]} counters."""
+    # Days after the last realized visit are still booked, not observed
+    realized_days = [d for d, (_, r) in days.items() if r > 0]
+    if not realized_days:
+        raise SystemExit("No realized appointment days to backtest")
+    first = date.fromisoformat(min(realized_days))
+    last = date.fromisoformat(max(realized_days))
+    length = (last - first).days + 1
+    valid = np.zeros(length, dtype=np.int64)
+    realized = np.zeros(length, dtype=np.int64)
+    for day, (v, r) in days.items():
+        i = (date.fromisoformat(day) - first).days
+        if 0 <= i < length:
+            valid[i], realized[i] = v, r
+
+    calendar = [first + timedelta(days=i) for i in range(length)]
+    weekday = np.array([(d.weekday() + 1) % 7 for d in calendar])  # Sunday = 0, as in dayWeights
+    month = np.array([d.month for d in calendar])
+    is_open = realized > 0
+
+    def cumulative(values, buckets, n):
+        table = np.zeros((length + 1, n))
+        np.add.at(table[1:], (np.arange(length), buckets), values)
+        return np.cumsum(table, axis=0)
+
+    return {
+        'first': first,
+        'valid': valid,
+        'realized': realized,
+        'weekday': weekday,
+        'month': month,
+        'is_open': is_open,
+        'cum_valid': np.concatenate([[0], np.cumsum(valid)]),
+        'cum_realized': np.concatenate([[0], np.cumsum(realized)]),
+        'cum_open': np.concatenate([[0], np.cumsum(is_open)]),
+        'cum_wd_sum': cumulative(realized, weekday, 7),
+        'cum_wd_days': cumulative(is_open, weekday, 7),
+        'cum_month_sum': cumulative(realized, month, 13),
+        'cum_month_days': cumulative(is_open, month, 13),
+    }
+
+
+def risk_level(completed, high=RISK_HIGH, medium=RISK_MEDIUM):
+    return np.where(completed >= high, 2, np.where(completed >= medium, 1, 0))
+
+
+def _scores(pred, actual):
+    err = pred - actual
+    nonzero = actual > 0
+    return {
+        'mae': round(float(np.abs(err).mean()), 3),
+        'mape': round(float((np.abs(err[nonzero]) / actual[nonzero]).mean()), 4) if nonzero.any() else None,
+        'bias': round(float(err.mean()), 3),
+    }
+
+
+def fit_windows(series, origins, window, alpha, baseline):
+    """Fit base/factors/rate on [origin - window, origin) for every origin at once."""
+    lo, hi = origins - window, origins
+
+    def span(name):
+        return series[name][hi] - series[name][lo]
+
+    open_days = np.maximum(span('cum_open'), 1)
+    realized = span('cum_realized')
+    base = realized / open_days
+    rate = np.where(span('cum_valid') > 0, realized / np.maximum(span('cum_valid'), 1), 1.0)
+
+    # A window with nothing realized has no base to divide by; its factors stay neutral (1.0)
+    has_base = (base > 0)[:, None]
+    safe_base = np.where(base > 0, base, 1.0)[:, None]
+    wd_days = span('cum_wd_days')
+    day_weights = np.where((wd_days > 0) & has_base, span('cum_wd_sum') / np.maximum(wd_days, 1) / safe_base, 1.0)
+    month_days = span('cum_month_days')
+    month_factors = np.where((month_days > 0) & has_base,
+                             span('cum_month_sum') / np.maximum(month_days, 1) / safe_base, 1.0)
+
+    # Shrink toward 1.0 (alpha = 1 keeps the fitted factors, 0 ignores them);
+    # weekdays with no open day in the window stay closed
+    day_weights = np.where(wd_days > 0, 1 + alpha * (day_weights - 1), 0.0)
+    month_factors = 1 + alpha * (month_factors - 1)
+
+    if baseline == 'recent30':
+        recent_lo = np.maximum(hi - RECENT_BASELINE_DAYS, lo)
+        recent_open = series['cum_open'][hi] - series['cum_open'][recent_lo]
+        recent = (series['cum_realized'][hi] - series['cum_realized'][recent_lo]) / np.maximum(recent_open, 1)
+        base = np.where(recent_open > 0, recent, base)
+    return base, day_weights, month_factors, rate
+
+
+def evaluate(params, series=None, step=1, risk_high=RISK_HIGH, risk_medium=RISK_MEDIUM):
+    """Score one parameter set over every rolling origin."""
+    series = series if series is not None else _series
+    window, horizon, alpha, baseline = params
+    length = len(series['realized'])
+    origins = np.arange(window, length - horizon + 1, step)
+    if not len(origins):
+        return None
+
+    base, day_weights, month_factors, rate = fit_windows(series, origins, window, alpha, baseline)
+    holdout = origins[:, None] + np.arange(horizon)
+    rows = np.arange(len(origins))[:, None]
+    pred_completed = (base[:, None] * day_weights[rows, series['weekday'][holdout]]
+                      * month_factors[rows, series['month'][holdout]])
+    pred_total = pred_completed / np.maximum(rate[:, None], 1e-9)
+
+    actual_completed = series['realized'][holdout]
+    actual_total = series['valid'][holdout]
+
+    hits = risk_level(pred_completed, risk_high, risk_medium) == risk_level(actual_completed, risk_high, risk_medium)
+    return {
+        'window_days': window,
+        'horizon_days': horizon,
+        'alpha': alpha,
+        'baseline': baseline,
+        'origins': int(len(origins)),
+        'completed': _scores(pred_completed, actual_completed),
+        'total': _scores(pred_total, actual_total),
+        'risk_hit_rate': round(float(hits.mean()), 4),
+    }
+
+
+def _init_worker(series):
+    global _series
+    _series = series
+
+
+def _evaluate_job(job):
+    params, step, risk_high, risk_medium = job
+    return evaluate(params, step=step, risk_high=risk_high, risk_medium=risk_medium)
+
+
+def score_analysis_result(path, series, risk_high=RISK_HIGH, risk_medium=RISK_MEDIUM):
+    """Score analysis_result.json against the days of it that have been realized."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        predictions = json.load(f)
+
+    first = series['first']
+    length = len(series['realized'])
+    matched = [(p, (date.fromisoformat(p['date']) - first).days) for p in predictions]
+    matched = [(p, i) for p, i in matched if 0 <= i < length and series['is_open'][i]]
+    if not matched:
+        return {'days_scored': 0, 'days_predicted': len(predictions)}
+
+    idx = np.array([i for _, i in matched])
+    pred_completed = np.array([p['predicted_completed'] for p, _ in matched], dtype=float)
+    pred_total = np.array([p['predicted_total'] for p, _ in matched], dtype=float)
+    actual_completed = series['realized'][idx]
+    level = {name: i for i, name in enumerate(RISK_LEVELS)}
+    pred_risk = np.array([level.get(p['risk_level'], 0) for p, _ in matched])
+
+    return {
+        'days_predicted': len(predictions),
+        'days_scored': len(matched),
+        'completed': _scores(pred_completed, actual_completed),
+        'total': _scores(pred_total, series['valid'][idx]),
+        'risk_hit_rate': round(float((pred_risk == risk_level(actual_completed, risk_high, risk_medium)).mean()), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest forecast parameters over rolling windows.")
+    parser.add_argument('--csv', default='public/data/appointments.csv')
+    parser.add_argument('--state', default='', help="Reuse an extract_forecast_params.py checkpoint")
+    parser.add_argument('--analysis', default='analysis_result.json')
+    parser.add_argument('--windows', type=parse_list(int), default=[28, 56, 91, 182, 365],
+                        help="Training window lengths in days")
+    parser.add_argument('--horizons', type=parse_list(int), default=[7, 14, 30])
+    parser.add_argument('--alphas', type=parse_list(float), default=[0.0, 0.25, 0.5, 0.75, 1.0],
+                        help="Shrinkage of dayWeights/monthlyFactors toward 1.0")
+    parser.add_argument('--baselines', type=parse_list(str), default=['window', 'recent30'])
+    parser.add_argument('--step', type=int, default=1, help="Days between forecast origins")
+    parser.add_argument('--risk-high', type=float, default=RISK_HIGH)
+    parser.add_argument('--risk-medium', type=float, default=RISK_MEDIUM)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--out', default='backtest_result.json')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    state = load_state(args.state) if args.state else empty_state()
+    scan_appointments(args.csv, state)
+    apply_status_delta(os.path.join(os.path.dirname(args.csv), "appointments_status_delta.csv"), state)
+    series = daily_series(state['days'])
+
+    grid = list(itertools.product(args.windows, args.horizons, args.alphas, args.baselines))
+    jobs = [(params, args.step, args.risk_high, args.risk_medium) for params in grid]
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(series,)) as pool:
+        results = [r for r in pool.map(_evaluate_job, jobs, chunksize=max(1, len(jobs) // 64)) if r]
+    results.sort(key=lambda r: (r['horizon_days'], r['completed']['mae']))
+
+    best = {}
+    for r in results:
+        best.setdefault(str(r['horizon_days']), r)
+
+    report = {
+        'history': {'first_day': series['first'].isoformat(), 'days': len(series['realized'])},
+        'grid_size': len(grid),
+        'windows_evaluated': sum(r['origins'] for r in results),
+        'best_by_horizon': best,
+        'analysis_result': score_analysis_result(args.analysis, series, args.risk_high, args.risk_medium),
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    elapsed = time.perf_counter() - t0
+    print(f"Evaluated {len(grid)} parameter sets / {report['windows_evaluated']:,} windows in {elapsed:.2f}s")
+    for horizon, r in best.items():
+        print(f"  {horizon:>3}d horizon: window={r['window_days']} alpha={r['alpha']} baseline={r['baseline']} "
+              f"MAE={r['completed']['mae']} MAPE={r['completed']['mape']} risk hit={r['risk_hit_rate']}")
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,297 @@
+"""Benchmark the Python data pipeline at growing fixture sizes.
+
+For each --sizes entry, a scale-mode fixture is generated with generate_data.py
+and then run through the same stages as the real pipeline:
+
+    generate   generate_data.py --rows N --no-legacy
+    validate   validate_data.py on the generated appointments.csv, with the
+               public/data reference tables (scale-mode names are not in
+               staff.csv, so this exercises the full error and quarantine path)
+    extract    extract_forecast_params.py --full into a scratch ai_params.json
+    images     optimize_images.py --force on a scratch copy of src/assets
+               (run once, not per size; "rows" are image masters)
+
+Every stage runs as its own subprocess. Its wall time is measured, and its
+peak RSS is read from the rusage that os.wait4 returns. On Linux that is the
+largest process in the stage's process tree, pool workers included. With
+--repeat the fastest run is kept. Results go to benchmark_result.json with the
+git commit, the Python version and the CPU count. They also include a scaling
+exponent per stage between consecutive sizes: log(time ratio) / log(rows
+ratio), where ~1.0 is linear and clearly above 1 means the stage is
+super-linear.
+
+--baseline compares the run with an earlier result file. A stage regresses
+when its time or peak RSS grows by more than --threshold (and time by more
+than --min-delta seconds, so start-up noise on tiny fixtures does not count).
+Any regression makes the exit status 1. --results compares an existing file
+without running anything.
+
+Usage:
+    python benchmark_pipeline.py
+    python benchmark_pipeline.py --sizes 10k,100k,1m --stages generate,validate,extract
+    python benchmark_pipeline.py --sizes 100k --repeat 3 --baseline benchmark_baseline.json --threshold 0.2
+    python benchmark_pipeline.py --results benchmark_result.json --baseline benchmark_baseline.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = ("generate", "validate", "extract", "images")
+DEFAULT_SIZES = "10k,100k,1m,10m"
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_size(value):
+    value = value.strip().lower().replace('_', '')
+    scale = SUFFIXES.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+def run_stage(cmd, log_path):
+    """Run one stage; returns (seconds, peak RSS in MB, exit code)."""
+    with open(log_path, 'ab') as log:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=HERE, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - t0
+    # Tell Popen the child is already reaped
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KB on Linux and bytes on macOS
+    rss_kb = usage.ru_maxrss / 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    return seconds, rss_kb / 1024, proc.returncode
+
+
+def count_lines(path):
+    """Data rows in a CSV (newlines minus the header)."""
+    count = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            count += block.count(b'\n')
+    return max(count - 1, 0)
+
+
+def stage_commands(stage, size, fixture, args):
+    appointments = os.path.join(fixture, 'appointments.csv')
+    py = sys.executable
+    if stage == 'generate':
+        return [py, 'generate_data.py', '--rows', str(size), '--out', fixture,
+                '--seed', str(args.seed), '--no-legacy']
+    if stage == 'validate':
+        return [py, 'validate_data.py', '--src', fixture, '--refs', args.refs,
+                '--out', os.path.join(fixture, 'validation'), '--files', 'appointments.csv', '--fail-on', 'never']
+    if stage == 'extract':
+        return [py, 'extract_forecast_params.py', '--csv', appointments, '--state', '',
+                '--ai-params', os.path.join(fixture, 'ai_params.json'),
+                '--forecast-config', os.path.join(fixture, 'forecast_config.json'), '--full']
+    raise ValueError(stage)
+
+
+def measure(cmd, repeat, log_path, before=None):
+    """Best of `repeat` runs of cmd; `before` resets state between runs."""
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        seconds, rss_mb, code = run_stage(cmd, log_path)
+        if code != 0:
+            return {'seconds': round(seconds, 3), 'peak_rss_mb': round(rss_mb, 1), 'exit_code': code}
+        if best is None or seconds < best['seconds']:
+            best = {'seconds': seconds, 'peak_rss_mb': rss_mb, 'exit_code': 0}
+    return {'seconds': round(best['seconds'], 3), 'peak_rss_mb': round(best['peak_rss_mb'], 1), 'exit_code': 0}
+
+
+def result_row(stage, rows, timing):
+    seconds = timing['seconds']
+    return {'stage': stage, 'rows': rows, **timing,
+            'rows_per_s': round(rows / seconds, 2) if seconds > 0 and timing['exit_code'] == 0 else None}
+
+
+def bench_size(size, stages, args, work_dir, log_path):
+    fixture = os.path.join(work_dir, f"rows_{size}")
+    results = []
+
+    def fresh_fixture():
+        shutil.rmtree(fixture, ignore_errors=True)
+
+    # The fixture is always generated; it is only timed when "generate" is selected
+    timing = measure(stage_commands('generate', size, fixture, args), args.repeat if 'generate' in stages else 1,
+                     log_path, before=fresh_fixture)
+    if timing['exit_code'] != 0:
+        print(f"  generate failed for {size:,} rows (exit {timing['exit_code']}); see {log_path}")
+        return [result_row('generate', size, timing)]
+    rows = count_lines(os.path.join(fixture, 'appointments.csv'))
+    if 'generate' in stages:
+        results.append(result_row('generate', rows, timing))
+
+    for stage in ('validate', 'extract'):
+        if stage in stages:
+            results.append(result_row(stage, rows, measure(stage_commands(stage, size, fixture, args),
+                                                            args.repeat, log_path)))
+    if not args.keep:
+        fresh_fixture()
+    return results
+
+
+def bench_images(args, work_dir, log_path):
+    assets = os.path.join(work_dir, 'assets')
+    responsive = os.path.join(work_dir, 'responsive')
+    shutil.copytree(args.assets, assets)
+    images = sum(1 for name in os.listdir(assets) if name.lower().endswith(IMAGE_EXTENSIONS))
+    cmd = [sys.executable, 'optimize_images.py', '--assets', assets, '--responsive-dir', responsive, '--force']
+    return result_row('images', images, measure(cmd, args.repeat, log_path))
+
+
+def scaling(results):
+    """Per stage, the time exponent between each pair of consecutive sizes."""
+    curves = {}
+    for stage in STAGES:
+        points = sorted((r['rows'], r['seconds']) for r in results
+                        if r['stage'] == stage and r['exit_code'] == 0 and r['rows'] > 0 and r['seconds'] > 0)
+        steps = []
+        for (n1, t1), (n2, t2) in zip(points, points[1:]):
+            if n2 > n1:
+                steps.append({'from_rows': n1, 'to_rows': n2,
+                              'exponent': round(math.log(t2 / t1) / math.log(n2 / n1), 3)})
+        if steps:
+            curves[stage] = steps
+    return curves
+
+
+def compare(current, baseline, threshold, min_delta):
+    """Rows of (stage, rows, metric, base, new, change) that regressed past the threshold."""
+    base_index = {(r['stage'], r['rows']): r for r in baseline['results'] if r['exit_code'] == 0}
+    regressions, matched = [], 0
+    for r in current['results']:
+        base = base_index.get((r['stage'], r['rows']))
+        if base is None:
+            continue
+        matched += 1
+        if r['exit_code'] != 0:
+            regressions.append((r['stage'], r['rows'], 'exit_code', 0, r['exit_code'], None))
+            continue
+        if r['seconds'] > base['seconds'] * (1 + threshold) and r['seconds'] - base['seconds'] > min_delta:
+            regressions.append((r['stage'], r['rows'], 'seconds', base['seconds'], r['seconds'],
+                                r['seconds'] / base['seconds'] - 1))
+        if base['peak_rss_mb'] and r['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append((r['stage'], r['rows'], 'peak_rss_mb', base['peak_rss_mb'], r['peak_rss_mb'],
+                                r['peak_rss_mb'] / base['peak_rss_mb'] - 1))
+    return regressions, matched
+
+
+def print_results(report):
+    print(f"{'stage':<9} {'rows':>12} {'seconds':>9} {'rows/s':>12} {'peak RSS':>10}")
+    for r in report['results']:
+        rate = r['rows_per_s']
+        if rate is None:
+            rate = f"exit {r['exit_code']}"
+        else:
+            rate = f"{rate:,.2f}" if rate < 100 else f"{rate:,.0f}"
+        print(f"{r['stage']:<9} {r['rows']:>12,} {r['seconds']:>9.2f} {rate:>12} {r['peak_rss_mb']:>8.1f}MB")
+    for stage, steps in report['scaling'].items():
+        curve = ", ".join(f"{s['from_rows']:,}->{s['to_rows']:,}: {s['exponent']:.2f}" for s in steps)
+        print(f"  {stage} scaling exponent (1.0 = linear): {curve}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Python data pipeline at growing fixture sizes.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Comma-separated row counts (k/m suffixes allowed)")
+    parser.add_argument('--stages', default=",".join(STAGES), help=f"Subset of {','.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per stage; the fastest is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--refs', default='public/data', help="Reference tables for the validate stage")
+    parser.add_argument('--assets', default=os.path.join('src', 'assets'), help="Image masters for the images stage")
+    parser.add_argument('--work-dir', help="Where fixtures are generated (default: a temporary directory)")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated fixtures")
+    parser.add_argument('--out', default='benchmark_result.json')
+    parser.add_argument('--results', help="Compare this existing result file instead of running")
+    parser.add_argument('--baseline', help="Earlier result file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed relative growth (0.2 = 20%%)")
+    parser.add_argument('--min-delta', type=float, default=0.25,
+                        help="Ignore time regressions smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        report = load_results(args.results)
+    else:
+        stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+        unknown = sorted(set(stages) - set(STAGES))
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(unknown)}")
+        sizes = sorted({parse_size(s) for s in args.sizes.split(',') if s.strip()})
+        if args.repeat < 1:
+            parser.error("--repeat must be at least 1")
+        args.refs, args.assets = os.path.abspath(args.refs), os.path.abspath(args.assets)
+
+        work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix='pipeline-bench-')
+        os.makedirs(work_dir, exist_ok=True)
+        log_path = os.path.join(work_dir, 'benchmark.log')
+        t0 = time.perf_counter()
+        results = []
+        try:
+            if any(s in stages for s in ('generate', 'validate', 'extract')):
+                for size in sizes:
+                    print(f"Benchmarking {size:,} rows ...")
+                    results += bench_size(size, stages, args, work_dir, log_path)
+            if 'images' in stages:
+                print("Benchmarking image optimization ...")
+                results.append(bench_images(args, work_dir, log_path))
+        finally:
+            if not args.keep and not args.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = {
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'seconds': round(time.perf_counter() - t0, 2),
+            'results': results,
+            'scaling': scaling(results),
+        }
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}" + (f" (log: {log_path})" if args.keep or args.work_dir else ""))
+
+    print_results(report)
+    failed = any(r['exit_code'] != 0 for r in report['results'])
+    if not args.baseline:
+        return 1 if failed else 0
+
+    baseline = load_results(args.baseline)
+    regressions, matched = compare(report, baseline, args.threshold, args.min_delta)
+    print(f"Compared {matched} stage runs with {args.baseline} (commit {str(baseline.get('commit'))[:10]}), "
+          f"threshold {args.threshold:.0%}")
+    for stage, rows, metric, base, new, change in regressions:
+        delta = f" (+{change:.0%})" if change is not None else ""
+        print(f"  REGRESSION {stage} @ {rows:,} rows: {metric} {base:.6g} -> {new:.6g}{delta}")
+    if not matched:
+        print("  No matching (stage, rows) pairs; nothing compared")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,340 @@
+"""Build typed columnar snapshots of public/data/*.csv for fast dashboard cold start.
+
+Each CSV becomes one little-endian .bin file that the browser can map straight
+into typed arrays, with no text parsing:
+
+    magic     b"CSNP"
+    uint32    format version
+    uint32    header length in bytes
+    header    UTF-8 JSON (see below), zero-padded so column data starts 8-byte aligned
+    columns   one buffer per column, each starting on an 8-byte boundary
+
+Header JSON:
+    {"source": "staff_workload.csv", "sha256": "<source hash>", "rows": 15010,
+     "columns": [{"name": "staff_name", "encoding": "dict", "dtype": "uint8",
+                  "offset": 0, "length": 15010, "dictionary": ["陳醫師", ...]}, ...]}
+
+`offset` is relative to the start of column data and `length` counts elements.
+Encodings:
+    int    integers stored as-is in the narrowest dtype that fits
+    date   "YYYY-MM-DD" as day offsets from `base` (an ISO date in the column entry)
+    float  float64
+    dict   codes into `dictionary` (strings with few distinct values: names, roles, statuses)
+    utf8   `offsets` (uint32, rows + 1 entries, at `offsets_offset`) into a UTF-8 byte blob at `offset`
+
+A snapshot is only rebuilt when the SHA-256 of its source CSV changes.
+
+Usage:
+    python build_data_snapshot.py                      # public/data -> public/data/snapshots
+    python build_data_snapshot.py --src build/fixtures --out build/snapshots --force
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import struct
+import time
+from datetime import date
+
+import numpy as np
+
+MAGIC = b"CSNP"
+VERSION = 1
+ALIGN = 8
+
+# Columns with more distinct values than this are stored as utf8 instead of dict
+MAX_DICTIONARY = 65_536
+
+# Zero-padded values such as "007" are ids, not numbers: encoding them as int/float would drop the padding
+INT_RE = re.compile(r"^(0|-?[1-9]\d{0,17})$")
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+FLOAT_RE = re.compile(r"^-?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][-+]?\d+)?$")
+
+INT_DTYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64]
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def iter_rows(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        yield header
+        for row in reader:
+            if row:
+                yield [v.strip() for v in row]
+
+
+def is_date(value):
+    """True for a real calendar date in "YYYY-MM-DD" form (2026-02-30 is not)."""
+    if not DATE_RE.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+class ColumnProfile:
+    """First-pass statistics that decide a column's encoding."""
+
+    def __init__(self, name):
+        self.name = name
+        self.is_int = self.is_date = self.is_float = True
+        self.min = self.max = None
+        self.values = {}  # value -> code, until it grows past MAX_DICTIONARY
+
+    def add(self, value):
+        if self.is_int and not INT_RE.match(value):
+            self.is_int = False
+        if self.is_date and not is_date(value):
+            self.is_date = False
+        if self.is_float and not FLOAT_RE.match(value):
+            self.is_float = False
+        if self.values is not None and value not in self.values:
+            if len(self.values) >= MAX_DICTIONARY:
+                self.values = None
+            else:
+                self.values[value] = len(self.values)
+        if self.is_int:
+            v = int(value)
+            self.min = v if self.min is None else min(self.min, v)
+            self.max = v if self.max is None else max(self.max, v)
+        elif self.is_date:
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def encoding(self, rows):
+        if rows and self.is_int:
+            return 'int'
+        if rows and self.is_date:
+            return 'date'
+        # Low-cardinality text (names, roles, statuses) compresses best as a dictionary
+        if self.values is not None and len(self.values) <= max(256, rows // 2):
+            return 'dict'
+        if rows and self.is_float:
+            return 'float'
+        return 'utf8'
+
+
+def narrowest_dtype(lo, hi):
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+class ColumnWriter:
+    """Second pass: fills a typed array (or utf8 blob) for one column."""
+
+    def __init__(self, profile, rows):
+        self.meta = {'name': profile.name, 'encoding': profile.encoding(rows)}
+        self.index = 0
+        enc = self.meta['encoding']
+        if enc == 'int':
+            self.data = np.empty(rows, dtype=narrowest_dtype(profile.min or 0, profile.max or 0))
+        elif enc == 'date':
+            self.base = date.fromisoformat(profile.min).toordinal()
+            span = date.fromisoformat(profile.max).toordinal() - self.base
+            self.data = np.empty(rows, dtype=narrowest_dtype(0, span))
+            self.meta['base'] = profile.min
+        elif enc == 'dict':
+            self.codes = profile.values
+            self.data = np.empty(rows, dtype=narrowest_dtype(0, max(0, len(self.codes) - 1)))
+            self.meta['dictionary'] = list(self.codes)
+        elif enc == 'float':
+            self.data = np.empty(rows, dtype=np.float64)
+        else:
+            self.blob = bytearray()
+            self.offsets = np.empty(rows + 1, dtype=np.uint32)
+            self.offsets[0] = 0
+        self.meta['dtype'] = 'uint8' if enc == 'utf8' else self.data.dtype.name
+
+    def add(self, value):
+        enc = self.meta['encoding']
+        i = self.index
+        if enc == 'int':
+            self.data[i] = int(value)
+        elif enc == 'date':
+            self.data[i] = date.fromisoformat(value).toordinal() - self.base
+        elif enc == 'dict':
+            self.data[i] = self.codes[value]
+        elif enc == 'float':
+            self.data[i] = float(value)
+        else:
+            self.blob += value.encode('utf-8')
+            self.offsets[i + 1] = len(self.blob)
+        self.index += 1
+
+    def buffers(self):
+        """[(meta key for the offset, bytes)] in write order."""
+        if self.meta['encoding'] == 'utf8':
+            self.meta['length'] = len(self.blob)
+            return [('offsets_offset', self.offsets.astype('<u4').tobytes()), ('offset', bytes(self.blob))]
+        self.meta['length'] = len(self.data)
+        return [('offset', self.data.astype(self.data.dtype.newbyteorder('<')).tobytes())]
+
+
+class ArrayColumn:
+    """Column writer for values already held in a numpy array.
+
+    Integer arrays are stored as `int`, floats as `float`, datetime64[D] as
+    `date`, and strings as `dict` or `utf8` by the same cardinality rule as
+    ColumnProfile. This skips the per-value text parsing of ColumnWriter.
+    """
+
+    def __init__(self, name, values):
+        values = np.asarray(values)
+        rows = len(values)
+        self.meta = {'name': name}
+        if values.dtype.kind == 'M':
+            days = values.astype('datetime64[D]').astype(np.int64)
+            base = int(days.min()) if rows else 0
+            self.data = (days - base).astype(narrowest_dtype(0, int(days.max()) - base if rows else 0))
+            self.meta.update(encoding='date', base=str(np.datetime64(base, 'D')))
+        elif values.dtype.kind in 'iub':
+            values = values.astype(np.int64)
+            self.data = values.astype(narrowest_dtype(int(values.min()), int(values.max())) if rows else np.uint8)
+            self.meta['encoding'] = 'int'
+        elif values.dtype.kind == 'f':
+            self.data = values.astype(np.float64)
+            self.meta['encoding'] = 'float'
+        else:
+            dictionary, codes = np.unique(values.astype(str), return_inverse=True)
+            if len(dictionary) <= max(256, rows // 2) and len(dictionary) <= MAX_DICTIONARY:
+                self.data = codes.astype(narrowest_dtype(0, max(0, len(dictionary) - 1)))
+                self.meta.update(encoding='dict', dictionary=dictionary.tolist())
+            else:
+                encoded = [v.encode('utf-8') for v in values.astype(str).tolist()]
+                self.blob = b"".join(encoded)
+                self.offsets = np.zeros(rows + 1, dtype=np.uint32)
+                np.cumsum([len(v) for v in encoded], out=self.offsets[1:])
+                self.meta['encoding'] = 'utf8'
+        self.meta['dtype'] = 'uint8' if self.meta['encoding'] == 'utf8' else self.data.dtype.name
+
+    def buffers(self):
+        if self.meta['encoding'] == 'utf8':
+            self.meta['length'] = len(self.blob)
+            return [('offsets_offset', self.offsets.astype('<u4').tobytes()), ('offset', self.blob)]
+        self.meta['length'] = len(self.data)
+        return [('offset', self.data.astype(self.data.dtype.newbyteorder('<')).tobytes())]
+
+
+def _pad(n):
+    return (-n) % ALIGN
+
+
+def read_snapshot_header(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        prefix = f.read(12)
+        if len(prefix) < 12 or prefix[:4] != MAGIC:
+            return None
+        version, header_len = struct.unpack('<II', prefix[4:])
+        if version != VERSION:
+            return None
+        return json.loads(f.read(header_len).rstrip(b"\0").decode('utf-8'))
+
+
+def encode_rows(header, rows):
+    """Profile and encode rows into column writers.
+
+    `rows` is a callable returning a fresh iterator of value lists; it is
+    iterated twice (profile, then encode).
+    """
+    profiles = [ColumnProfile(name) for name in header]
+    count = 0
+    for row in rows():
+        for profile, value in zip(profiles, row + [""] * (len(profiles) - len(row))):
+            profile.add(value)
+        count += 1
+
+    writers = [ColumnWriter(p, count) for p in profiles]
+    for row in rows():
+        for writer, value in zip(writers, row + [""] * (len(writers) - len(row))):
+            writer.add(value)
+    return writers, count
+
+
+def write_snapshot(out_path, meta, writers):
+    """Lay out the column buffers and write a CSNP file; `meta` gains the column entries."""
+    chunks, offset = [], 0
+    for writer in writers:
+        for key, data in writer.buffers():
+            writer.meta[key] = offset
+            chunks.append(data + b"\0" * _pad(len(data)))
+            offset += len(data) + _pad(len(data))
+
+    meta['columns'] = [w.meta for w in writers]
+    header_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header_bytes += b"\0" * _pad(12 + len(header_bytes))
+
+    tmp = out_path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack('<II', VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, out_path)
+    return meta
+
+
+def build_snapshot(csv_path, out_path, digest=None):
+    digest = digest or file_sha256(csv_path)
+    header = next(iter_rows(csv_path))
+
+    def data_rows():
+        rows_iter = iter_rows(csv_path)
+        next(rows_iter)
+        return rows_iter
+
+    writers, rows = encode_rows(header, data_rows)
+    meta = {'source': os.path.basename(csv_path), 'sha256': digest, 'rows': rows}
+    return write_snapshot(out_path, meta, writers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build typed columnar snapshots of the dashboard CSVs.")
+    parser.add_argument('--src', default='public/data')
+    parser.add_argument('--out', default='public/data/snapshots')
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the source hash is unchanged")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest = {}
+    for csv_path in sorted(glob.glob(os.path.join(args.src, '*.csv'))):
+        name = os.path.splitext(os.path.basename(csv_path))[0]
+        out_path = os.path.join(args.out, name + '.bin')
+        digest = file_sha256(csv_path)
+        existing = read_snapshot_header(out_path)
+
+        t0 = time.perf_counter()
+        if not args.force and existing and existing.get('sha256') == digest:
+            meta, status = existing, "unchanged"
+        else:
+            meta, status = build_snapshot(csv_path, out_path, digest), "built"
+        csv_size, bin_size = os.path.getsize(csv_path), os.path.getsize(out_path)
+        manifest[name] = {'file': name + '.bin', 'source': meta['source'], 'sha256': digest,
+                          'rows': meta['rows'], 'bytes': bin_size}
+        print(f"{status:>9}: {name:<24} {meta['rows']:>9,} rows  {csv_size / 1024:>9.1f} KB -> "
+              f"{bin_size / 1024:>9.1f} KB  ({time.perf_counter() - t0:.2f}s)")
+
+    with open(os.path.join(args.out, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,336 @@
+"""Row-level delta builder for append-mode appointment ingest.
+
+Keeps a compact index of the last shipped export: appointment_id -> 64-bit
+row hash, stored as sorted numpy arrays in one .npz file (about 26 bytes per
+row including the ids). A new export is streamed in chunks. Each chunk's id
+hashes are looked up in the index with one vectorized searchsorted, and every
+row is classified as inserted, changed or unchanged. Only inserted and
+changed rows are written, using the export's own header, ready for:
+
+    curl -F file=@delta/appointments_delta.csv "http://localhost:3001/api/ingest/appointments?mode=append"
+
+Append mode deletes existing appointment_ids before inserting, so changed
+rows replace their old versions. Append mode cannot delete, so rows that
+vanished from the export are listed in appointments_delta.deleted.csv. The
+delta is split into parts that stay under the backend's 10 MB upload limit.
+
+Building a delta never moves the index. The new snapshot is saved next to it
+as a pending snapshot (`appointments.pending.npz`), together with a hash of
+the index it was diffed against. Once the upload has succeeded, `--commit`
+promotes it to be the index. While a delta is pending, further builds refuse
+to run, so an unshipped delta is never overwritten or lost. Use `--discard` to
+drop a pending delta and its files instead. --dry-run only reports the counts
+and writes nothing. The first run against a missing index ships everything.
+
+Usage:
+    python build_ingest_delta.py                      # build delta/ and a pending snapshot
+    curl -F file=@delta/appointments_delta.csv "http://localhost:3001/api/ingest/appointments?mode=append"
+    python build_ingest_delta.py --commit             # after the upload succeeded
+    python build_ingest_delta.py --csv exports/appointments.csv --index .ingest_index/appointments.npz --dry-run
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+ID_COLUMN = "appointment_id"
+CHUNK_ROWS = 100_000
+# multer limit in apps/backend/src/routes/ingest.ts is 10 MB; keep headroom for the multipart envelope
+MAX_PART_BYTES = 9 * 1024 * 1024
+INDEX_VERSION = 1
+DELTA_STEM = "appointments_delta"
+
+INSERTED, CHANGED, UNCHANGED = 0, 1, 2
+
+
+def hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def row_hash(values):
+    # Unit separator cannot appear in the CSV values, so field boundaries are unambiguous
+    return hash64("\x1f".join(v.strip() for v in values).encode('utf-8'))
+
+
+def empty_index():
+    return {'header': None, 'keys': np.zeros(0, dtype=np.uint64), 'hashes': np.zeros(0, dtype=np.uint64),
+            'ids': np.zeros(0, dtype='S1')}
+
+
+def load_index(path):
+    if not path or not os.path.exists(path):
+        return empty_index()
+    with np.load(path) as data:
+        if int(data['version']) != INDEX_VERSION:
+            return empty_index()
+        return {'header': json.loads(bytes(data['header']).decode('utf-8')), 'keys': data['keys'],
+                'hashes': data['hashes'], 'ids': data['ids']}
+
+
+def save_index(path, header, keys, hashes, ids, base=""):
+    """Write a snapshot; `base` is the digest of the index a pending snapshot was diffed against."""
+    order = np.argsort(keys, kind='stable')
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, version=np.array(INDEX_VERSION), header=np.frombuffer(json.dumps(header).encode('utf-8'), np.uint8),
+             keys=keys[order], hashes=hashes[order], ids=ids[order], base=np.array(base))
+    os.replace(tmp, path)
+
+
+def pending_path(index_path):
+    root, _ = os.path.splitext(index_path)
+    return root + ".pending.npz"
+
+
+def index_digest(path):
+    """SHA-256 of the index file, or "" when there is none yet."""
+    if not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def commit_pending(index_path):
+    """Promote the pending snapshot to be the index; returns an error message or None."""
+    pending = pending_path(index_path)
+    if not os.path.exists(pending):
+        return f"No pending delta for {index_path}; nothing to commit"
+    with np.load(pending) as data:
+        base = str(data['base'])
+    if base != index_digest(index_path):
+        return f"{index_path} changed since the pending delta was built; --discard it and build again"
+    os.replace(pending, index_path)
+    return None
+
+
+def classify(index, keys, hashes, header_changed=False):
+    """Status per row plus the positions of matched index entries (-1 if new)."""
+    old_keys = index['keys']
+    if not len(old_keys):
+        return np.full(len(keys), INSERTED), np.full(len(keys), -1)
+    pos = np.minimum(np.searchsorted(old_keys, keys), len(old_keys) - 1)
+    found = old_keys[pos] == keys
+    same = ~header_changed & (index['hashes'][pos] == hashes)
+    status = np.where(~found, INSERTED, np.where(same, UNCHANGED, CHANGED))
+    return status, np.where(found, pos, -1)
+
+
+class PartWriter:
+    """Writes CSV rows into numbered parts that each stay under max_bytes."""
+
+    def __init__(self, out_dir, stem, header, max_bytes):
+        self.out_dir, self.stem, self.max_bytes = out_dir, stem, max_bytes
+        self.header_bytes = self._encode(header)
+        self.paths = []
+        self.handle = None
+        self.size = 0
+
+    @staticmethod
+    def _encode(row):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow(row)
+        return buffer.getvalue().encode('utf-8')
+
+    def _open(self):
+        if self.handle:
+            self.handle.close()
+        path = os.path.join(self.out_dir, f"{self.stem}.part{len(self.paths) + 1:03d}.csv")
+        self.paths.append(path)
+        self.handle = open(path, 'wb')
+        self.handle.write(self.header_bytes)
+        self.size = len(self.header_bytes)
+
+    def write(self, row):
+        data = self._encode(row)
+        if self.handle is None or (self.size + len(data) > self.max_bytes and self.size > len(self.header_bytes)):
+            self._open()
+        self.handle.write(data)
+        self.size += len(data)
+
+    def close(self):
+        if self.handle:
+            self.handle.close()
+        # A single part keeps the plain name
+        if len(self.paths) == 1:
+            single = os.path.join(self.out_dir, f"{self.stem}.csv")
+            os.replace(self.paths[0], single)
+            self.paths = [single]
+        return self.paths
+
+
+def clear_outputs(out_dir, stem):
+    for name in os.listdir(out_dir):
+        if name.startswith(stem + ".") and name.endswith(".csv"):
+            os.remove(os.path.join(out_dir, name))
+
+
+def build_delta(csv_path, index, out_dir, stem=DELTA_STEM, chunk_rows=CHUNK_ROWS,
+                max_part_bytes=MAX_PART_BYTES, write=True):
+    """Stream the export against the index; returns (summary, new snapshot arrays).
+
+    With write=False only the counts are computed and no files are touched.
+    """
+    if write:
+        os.makedirs(out_dir, exist_ok=True)
+        clear_outputs(out_dir, stem)
+
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        if ID_COLUMN not in header:
+            raise SystemExit(f"{csv_path}: no '{ID_COLUMN}' column")
+        id_index = header.index(ID_COLUMN)
+        header_changed = index['header'] is not None and index['header'] != header
+        if header_changed:
+            print("Header changed since the last snapshot; every row will be shipped as changed")
+
+        writer = PartWriter(out_dir, stem, header, max_part_bytes) if write else None
+        seen = np.zeros(len(index['keys']), dtype=bool)
+        all_keys, all_hashes, all_ids = [], [], []
+        counts = [0, 0, 0]
+        skipped = 0
+
+        chunk = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) <= id_index or not row[id_index].strip():
+                skipped += 1
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                _process_chunk(chunk, id_index, index, header_changed, writer, seen, counts,
+                               all_keys, all_hashes, all_ids)
+                chunk = []
+        if chunk:
+            _process_chunk(chunk, id_index, index, header_changed, writer, seen, counts,
+                           all_keys, all_hashes, all_ids)
+
+    delta_paths = writer.close() if writer and writer.handle else []
+
+    deleted = np.sort(index['ids'][~seen])
+    deleted_path = None
+    if len(deleted) and write:
+        deleted_path = os.path.join(out_dir, f"{stem}.deleted.csv")
+        with open(deleted_path, 'w', encoding='utf-8', newline='') as f:
+            out = csv.writer(f, lineterminator="\n")
+            out.writerow([ID_COLUMN])
+            out.writerows([i.decode('utf-8')] for i in deleted)
+
+    keys = np.concatenate(all_keys) if all_keys else np.zeros(0, dtype=np.uint64)
+    hashes = np.concatenate(all_hashes) if all_hashes else np.zeros(0, dtype=np.uint64)
+    ids = np.concatenate(all_ids) if all_ids else np.zeros(0, dtype='S1')
+    duplicates = int(len(keys) - len(np.unique(keys)))
+
+    summary = {
+        'source': csv_path,
+        'rows': int(len(keys)),
+        'inserted': counts[INSERTED],
+        'changed': counts[CHANGED],
+        'unchanged': counts[UNCHANGED],
+        'deleted': int(len(deleted)),
+        'duplicate_ids': duplicates,
+        'skipped_without_id': skipped,
+        'delta_files': delta_paths,
+        'deleted_file': deleted_path,
+    }
+    return summary, (header, keys, hashes, ids)
+
+
+def _process_chunk(chunk, id_index, index, header_changed, writer, seen, counts, all_keys, all_hashes, all_ids):
+    ids = [row[id_index].strip() for row in chunk]
+    keys = np.fromiter((hash64(i.encode('utf-8')) for i in ids), dtype=np.uint64, count=len(ids))
+    hashes = np.fromiter((row_hash(row) for row in chunk), dtype=np.uint64, count=len(chunk))
+    status, pos = classify(index, keys, hashes, header_changed)
+
+    seen[pos[pos >= 0]] = True
+    for code in (INSERTED, CHANGED, UNCHANGED):
+        counts[code] += int((status == code).sum())
+    if writer:
+        for i in np.flatnonzero(status != UNCHANGED):
+            writer.write(chunk[i])
+
+    all_keys.append(keys)
+    all_hashes.append(hashes)
+    all_ids.append(np.array([i.encode('utf-8') for i in ids]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an append-mode delta of appointments.csv.")
+    parser.add_argument('--csv', default='public/data/appointments.csv')
+    parser.add_argument('--index', default=os.path.join('.ingest_index', 'appointments.npz'))
+    parser.add_argument('--out', default='delta')
+    parser.add_argument('--max-part-mb', type=float, default=MAX_PART_BYTES / 1024 / 1024)
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--dry-run', action='store_true', help="Only report the counts; write nothing")
+    action.add_argument('--commit', action='store_true', help="Mark the pending delta as ingested")
+    action.add_argument('--discard', action='store_true', help="Drop the pending delta and its files")
+    args = parser.parse_args(argv)
+
+    pending = pending_path(args.index)
+    if args.commit:
+        error = commit_pending(args.index)
+        if error:
+            print(f"Error: {error}")
+            return 1
+        print(f"Committed the pending delta; {args.index} now matches the ingested data")
+        return 0
+    if args.discard:
+        if os.path.exists(pending):
+            os.remove(pending)
+        if os.path.isdir(args.out):
+            clear_outputs(args.out, DELTA_STEM)
+        print(f"Discarded the pending delta; {args.index} is unchanged")
+        return 0
+    if os.path.exists(pending) and not args.dry_run:
+        print(f"Error: a delta built earlier has not been committed ({pending}).")
+        print(f"  Ingest the files in {args.out}/ and run with --commit, or drop them with --discard.")
+        return 1
+
+    if not os.path.exists(args.csv):
+        print(f"Error: File not found at {args.csv}")
+        return 1
+
+    t0 = time.perf_counter()
+    index = load_index(args.index)
+    base = index_digest(args.index)
+    summary, snapshot = build_delta(args.csv, index, args.out, max_part_bytes=int(args.max_part_mb * 1024 * 1024),
+                                    write=not args.dry_run)
+    summary['seconds'] = round(time.perf_counter() - t0, 3)
+
+    shipped = summary['inserted'] + summary['changed'] + summary['deleted']
+    if not args.dry_run:
+        # Nothing to ingest means the index already describes this export
+        if shipped:
+            save_index(pending, *snapshot, base=base)
+            summary['pending_index'] = pending
+        with open(os.path.join(args.out, 'delta_report.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"{summary['rows']:,} rows: {summary['inserted']:,} inserted, {summary['changed']:,} changed, "
+          f"{summary['unchanged']:,} unchanged, {summary['deleted']:,} deleted ({summary['seconds']:.2f}s)")
+    if summary['duplicate_ids']:
+        print(f"  Warning: {summary['duplicate_ids']:,} rows repeat an appointment_id")
+    for path in summary['delta_files']:
+        print(f"  Delta: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    if summary['deleted_file']:
+        print(f"  Deleted ids (not applied by append mode): {summary['deleted_file']}")
+    if args.dry_run:
+        print("  Dry run: nothing written")
+    elif shipped:
+        print("  Pending: run with --commit once the delta has been ingested")
+    else:
+        print("  Nothing to ingest; index unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,354 @@
+"""Precomputed staff workload rollup cube from staff_workload.csv.
+
+The staff pages re-aggregate staff_workload.csv on every view. This builds the
+aggregates once: staff x period x role, for three grains (day, ISO week, month),
+with row counts, case and minute sums, and utilization against the staff's
+`max_hours_per_week` from staff.csv. Each grain is written as a columnar
+snapshot in the same CSNP format as build_data_snapshot.py, so the browser maps
+it into typed arrays with the same reader:
+
+    public/data/cubes/workload_cube.day.bin
+    public/data/cubes/workload_cube.week.bin     (period = ISO week Monday, label "2024-W01")
+    public/data/cubes/workload_cube.month.bin    (period = first of month, label "2024-01")
+
+Columns: period, [label], staff_id, staff_name, role, rows, cases, minutes,
+capacity_minutes and utilization_bp (minutes / capacity in basis points,
+10000 = 100%). Rows are sorted by (period, staff_id, role), so one period is a
+contiguous range found by binary search on `period`.
+
+Capacity is max_hours_per_week * 60 * days / 7, where `days` counts the calendar
+days of the period that fall inside the data's date range. Partial weeks and
+months at either end are therefore not understated.
+
+Rebuilds are incremental. The source is split by month and each month's raw
+bytes are hashed. Only months whose hash changed are re-parsed into daily
+aggregates, which are cached under cubes/parts/. The rolled-up cells of each
+grain (sums only, before capacity) are cached there too. A rebuild re-rolls
+only the periods that touch a changed month: its days, its month, and the
+weeks that overlap it, which may also need the neighbouring months' parts.
+The cached cells of every other period are reused as they are. Capacity and
+utilization are recomputed for all cells, as vectorized arithmetic, because
+staff.csv or the data range may have changed. Columns go straight from the
+arrays into ArrayColumn writers. When nothing changed and staff.csv is the
+same, the cube is left untouched.
+
+Usage:
+    python build_workload_cube.py
+    python build_workload_cube.py --src public/data --out public/data/cubes --force
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from build_data_snapshot import ArrayColumn, file_sha256, write_snapshot
+
+CUBE_NAME = "workload_cube"
+MANIFEST_VERSION = 2
+GRAINS = ("day", "week", "month")
+PART_FIELDS = ("day", "staff_id", "staff_name", "role", "rows", "cases", "minutes")
+CELL_FIELDS = ("period", "staff_id", "staff_name", "role", "rows", "cases", "minutes")
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def month_hashes(path):
+    """(header, {YYYY-MM: sha256 of that month's raw lines}, {YYYY-MM: row count})."""
+    hashes, counts = {}, {}
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+        header = [h.strip() for h in header]
+        if header[:1] != ["date"]:
+            raise SystemExit(f"{path}: expected 'date' as the first column")
+        for line in f:
+            if not line.strip():
+                continue
+            month = line[:7].decode('ascii', 'replace')
+            if month not in hashes:
+                hashes[month] = hashlib.sha256()
+                counts[month] = 0
+            hashes[month].update(line)
+            counts[month] += 1
+    return header, {m: h.hexdigest() for m, h in hashes.items()}, counts
+
+
+def read_months(path, header, months):
+    """Parse only the rows of `months`; returns {month: daily aggregate arrays}."""
+    col = {name: header.index(name) for name in ("date", "staff_id", "staff_name", "staff_role", "cases", "minutes")}
+    wanted = {m.encode('ascii') for m in months}
+    raw = {m: [] for m in months}
+    with open(path, 'rb') as f:
+        f.readline()
+        for line in f:
+            if line[:7] in wanted:
+                raw[line[:7].decode('ascii')].append(line.decode('utf-8'))
+    return {month: aggregate_days(csv.reader(io.StringIO("".join(lines))), col) for month, lines in raw.items()}
+
+
+def aggregate_days(reader, col):
+    """Sum one month's rows per (day, staff, role)."""
+    days, staff, names, roles, cases, minutes = [], [], [], [], [], []
+    for row in reader:
+        if not row:
+            continue
+        days.append(date.fromisoformat(row[col['date']].strip()).toordinal())
+        staff.append(row[col['staff_id']].strip())
+        names.append(row[col['staff_name']].strip())
+        roles.append(row[col['staff_role']].strip())
+        cases.append(float(row[col['cases']] or 0))
+        minutes.append(float(row[col['minutes']] or 0))
+    if not days:
+        return {f: np.zeros(0) for f in PART_FIELDS}
+
+    staff, roles = np.array(staff), np.array(roles)
+    keys = np.rec.fromarrays([np.array(days, dtype=np.int64), staff, roles])
+    uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    n = len(uniq)
+    return {
+        'day': uniq.f0.astype(np.int64),
+        'staff_id': uniq.f1,
+        'staff_name': np.array(names)[first],
+        'role': uniq.f2,
+        'rows': np.bincount(inverse, minlength=n).astype(np.int64),
+        'cases': np.bincount(inverse, np.array(cases), minlength=n),
+        'minutes': np.bincount(inverse, np.array(minutes), minlength=n),
+    }
+
+
+def part_path(out_dir, month):
+    return os.path.join(out_dir, "parts", f"{month}.npz")
+
+
+def cells_path(out_dir, grain):
+    return os.path.join(out_dir, "parts", f"cells.{grain}.npz")
+
+
+def save_npz(path, arrays):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def load_npz(path, fields):
+    with np.load(path) as data:
+        return {f: data[f] for f in fields}
+
+
+def load_capacity(staff_path):
+    """{staff_id: max_hours_per_week}."""
+    with open(staff_path, 'r', encoding='utf-8-sig', newline='') as f:
+        return {r['staff_id'].strip(): float(r.get('max_hours_per_week') or 0) for r in csv.DictReader(f)}
+
+
+def to_datetime(ordinals):
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def month_key(ordinals):
+    """'YYYY-MM' of each day ordinal, as the manifest and part files name months."""
+    return np.datetime_as_string(to_datetime(ordinals), unit='M')
+
+
+def period_of(days, grain):
+    """Ordinal of each day's period start (the day itself, its ISO Monday, or the 1st of its month)."""
+    if grain == "day":
+        return days
+    if grain == "week":
+        # date(1, 1, 1) is a Monday, so (ordinal - 1) % 7 is the ISO weekday - 1
+        return days - (days - 1) % 7
+    return to_datetime(days).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+
+
+def touches(periods, grain, months):
+    """Mask of periods that contain a day of any month in `months`."""
+    months = np.array(sorted(months))
+    if grain == "week":
+        return np.isin(month_key(periods), months) | np.isin(month_key(periods + 6), months)
+    return np.isin(month_key(periods), months)
+
+
+def roll_cells(daily, grain):
+    """Sum daily rows per (period, staff, role); the first staff_name seen is kept."""
+    periods = period_of(daily['day'], grain)
+    keys = np.rec.fromarrays([periods, daily['staff_id'], daily['role']])
+    uniq, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    n = len(uniq)
+    cells = {'period': uniq.f0.astype(np.int64), 'staff_id': uniq.f1, 'staff_name': daily['staff_name'][first],
+             'role': uniq.f2}
+    for f in ('rows', 'cases', 'minutes'):
+        cells[f] = np.bincount(inverse, daily[f], minlength=n)
+    return cells
+
+
+def merge_cells(cached, fresh, stale):
+    """Cached cells outside the `stale` mask plus the freshly rolled ones, sorted by (period, staff, role)."""
+    keep = ~stale
+    merged = {f: np.concatenate((cached[f][keep], fresh[f])) for f in CELL_FIELDS}
+    order = np.lexsort((merged['role'], merged['staff_id'], merged['period']))
+    return {f: v[order] for f, v in merged.items()}
+
+
+def period_label(ordinal, grain):
+    d = date.fromordinal(int(ordinal))
+    if grain == "week":
+        year, week, _ = d.isocalendar()
+        return f"{year}-W{week:02d}"
+    return d.strftime("%Y-%m")
+
+
+def cube_columns(cells, grain, capacity, first_day, last_day):
+    """ArrayColumn writers for one grain, with capacity over the data range [first_day, last_day]."""
+    periods = cells['period']
+    n = len(periods)
+    # Calendar days of each period that fall inside the data range
+    all_days = np.arange(first_day, last_day + 1, dtype=np.int64)
+    span_periods, span_days = np.unique(period_of(all_days, grain), return_counts=True)
+    days_in_period = span_days[np.searchsorted(span_periods, periods)]
+
+    staff_ids, staff_codes = np.unique(cells['staff_id'], return_inverse=True)
+    weekly_hours = np.array([capacity.get(s, 0.0) for s in staff_ids.tolist()])[staff_codes]
+    capacity_minutes = np.round(weekly_hours * 60 * days_in_period / 7).astype(np.int64)
+    minutes = np.round(cells['minutes']).astype(np.int64)
+    utilization = np.divide(cells['minutes'], capacity_minutes, out=np.zeros(n), where=capacity_minutes > 0)
+
+    columns = [ArrayColumn("period", to_datetime(periods))]
+    if grain != "day":
+        unique, inverse = np.unique(periods, return_inverse=True)
+        labels = np.array([period_label(p, grain) for p in unique.tolist()])
+        columns.append(ArrayColumn("label", labels[inverse]))
+    columns += [
+        ArrayColumn("staff_id", cells['staff_id']),
+        ArrayColumn("staff_name", cells['staff_name']),
+        ArrayColumn("role", cells['role']),
+        ArrayColumn("rows", np.round(cells['rows']).astype(np.int64)),
+        ArrayColumn("cases", np.round(cells['cases']).astype(np.int64)),
+        ArrayColumn("minutes", minutes),
+        ArrayColumn("capacity_minutes", capacity_minutes),
+        ArrayColumn("utilization_bp", np.round(utilization * 10_000).astype(np.int64)),
+    ]
+    return columns
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'months': {}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the staff workload rollup cube.")
+    parser.add_argument('--src', default='public/data', help="Directory with staff_workload.csv and staff.csv")
+    parser.add_argument('--out', default='public/data/cubes')
+    parser.add_argument('--force', action='store_true', help="Re-parse every month")
+    args = parser.parse_args(argv)
+
+    workload_path = os.path.join(args.src, 'staff_workload.csv')
+    staff_path = os.path.join(args.src, 'staff.csv')
+    for path in (workload_path, staff_path):
+        if not os.path.exists(path):
+            print(f"Error: File not found at {path}")
+            return 1
+
+    t0 = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, f"{CUBE_NAME}.json")
+    manifest = load_manifest(manifest_path)
+    previous = {} if args.force else manifest['months']
+
+    header, hashes, counts = month_hashes(workload_path)
+    dirty = sorted(m for m, h in hashes.items()
+                   if previous.get(m, {}).get('sha256') != h or not os.path.exists(part_path(args.out, m)))
+    removed = sorted(set(manifest['months']) - set(hashes))
+    staff_digest = file_sha256(staff_path)
+    outputs = {g: os.path.join(args.out, f"{CUBE_NAME}.{g}.bin") for g in GRAINS}
+
+    if not dirty and not removed and manifest.get('staff_sha256') == staff_digest and \
+            all(os.path.exists(p) for p in outputs.values()):
+        print(f"Cube is current ({len(hashes)} months unchanged) in {time.perf_counter() - t0:.2f}s")
+        return 0
+
+    parts = read_months(workload_path, header, dirty)
+    for month, part in parts.items():
+        save_npz(part_path(args.out, month), part)
+    for month in removed:
+        if os.path.exists(part_path(args.out, month)):
+            os.remove(part_path(args.out, month))
+
+    def daily_of(months):
+        for month in months:
+            if month not in parts:
+                parts[month] = load_npz(part_path(args.out, month), PART_FIELDS)
+        chosen = [parts[m] for m in sorted(months)]
+        return {f: np.concatenate([p[f] for p in chosen]) if chosen else np.zeros(0) for f in PART_FIELDS}
+
+    # Weeks overlapping a changed month can reach into the months either side of it
+    changed = set(dirty) | set(removed)
+    neighbours = set()
+    for month in changed:
+        first = np.datetime64(month, 'M')
+        neighbours.update(str(m) for m in (first - 1, first + 1))
+    known = set(hashes)
+
+    capacity = load_capacity(staff_path)
+    cells, rolled = {}, {}
+    for grain in GRAINS:
+        cached = None if args.force or not manifest.get('grains') else \
+            (load_npz(cells_path(args.out, grain), CELL_FIELDS) if os.path.exists(cells_path(args.out, grain)) else None)
+        if cached is None:
+            cells[grain] = roll_cells(daily_of(known), grain)
+            rolled[grain] = len(cells[grain]['period'])
+        else:
+            needed = (changed | neighbours) & known if grain == "week" else changed & known
+            fresh = roll_cells(daily_of(needed), grain) if needed else None
+            if fresh is not None:
+                fresh = {f: v[touches(fresh['period'], grain, changed)] for f, v in fresh.items()}
+            else:
+                fresh = {f: cached[f][:0] for f in CELL_FIELDS}
+            cells[grain] = merge_cells(cached, fresh, touches(cached['period'], grain, changed))
+            rolled[grain] = len(fresh['period'])
+        save_npz(cells_path(args.out, grain), cells[grain])
+
+    day_cells = cells['day']
+    if not len(day_cells['period']):
+        print(f"{workload_path} has no rows")
+        return 1
+    unknown = sorted(set(np.unique(day_cells['staff_id']).tolist()) - set(capacity))
+    if unknown:
+        print(f"  Warning: no max_hours_per_week for {', '.join(unknown)}; utilization left at 0")
+
+    first_day, last_day = int(day_cells['period'].min()), int(day_cells['period'].max())
+    built = {}
+    for grain, path in outputs.items():
+        writers = cube_columns(cells[grain], grain, capacity, first_day, last_day)
+        count = len(cells[grain]['period'])
+        write_snapshot(path, {'source': os.path.basename(workload_path), 'cube': CUBE_NAME, 'grain': grain,
+                              'rows': count}, writers)
+        built[grain] = {'file': os.path.basename(path), 'rows': count, 'bytes': os.path.getsize(path)}
+        print(f"  {grain:>5}: {count:>7,} cells ({rolled[grain]:,} re-rolled) -> {path} "
+              f"({built[grain]['bytes'] / 1024:.1f} KB)")
+
+    manifest.update({
+        'source': os.path.basename(workload_path),
+        'staff_sha256': staff_digest,
+        'months': {m: {'sha256': hashes[m], 'rows': counts[m]} for m in sorted(hashes)},
+        'grains': built,
+    })
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    print(f"{len(dirty)} of {len(hashes)} months re-parsed, {len(removed)} removed "
+          f"in {time.perf_counter() - t0:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
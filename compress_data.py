@@ -0,0 +1,204 @@
+"""Precompress public/data files into .gz and .br variants with a hash manifest.
+
+Each data file gets `<name>.gz` and `<name>.br` written next to it at maximum
+compression. A static server (nginx `gzip_static`/`brotli_static`, or a Vite
+middleware) can then send them with `Content-Encoding` directly instead of
+compressing on every request. data_manifest.json records the SHA-256
+of every source, which doubles as its ETag, plus the raw and compressed sizes.
+The front end can compare hashes and skip re-downloading unchanged files.
+
+Each file is one job in a thread pool (hashlib, zlib and brotli release the
+GIL). A job streams its file in chunks, first to hash it and then, unless the
+hash matches the manifest and the variants still exist, through every encoder
+at once, so memory stays bounded by the chunk size. Brotli needs the `brotli`
+package. Without it only gzip variants are written, and any `.br` left by an
+earlier run is removed so it is not served next to a newer `.gz`.
+
+Usage:
+    python compress_data.py
+    python compress_data.py --src public/data --pattern "*.csv,*.json" --workers 8 --force
+"""
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = "data_manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_PATTERNS = "*.csv,*.json"
+VARIANT_SUFFIXES = ('.gz', '.br')
+CHUNK_SIZE = 1 << 20
+
+
+class BrotliWriter:
+    """Minimal file-like brotli stream over an open binary file."""
+
+    def __init__(self, f, quality):
+        self.f = f
+        self.compressor = brotli.Compressor(quality=quality, mode=brotli.MODE_TEXT)
+
+    def write(self, data):
+        self.f.write(self.compressor.process(data))
+
+    def close(self):
+        self.f.write(self.compressor.finish())
+
+
+def encoders(brotli_quality=11):
+    """{suffix: open(binary file) -> writer} for the available encodings."""
+    # Empty filename and mtime=0 keep the .gz output identical for identical input
+    found = {'.gz': lambda f: gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=f, mtime=0)}
+    if brotli is not None:
+        found['.br'] = lambda f: BrotliWriter(f, brotli_quality)
+    return found
+
+
+def list_sources(src, patterns):
+    names = []
+    for name in sorted(os.listdir(src)):
+        path = os.path.join(src, name)
+        if name == MANIFEST_NAME or not os.path.isfile(path):
+            continue
+        if any(fnmatch.fnmatch(name, p) for p in patterns):
+            names.append(name)
+    return names
+
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def read_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def hash_file(path):
+    """(SHA-256 hex digest, size in bytes) without loading the file."""
+    h, size = hashlib.sha256(), 0
+    for chunk in read_chunks(path):
+        h.update(chunk)
+        size += len(chunk)
+    return h.hexdigest(), size
+
+
+def compress_file(path, codecs):
+    """Stream `path` once through every encoder; variants are replaced atomically."""
+    outputs = {suffix: open(path + suffix + ".tmp", 'wb') for suffix in codecs}
+    try:
+        writers = {suffix: codecs[suffix](f) for suffix, f in outputs.items()}
+        for chunk in read_chunks(path):
+            for writer in writers.values():
+                writer.write(chunk)
+        for writer in writers.values():
+            writer.close()
+    finally:
+        for f in outputs.values():
+            f.close()
+    variants = {}
+    for suffix in codecs:
+        os.replace(path + suffix + ".tmp", path + suffix)
+        variants[suffix.lstrip('.')] = {'file': os.path.basename(path) + suffix,
+                                        'bytes': os.path.getsize(path + suffix)}
+    return variants
+
+
+def remove_unsupported(path, codecs):
+    """Delete variants this run cannot regenerate (e.g. .br once brotli is gone)."""
+    for suffix in VARIANT_SUFFIXES:
+        if suffix not in codecs and os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def is_current(path, digest, previous, codecs):
+    if not previous or previous.get('sha256') != digest:
+        return False
+    return all(os.path.exists(path + suffix) for suffix in codecs) and \
+        set(previous.get('variants', {})) == {s.lstrip('.') for s in codecs}
+
+
+def process_file(path, previous, codecs, force):
+    """(manifest entry, compressed?) for one source file; runs in a pool worker."""
+    remove_unsupported(path, codecs)
+    digest, size = hash_file(path)
+    if not force and is_current(path, digest, previous, codecs):
+        return previous, False
+    entry = {'sha256': digest, 'etag': f'"{digest[:32]}"', 'bytes': size}
+    entry['variants'] = compress_file(path, codecs)
+    return entry, True
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'files': {}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write gzip/brotli variants of data files with a hash manifest.")
+    parser.add_argument('--src', default='public/data')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERNS, help="Comma-separated glob patterns")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--brotli-quality', type=int, default=11,
+                        help="Lower for faster local builds; 11 is the maximum")
+    parser.add_argument('--force', action='store_true', help="Recompress even if hashes are unchanged")
+    args = parser.parse_args(argv)
+
+    codecs = encoders(args.brotli_quality)
+    if brotli is None:
+        print("brotli is not installed; writing gzip variants only (pip install brotli)")
+
+    t0 = time.perf_counter()
+    manifest_path = os.path.join(args.src, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    names = list_sources(args.src, [p.strip() for p in args.pattern.split(',') if p.strip()])
+
+    files, compressed = {}, 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {name: pool.submit(process_file, os.path.join(args.src, name),
+                                  manifest['files'].get(name), codecs, args.force)
+                for name in names}
+        for name, job in jobs.items():
+            entry, changed = job.result()
+            files[name] = entry
+            if changed:
+                compressed += 1
+                sizes = ", ".join(f"{k} {v['bytes'] / 1024:.1f} KB" for k, v in entry['variants'].items())
+                print(f"  {name}: {entry['bytes'] / 1024:.1f} KB -> {sizes}")
+
+    # Variants of sources that were deleted are stale
+    for name, entry in manifest['files'].items():
+        if name not in files:
+            for variant in entry.get('variants', {}).values():
+                stale = os.path.join(args.src, variant['file'])
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+    manifest['files'] = files
+    write_atomic(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+    print(f"{compressed} compressed, {len(names) - compressed} unchanged in {time.perf_counter() - t0:.2f}s")
+    print(f"Manifest written to {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,342 @@
+"""Room, equipment and staff double-booking detection with sorted interval indexes.
+
+Every booking becomes an interval [start, start + duration) on each resource it
+occupies:
+
+    appointments.csv   room, equipment, doctor_name and assistant_name; the
+                       duration and buffer_time come from services.csv by service_item
+    equipment_log.csv  equipment_name and staff_name, for duration_min
+
+The generator writes one equipment_log row per equipment appointment, so a log
+row whose (equipment, start, staff) matches an appointment is the same booking
+and is not added again. Only log rows no appointment explains become intervals.
+Cancelled appointments are ignored (case-insensitively). When the appointments carry a `branch`
+column, resources are keyed as "branch/name", so same-named rooms in different
+branches do not collide.
+
+Each resource type gets one index: the intervals sorted by (resource, start).
+One O(n log n) sweep over each index finds:
+
+    double bookings    intervals that start before an earlier one on the same resource has ended
+    buffer violations  intervals that start after the previous one ends but within its buffer_time
+    peak concurrency   most overlapping bookings per resource, and per clock hour across the type
+
+Overlaps are paired with the earlier interval that ends last, so each
+conflicting booking is reported once. The result is written as JSON for the
+rooms and staff pages and the risk engines.
+
+Usage:
+    python detect_conflicts.py
+    python detect_conflicts.py --appointments build/fixtures/appointments.csv --out build/conflict_report.json
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+RESOURCE_TYPES = ("room", "equipment", "staff")
+IGNORED_STATUSES = {"cancelled"}
+DEFAULT_MAX_CONFLICTS = 1000
+BUSIEST_HOURS = 10
+
+
+def load_services(path):
+    """{service_name: (duration_min, buffer_min)}."""
+    services = {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            services[row['service_name'].strip()] = (int(float(row.get('duration') or 0)),
+                                                     int(float(row.get('buffer_time') or 0)))
+    return services
+
+
+def minute_of(day, clock):
+    """Minutes since 0001-01-01 for 'YYYY-MM-DD' and 'HH:MM[:SS]'."""
+    hours, minutes = clock.split(":")[:2]
+    return date.fromisoformat(day).toordinal() * 1440 + int(hours) * 60 + int(minutes)
+
+
+def format_minute(value):
+    day, rest = divmod(int(value), 1440)
+    return f"{date.fromordinal(day).isoformat()}T{rest // 60:02d}:{rest % 60:02d}"
+
+
+class IntervalSource:
+    """Collects intervals per resource type before the indexes are built."""
+
+    def __init__(self):
+        self.columns = {t: {'resource': [], 'start': [], 'end': [], 'buffer': [], 'ref': []} for t in RESOURCE_TYPES}
+        self.skipped = {}
+        # (equipment, start minute, staff) of every appointment, to recognise its equipment_log row
+        self.equipment_bookings = set()
+
+    def add(self, kind, resource, start, duration, buffer, ref):
+        cols = self.columns[kind]
+        cols['resource'].append(resource)
+        cols['start'].append(start)
+        cols['end'].append(start + duration)
+        cols['buffer'].append(buffer)
+        cols['ref'].append(ref)
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+
+def read_appointments(path, services, source):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                start = minute_of(row['date'].strip(), row['time'].strip())
+            except (KeyError, ValueError, AttributeError):
+                source.skip('bad_datetime')
+                continue
+            # The same person can appear as doctor and assistant; they are booked once
+            staff = {(row.get(c) or "").strip() for c in ('doctor_name', 'assistant_name')} - {""}
+            equipment = (row.get('equipment') or "").strip()
+            if equipment:
+                # Recorded even when cancelled: the log row belongs to this booking either way
+                source.equipment_bookings.update((equipment, start, name) for name in staff)
+            if (row.get('status') or "").strip().lower() in IGNORED_STATUSES:
+                continue
+            service = services.get((row.get('service_item') or "").strip())
+            if service is None:
+                source.skip('unknown_service')
+                continue
+            duration, buffer = service
+            if duration <= 0:
+                source.skip('zero_duration')
+                continue
+            branch = (row.get('branch') or "").strip()
+            prefix = f"{branch}/" if branch else ""
+            ref = row.get('appointment_id', "").strip()
+
+            for kind, name in (("room", (row.get('room') or "").strip()), ("equipment", equipment)):
+                if name:
+                    source.add(kind, prefix + name, start, duration, buffer, ref)
+            for name in sorted(staff):
+                source.add("staff", prefix + name, start, duration, buffer, ref)
+
+
+def read_equipment_log(path, source):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                start = minute_of(row['date'].strip(), row['time'].strip())
+                duration = int(float(row['duration_min']))
+            except (KeyError, ValueError, AttributeError):
+                source.skip('bad_equipment_log_row')
+                continue
+            if duration <= 0:
+                source.skip('zero_duration')
+                continue
+            ref = row.get('log_id', "").strip()
+            equipment = (row.get('equipment_name') or "").strip()
+            staff = (row.get('staff_name') or "").strip()
+            if (equipment, start, staff) in source.equipment_bookings:
+                source.skip('equipment_log_matches_appointment')
+                continue
+            if equipment:
+                source.add("equipment", equipment, start, duration, 0, ref)
+            if staff:
+                source.add("staff", staff, start, duration, 0, ref)
+
+
+class IntervalIndex:
+    """Intervals of one resource type, sorted by (resource, start, end).
+
+    Times are shifted into per-resource bands (code * span), so running
+    maxima and event sweeps over the whole array never cross resources.
+    """
+
+    def __init__(self, resources, starts, ends, buffers, refs):
+        self.names, codes = np.unique(np.array(resources, dtype=str), return_inverse=True)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        order = np.lexsort((ends, starts, codes))
+        self.codes = codes[order]
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.buffers = np.asarray(buffers, dtype=np.int64)[order]
+        self.refs = np.asarray(refs, dtype=str)[order]
+
+        self.origin = int(self.starts.min()) if len(self.starts) else 0
+        span = (int(self.ends.max()) - self.origin + 1) if len(self.ends) else 1
+        band = self.codes.astype(np.int64) * span - self.origin
+        self.start_keys = self.starts + band
+        self.end_keys = self.ends + band
+
+    def __len__(self):
+        return len(self.starts)
+
+    def sweep(self):
+        """(overlaps, buffer_violations, partner): partner is the earlier interval that ends last."""
+        n = len(self)
+        running_end = np.maximum.accumulate(self.end_keys)
+        # Index of the interval holding the running maximum end, carried forward
+        holder = np.maximum.accumulate(np.where(self.end_keys == running_end, np.arange(n), -1))
+        partner = np.concatenate(([-1], holder[:-1]))
+        previous_end = np.concatenate(([np.iinfo(np.int64).min], running_end[:-1]))
+
+        same_resource = (partner >= 0) & (self.codes[np.maximum(partner, 0)] == self.codes)
+        overlaps = same_resource & (self.start_keys < previous_end)
+        gap = self.start_keys - previous_end
+        buffer_violations = same_resource & ~overlaps & (gap < self.buffers[np.maximum(partner, 0)])
+        return overlaps, buffer_violations, partner
+
+    def peak_per_resource(self):
+        """Maximum number of simultaneous bookings on each resource."""
+        times = np.concatenate((self.start_keys, self.end_keys))
+        deltas = np.concatenate((np.ones(len(self), np.int64), -np.ones(len(self), np.int64)))
+        codes = np.concatenate((self.codes, self.codes))
+        # Ends sort before starts at the same minute: [start, end) intervals that touch do not overlap
+        order = np.lexsort((deltas, times))
+        levels = np.cumsum(deltas[order])
+        peaks = np.zeros(len(self.names), dtype=np.int64)
+        np.maximum.at(peaks, codes[order], levels)
+        return peaks
+
+    def hourly_concurrency(self):
+        """Peak bookings in progress during each clock hour across all resources: (first hour, peaks)."""
+        first_hour = int(self.starts.min()) // 60
+        last_hour = int(self.ends.max() - 1) // 60
+        boundaries = np.arange(first_hour, last_hour + 1, dtype=np.int64) * 60
+        # Zero-delta events at every hour start carry the running level into that hour
+        times = np.concatenate((self.starts, self.ends, boundaries))
+        deltas = np.concatenate((np.ones(len(self), np.int64), -np.ones(len(self), np.int64),
+                                 np.zeros(len(boundaries), np.int64)))
+        order = np.lexsort((deltas, times))
+        times, deltas, levels = times[order], deltas[order], np.cumsum(deltas[order])
+        # Levels only rise at starts; sampling after ends would count a half-applied minute
+        sampled = (deltas >= 0) & (times < (last_hour + 1) * 60)
+        peaks = np.zeros(last_hour - first_hour + 1, dtype=np.int64)
+        np.maximum.at(peaks, times[sampled] // 60 - first_hour, levels[sampled])
+        return first_hour, peaks
+
+
+def analyze(kind, index, max_conflicts):
+    t0 = time.perf_counter()
+    overlaps, buffer_violations, partner = index.sweep()
+    peaks = index.peak_per_resource()
+    first_hour, hourly = index.hourly_concurrency()
+
+    n = len(index.names)
+    counts = np.bincount(index.codes, minlength=n)
+    busy = np.bincount(index.codes, index.ends - index.starts, minlength=n)
+    doubled = np.bincount(index.codes, overlaps, minlength=n)
+    squeezed = np.bincount(index.codes, buffer_violations, minlength=n)
+    by_resource = {
+        str(name): {
+            'intervals': int(counts[code]),
+            'busy_minutes': int(busy[code]),
+            'double_bookings': int(doubled[code]),
+            'buffer_violations': int(squeezed[code]),
+            'peak_concurrency': int(peaks[code]),
+        }
+        for code, name in enumerate(index.names)
+    }
+
+    conflicts = []
+    for i in np.flatnonzero(overlaps | buffer_violations)[:max_conflicts]:
+        j = partner[i]
+        entry = {
+            'kind': 'double_booking' if overlaps[i] else 'buffer_violation',
+            'resource': str(index.names[index.codes[i]]),
+            'first': {'ref': str(index.refs[j]), 'start': format_minute(index.starts[j]),
+                      'end': format_minute(index.ends[j])},
+            'second': {'ref': str(index.refs[i]), 'start': format_minute(index.starts[i]),
+                       'end': format_minute(index.ends[i])},
+        }
+        if overlaps[i]:
+            entry['overlap_min'] = int(min(index.ends[i], index.ends[j]) - index.starts[i])
+        else:
+            entry['gap_min'] = int(index.starts[i] - index.ends[j])
+            entry['buffer_min'] = int(index.buffers[j])
+        conflicts.append(entry)
+
+    # Hour-of-day profile: the highest and the average hourly peak over all days
+    hours_of_day = (first_hour + np.arange(len(hourly))) % 24
+    profile = []
+    for hour in range(24):
+        values = hourly[hours_of_day == hour]
+        if len(values) and values.max() > 0:
+            profile.append({'hour': hour, 'peak': int(values.max()), 'mean_peak': round(float(values.mean()), 2)})
+    busiest = np.argsort(-hourly, kind='stable')[:BUSIEST_HOURS]
+
+    total = int((overlaps | buffer_violations).sum())
+    return {
+        'resources': len(index.names),
+        'intervals': len(index),
+        'double_bookings': int(overlaps.sum()),
+        'buffer_violations': int(buffer_violations.sum()),
+        'peak_concurrency': int(hourly.max()) if len(hourly) else 0,
+        'hourly_profile': profile,
+        'busiest_hours': [{'hour': format_minute((first_hour + int(h)) * 60)[:13], 'concurrent': int(hourly[h])}
+                          for h in busiest if hourly[h] > 0],
+        'by_resource': by_resource,
+        'conflicts': conflicts,
+        'conflicts_truncated': max(0, total - len(conflicts)),
+        'seconds': round(time.perf_counter() - t0, 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect room, equipment and staff double bookings.")
+    parser.add_argument('--appointments', default='public/data/appointments.csv')
+    parser.add_argument('--equipment-log', default='public/data/equipment_log.csv')
+    parser.add_argument('--services', default='public/data/services.csv')
+    parser.add_argument('--out', default='public/data/conflict_report.json')
+    parser.add_argument('--max-conflicts', type=int, default=DEFAULT_MAX_CONFLICTS,
+                        help="Conflicts listed per resource type (counts always cover all)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.services):
+        print(f"Error: File not found at {args.services}")
+        return 1
+
+    t0 = time.perf_counter()
+    source = IntervalSource()
+    sources = []
+    if os.path.exists(args.appointments):
+        read_appointments(args.appointments, load_services(args.services), source)
+        sources.append(args.appointments)
+    else:
+        print(f"  Skipping missing {args.appointments}")
+    if os.path.exists(args.equipment_log):
+        read_equipment_log(args.equipment_log, source)
+        sources.append(args.equipment_log)
+    else:
+        print(f"  Skipping missing {args.equipment_log}")
+    load_seconds = time.perf_counter() - t0
+
+    types = {}
+    for kind in RESOURCE_TYPES:
+        cols = source.columns[kind]
+        if not cols['start']:
+            continue
+        index = IntervalIndex(cols['resource'], cols['start'], cols['end'], cols['buffer'], cols['ref'])
+        types[kind] = analyze(kind, index, args.max_conflicts)
+        stats = types[kind]
+        print(f"  {kind:<9} {stats['resources']:>4} resources {stats['intervals']:>9,} intervals  "
+              f"{stats['double_bookings']:>7,} double bookings  {stats['buffer_violations']:>7,} buffer violations  "
+              f"peak {stats['peak_concurrency']}  ({stats['seconds']:.3f}s)")
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'sources': sources,
+        'skipped': source.skipped,
+        'load_seconds': round(load_seconds, 3),
+        'types': types,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report written to {args.out} in {time.perf_counter() - t0:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,301 @@
+"""Streaming extractor for ai_params.json and forecast_config.json.
+
+Python replacement for src/scripts/extract_ai_params.js and
+src/scripts/calculate-forecast-metrics.js. appointments.csv is read once with
+the csv module (quoted fields are handled), and only per-day counters are
+kept: {date: [non-cancelled visits, realized visits]}. Both outputs are
+derived from those counters.
+
+The counters and the byte offset reached are saved in a small state file,
+with a cheap fingerprint of the consumed prefix: the file's inode, size and
+mtime, plus SHA-256s of the first and last FINGERPRINT_WINDOW bytes before the
+offset. A run with no new rows only stats the file, and a run after an append
+reads the two windows and the new bytes, so the cost does not grow with the
+history. If the file was replaced, truncated below the offset, or changed
+around either window, the fingerprint no longer matches and the file is
+rescanned (--full forces that for edits elsewhere in the middle).
+Status flips appended to appointments_status_delta.csv by
+`generate_data.py tick` are applied the same way. The flips cannot be
+un-applied from the counters, so if the delta file shrank or was rewritten
+the whole state is discarded and both files are rescanned.
+
+Usage:
+    python extract_forecast_params.py
+    python extract_forecast_params.py --csv public/data/appointments.csv --state build/forecast_state.json
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+from datetime import date
+
+STATE_VERSION = 3
+FINGERPRINT_WINDOW = 64 * 1024
+
+REALIZED_STATUSES = {"completed", "checked_in"}
+EXCLUDED_STATUS = "cancelled"
+
+# Same window as calculate-forecast-metrics.js
+FORECAST_START = "2024-01-01"
+FORECAST_END = "2026-02-28"
+
+
+def empty_state():
+    return {'version': STATE_VERSION, 'offset': 0, 'fingerprint': None, 'header': None,
+            'delta_offset': 0, 'delta_fingerprint': None, 'days': {}}
+
+
+def load_state(path):
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+    return empty_state()
+
+
+def save_state(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def window_sha256(f, start, stop):
+    f.seek(start)
+    return hashlib.sha256(f.read(stop - start)).hexdigest()
+
+
+def fingerprint(path, offset):
+    """Identity of the first `offset` bytes: inode, size/mtime and hashes of its head and tail windows."""
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        head = window_sha256(f, 0, min(offset, FINGERPRINT_WINDOW))
+        tail = window_sha256(f, max(0, offset - FINGERPRINT_WINDOW), offset)
+    return {'inode': st.st_ino, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'head': head, 'tail': tail}
+
+
+def prefix_unchanged(path, offset, expected):
+    """True if the first `offset` bytes still look like the checkpointed ones."""
+    if not expected:
+        return False
+    st = os.stat(path)
+    if st.st_size < offset or st.st_ino != expected['inode']:
+        return False
+    # Untouched since the checkpoint: nothing to read
+    if (st.st_size, st.st_mtime_ns) == (expected['size'], expected['mtime_ns']):
+        return True
+    current = fingerprint(path, offset)
+    return (current['head'], current['tail']) == (expected['head'], expected['tail'])
+
+
+def iter_complete_lines(f, position):
+    """Yield decoded lines from a binary file, advancing position[0] past each one.
+
+    A trailing line without a newline is left for the next run (it may still be being written).
+    """
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            return
+        position[0] += len(raw)
+        yield raw.decode('utf-8')
+
+
+def read_header(path):
+    """(column names, byte length of the header line); (None, 0) if not written yet."""
+    with open(path, 'rb') as f:
+        first = f.readline()
+    if not first.endswith(b"\n"):
+        return None, 0
+    return [h.strip() for h in next(csv.reader([first.decode('utf-8-sig')]))], len(first)
+
+
+def iter_rows(path, offset, header):
+    """Yield (row dict, offset just past the row) for every complete row after `offset`."""
+    position = [offset]
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for row in csv.reader(iter_complete_lines(f, position)):
+            if row:
+                yield dict(zip(header, row)), position[0]
+
+
+def scan_appointments(path, state):
+    """Fold rows appended since the last checkpoint into the per-day counters."""
+    offset = state['offset']
+    if offset and not prefix_unchanged(path, offset, state['fingerprint']):
+        print(f"{path} was rewritten since the last run; rescanning from the start")
+        state.update(empty_state())
+        offset = 0
+    if offset == 0:
+        state['header'], offset = read_header(path)
+        if state['header'] is None:
+            return 0
+
+    days = state['days']
+    count = 0
+    for row, offset in iter_rows(path, offset, state['header']):
+        count += 1
+        day = (row.get('date') or "").strip()
+        status = (row.get('status') or "").strip().lower()
+        if not day or status == EXCLUDED_STATUS:
+            continue
+        counters = days.setdefault(day, [0, 0])
+        counters[0] += 1
+        if status in REALIZED_STATUSES:
+            counters[1] += 1
+
+    state['fingerprint'] = fingerprint(path, offset)
+    state['offset'] = offset
+    return count
+
+
+def delta_unchanged(path, state):
+    """False when the delta rows already applied to the counters were truncated, rewritten or removed."""
+    if not state['delta_offset']:
+        return True
+    if not os.path.exists(path):
+        return False
+    return prefix_unchanged(path, state['delta_offset'], state['delta_fingerprint'])
+
+
+def apply_status_delta(path, state):
+    """Apply booked -> final status flips written by `generate_data.py tick`.
+
+    Booked rows were counted as non-cancelled and unrealized, so a flip to
+    cancelled removes one visit and a flip to completed/checked_in realizes one.
+    """
+    if not os.path.exists(path):
+        return 0
+    offset = state['delta_offset']
+    header, header_len = read_header(path)
+    if header is None:
+        return 0
+    offset = max(offset, header_len)
+
+    days = state['days']
+    count = 0
+    for row, offset in iter_rows(path, offset, header):
+        count += 1
+        counters = days.setdefault(row['date'], [0, 0])
+        status = row['status'].strip().lower()
+        if status == EXCLUDED_STATUS:
+            counters[0] -= 1
+        elif status in REALIZED_STATUSES:
+            counters[1] += 1
+    state['delta_offset'] = offset
+    state['delta_fingerprint'] = fingerprint(path, offset)
+    return count
+
+
+def js_weekday(day):
+    """Date.getDay(): Sunday = 0"""
+    return (date.fromisoformat(day).weekday() + 1) % 7
+
+
+def _round(value, digits):
+    value = round(value, digits)
+    # JSON.stringify writes 1 rather than 1.0
+    return int(value) if value == int(value) else value
+
+
+def compute_params(days, start=None, end=None, missing_factor=0.0):
+    """Realization rate, daily base and weekday/month factors over [start, end]."""
+    total_valid = 0
+    realized_total = 0
+    realized_by_day = {}
+    for day, (valid, realized) in days.items():
+        if (start and day < start) or (end and day > end):
+            continue
+        total_valid += valid
+        realized_total += realized
+        if realized > 0:
+            realized_by_day[day] = realized
+
+    base = realized_total / len(realized_by_day) if realized_by_day else 0.0
+    weekday_sums, weekday_days = [0] * 7, [0] * 7
+    month_sums, month_days = [0] * 13, [0] * 13
+    for day, count in realized_by_day.items():
+        wd = js_weekday(day)
+        month = int(day[5:7])
+        weekday_sums[wd] += count
+        weekday_days[wd] += 1
+        month_sums[month] += count
+        month_days[month] += 1
+
+    def factor(total, n):
+        if n == 0 or base == 0:
+            return missing_factor
+        return total / n / base
+
+    return {
+        'realization_rate': realized_total / total_valid if total_valid else 0.0,
+        'average_daily_base': base,
+        'day_weights': {str(d): factor(weekday_sums[d], weekday_days[d]) for d in range(7)},
+        'monthly_factors': {str(m): factor(month_sums[m], month_days[m]) for m in range(1, 13)},
+    }
+
+
+def build_outputs(days, forecast_start=FORECAST_START, forecast_end=FORECAST_END):
+    # extract_ai_params.js: whole history, empty buckets -> 0
+    overall = compute_params(days, missing_factor=0.0)
+    ai_params = {
+        'avgRealizationRate': _round(overall['realization_rate'], 4),
+        'dayWeights': {k: _round(v, 3) for k, v in overall['day_weights'].items()},
+        'monthlyFactors': {k: _round(v, 3) for k, v in overall['monthly_factors'].items()},
+    }
+
+    # calculate-forecast-metrics.js: fixed window, empty buckets -> 1.0
+    window = compute_params(days, forecast_start, forecast_end, missing_factor=1.0)
+    forecast_config = {
+        'realizationRate': _round(window['realization_rate'], 4),
+        'monthlyFactors': {k: _round(v, 3) for k, v in window['monthly_factors'].items()},
+        'dayWeights': {k: _round(v, 3) for k, v in window['day_weights'].items()},
+        'averageDailyBase': _round(window['average_daily_base'], 2),
+    }
+    return ai_params, forecast_config
+
+
+def write_json(path, payload):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(payload, indent=2, ensure_ascii=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract forecast parameters from appointments.csv in one pass.")
+    parser.add_argument('--csv', default='public/data/appointments.csv')
+    parser.add_argument('--delta', help="Status delta file (default: appointments_status_delta.csv next to --csv)")
+    parser.add_argument('--state', default='forecast_state.json', help="Checkpoint file ('' to disable)")
+    parser.add_argument('--ai-params', default='ai_params.json')
+    parser.add_argument('--forecast-config', default='forecast_config.json')
+    parser.add_argument('--start', default=FORECAST_START, help="forecast_config.json window start")
+    parser.add_argument('--end', default=FORECAST_END, help="forecast_config.json window end")
+    parser.add_argument('--full', action='store_true', help="Ignore the checkpoint and rescan everything")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.csv):
+        print(f"Error: File not found at {args.csv}")
+        return 1
+
+    state = empty_state() if args.full or not args.state else load_state(args.state)
+    delta_path = args.delta or os.path.join(os.path.dirname(args.csv), "appointments_status_delta.csv")
+    if not delta_unchanged(delta_path, state):
+        print(f"{delta_path} shrank or was rewritten since the last run; rescanning everything")
+        state = empty_state()
+    new_rows = scan_appointments(args.csv, state)
+    flips = apply_status_delta(delta_path, state)
+
+    ai_params, forecast_config = build_outputs(state['days'], args.start, args.end)
+    write_json(args.ai_params, ai_params)
+    write_json(args.forecast_config, forecast_config)
+    if args.state:
+        save_state(args.state, state)
+
+    print(f"Processed {new_rows:,} new rows and {flips:,} status updates ({len(state['days'])} days tracked)")
+    print(f"JSON written to {args.ai_params} and {args.forecast_config}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
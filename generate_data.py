@@ -1,6 +1,14 @@
+import argparse
 import csv
+import math
+import os
 import random
-from datetime import datetime, timedelta
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
 
 # Configuration
 NUM_RECORDS = 500
@@ -93,6 +101,989 @@ def generate_rooms_usage_csv():
                 "Normal"
             ])
 
+# ---------------------------------------------------------------------------
+# Scale mode: vectorized, seeded, chunked generation
+# ---------------------------------------------------------------------------
+# Usage: python generate_data.py --rows 5_000_000 --seed 42 --out build/fixtures
+#
+# Whole columns are drawn at once with NumPy as integer codes and turned into
+# text through small lookup tables, then streamed to disk CHUNK_SIZE rows at a
+# time so memory stays flat regardless of --rows. Chunk k is seeded from
+# (seed, k), so the output only depends on the seed and the date range.
+# None of the lookup values contain commas or quotes, so rows are joined
+# directly instead of going through csv.writer.
+
+CHUNK_SIZE = 250_000
+
+# Fixed defaults so seeded runs are reproducible (override with --start/--end/--today)
+SCALE_START = date(2024, 1, 1)
+SCALE_END = date(2026, 3, 31)
+SCALE_TODAY = date(2026, 2, 28)  # visits after this day are still "booked"
+
+# Demand shape, Python weekday() order (Mon=0) and calendar month (1-12)
+WEEKDAY_WEIGHTS = [0.97, 0.92, 0.95, 0.93, 0.98, 1.09, 1.16]
+MONTH_FACTORS = [0.78, 0.98, 1.10, 1.19, 1.14, 0.64, 0.90, 0.93, 0.98, 0.80, 1.36, 1.32]
+
+# Past-visit statuses (appointments.csv vocabulary) and their probabilities
+APPOINTMENT_STATUSES = ["completed", "checked_in", "no_show", "cancelled"]
+STATUS_WEIGHTS = [0.62, 0.06, 0.14, 0.18]
+LEGACY_STATUS = {"completed": "Completed", "checked_in": "Completed", "no_show": "No-show",
+                 "cancelled": "Cancelled", "booked": "Booked"}
+REVENUE_STATUSES = {"completed", "checked_in", "booked"}
+
+TREATMENT_EQUIPMENT = {"Pico Laser": "PicoSure", "Thermage": "Thermage FLX", "Ultherapy": "Ulthera"}
+
+# 12:00 - 20:45 in 15 minute slots, same as the legacy generator
+TIME_SLOTS = [f"{h:02d}:{m:02d}:00" for h in range(12, 21) for m in (0, 15, 30, 45)]
+
+APPOINTMENT_COLUMNS = [
+    'appointment_id', 'date', 'time', 'customer_id', 'age', 'gender', 'is_new',
+    'purchased_services', 'doctor_name', 'staff_role', 'assistant_name',
+    'service_item', 'status', 'room', 'equipment', 'amount'
+]
+LEGACY_COLUMNS = [
+    'customer_id', 'name', 'gender', 'age', 'visit_date', 'visit_time', 'treatment_type',
+    'doctor', 'nurse', 'room_id', 'is_new', 'source', 'status', 'revenue'
+]
+
+
+def parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def day_weights(start, end):
+    """Relative demand per calendar day in [start, end]."""
+    days = (end - start).days + 1
+    weights = np.empty(days)
+    for i in range(days):
+        d = start + timedelta(days=i)
+        weights[i] = WEEKDAY_WEIGHTS[d.weekday()] * MONTH_FACTORS[d.month - 1]
+    return weights / weights.sum()
+
+
+def build_lookups(start, end, today):
+    """Text tables that integer codes index into; built once per run."""
+    days = (end - start).days + 1
+    status_names = APPOINTMENT_STATUSES + ["booked"]
+    return {
+        'dates': np.array([(start + timedelta(days=i)).isoformat() for i in range(days)], dtype=object),
+        'future_from': max(0, min(days, (today - start).days + 1)),
+        'times': np.array(TIME_SLOTS, dtype=object),
+        'treatments': np.array([t['name'] for t in TREATMENTS], dtype=object),
+        'prices': np.array([str(t['price']) for t in TREATMENTS] + ["0"], dtype=object),
+        'equipment': np.array([TREATMENT_EQUIPMENT.get(t['name'], "") for t in TREATMENTS], dtype=object),
+        'doctors': np.array(DOCTORS, dtype=object),
+        'staff_roles': np.array(["doctor"] * len(DOCTORS), dtype=object),
+        'nurses': np.array(NURSES, dtype=object),
+        'rooms': np.array(ROOMS, dtype=object),
+        'sources': np.array(SOURCES, dtype=object),
+        'statuses': np.array(status_names, dtype=object),
+        'legacy_statuses': np.array([LEGACY_STATUS[s] for s in status_names], dtype=object),
+        'revenue_status': np.array([s in REVENUE_STATUSES for s in status_names]),
+        'ages': np.array([str(a) for a in range(121)], dtype=object),
+    }
+
+
+def generate_chunk(rng, lookups, first_id, n, day_p, num_customers):
+    """Draw one chunk of visits as integer code columns."""
+    day = rng.choice(len(day_p), size=n, p=day_p)
+    status = rng.choice(len(APPOINTMENT_STATUSES), size=n, p=STATUS_WEIGHTS)
+    status[day >= lookups['future_from']] = len(APPOINTMENT_STATUSES)  # booked
+
+    customer = rng.integers(0, num_customers, size=n)
+    return {
+        'id': np.arange(first_id, first_id + n),
+        'day': day,
+        'time': rng.integers(0, len(TIME_SLOTS), size=n),
+        'treatment': rng.integers(0, len(TREATMENTS), size=n),
+        'doctor': rng.integers(0, len(DOCTORS), size=n),
+        'nurse': rng.integers(0, len(NURSES), size=n),
+        'room': rng.integers(0, len(ROOMS), size=n),
+        'source': rng.integers(0, len(SOURCES), size=n),
+        'status': status,
+        'is_new': rng.random(n) < 0.2,
+        'customer': customer,
+        # Age and gender are a pure function of the customer, so repeat visits agree
+        'age': 20 + (customer * 7919) % 41,
+        'female': (customer * 2654435761) % 4 != 0,
+    }
+
+
+def _customer_ids(chunk):
+    # Shared by both layouts, so format once per chunk
+    if 'customer_id' not in chunk:
+        chunk['customer_id'] = [f"C{c:07d}" for c in chunk['customer'].tolist()]
+    return chunk['customer_id']
+
+
+def _revenue(chunk, lookups):
+    treatment = chunk['treatment']
+    paid = lookups['revenue_status'][chunk['status']]
+    return lookups['prices'][np.where(paid, treatment, len(TREATMENTS))]
+
+
+def format_appointments(chunk, lookups):
+    """Render a chunk in the appointments.csv layout read by DataStore."""
+    service = lookups['treatments'][chunk['treatment']]
+    columns = [
+        [f"A{i:08d}" for i in chunk['id'].tolist()],
+        lookups['dates'][chunk['day']],
+        lookups['times'][chunk['time']],
+        _customer_ids(chunk),
+        lookups['ages'][chunk['age']],
+        np.where(chunk['female'], "female", "male"),
+        np.where(chunk['is_new'], "yes", "no"),
+        service,
+        lookups['doctors'][chunk['doctor']],
+        lookups['staff_roles'][chunk['doctor']],
+        lookups['nurses'][chunk['nurse']],
+        service,
+        lookups['statuses'][chunk['status']],
+        lookups['rooms'][chunk['room']],
+        lookups['equipment'][chunk['treatment']],
+        _revenue(chunk, lookups),
+    ]
+    return _join_rows(columns)
+
+
+def format_legacy(chunk, lookups):
+    """Render a chunk in the legacy customers.csv / customer_visits.csv layout."""
+    columns = [
+        _customer_ids(chunk),
+        [f"Guest_{c}" for c in chunk['customer'].tolist()],
+        np.where(chunk['female'], "F", "M"),
+        lookups['ages'][chunk['age']],
+        lookups['dates'][chunk['day']],
+        lookups['times'][chunk['time']],
+        lookups['treatments'][chunk['treatment']],
+        lookups['doctors'][chunk['doctor']],
+        lookups['nurses'][chunk['nurse']],
+        lookups['rooms'][chunk['room']],
+        np.where(chunk['is_new'], "TRUE", "FALSE"),
+        lookups['sources'][chunk['source']],
+        lookups['legacy_statuses'][chunk['status']],
+        _revenue(chunk, lookups),
+    ]
+    return _join_rows(columns)
+
+
+def _join_rows(columns):
+    columns = [c.tolist() if isinstance(c, np.ndarray) else c for c in columns]
+    return "\n".join(map(",".join, zip(*columns))) + "\n"
+
+
+def write_scale_files(out_dir, rows, seed, start, end, today, chunk_size=CHUNK_SIZE,
+                      legacy=True, seed_key=(), first_id=0, num_customers=None, suffix=""):
+    """Stream `rows` visits to appointments.csv (and customers.csv) in `out_dir`.
+
+    `seed_key` is appended to the seed so callers can carve independent
+    streams out of one master seed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    lookups = build_lookups(start, end, today)
+    day_p = day_weights(start, end)
+    num_customers = num_customers or max(1, rows // 4)
+
+    appt_path = os.path.join(out_dir, f"appointments{suffix}.csv")
+    legacy_path = os.path.join(out_dir, f"customers{suffix}.csv")
+    appt_f = open(appt_path, 'w', newline='', encoding='utf-8')
+    legacy_f = open(legacy_path, 'w', newline='', encoding='utf-8') if legacy else None
+    try:
+        appt_f.write(",".join(APPOINTMENT_COLUMNS) + "\n")
+        if legacy_f:
+            legacy_f.write(",".join(LEGACY_COLUMNS) + "\n")
+
+        for k, lo in enumerate(range(0, rows, chunk_size)):
+            n = min(chunk_size, rows - lo)
+            rng = np.random.default_rng([seed, *seed_key, k])
+            chunk = generate_chunk(rng, lookups, first_id + lo, n, day_p, num_customers)
+            appt_f.write(format_appointments(chunk, lookups))
+            if legacy_f:
+                legacy_f.write(format_legacy(chunk, lookups))
+    finally:
+        appt_f.close()
+        if legacy_f:
+            legacy_f.close()
+    return [appt_path] + ([legacy_path] if legacy else [])
+
+
+# ---------------------------------------------------------------------------
+# Sharded mode: one shard per calendar month, spread over a process pool
+# ---------------------------------------------------------------------------
+# Shards are defined by the date range alone (never by --workers), each one
+# is seeded from (seed, year, month) and owns a fixed appointment_id range,
+# so the bytes written for a given seed do not depend on how many workers run.
+
+SHARD_DIR = "shards"
+
+
+def plan_month_shards(rows, start, end):
+    """Split [start, end] into month shards and allocate rows by demand weight.
+
+    Returns a list of (key, shard_start, shard_end, first_id, shard_rows).
+    """
+    weights = day_weights(start, end)
+    spans = []
+    cursor = start
+    while cursor <= end:
+        next_month = (cursor.replace(day=28) + timedelta(days=4)).replace(day=1)
+        shard_end = min(end, next_month - timedelta(days=1))
+        lo, hi = (cursor - start).days, (shard_end - start).days + 1
+        spans.append((cursor, shard_end, weights[lo:hi].sum()))
+        cursor = next_month
+
+    # Largest-remainder allocation keeps the total exactly equal to `rows`
+    exact = np.array([w for _, _, w in spans]) * rows
+    alloc = np.floor(exact).astype(np.int64)
+    for i in np.argsort(-(exact - alloc), kind='stable')[:rows - alloc.sum()]:
+        alloc[i] += 1
+
+    plan = []
+    first_id = 0
+    for (shard_start, shard_end, _), n in zip(spans, alloc.tolist()):
+        plan.append((shard_start.strftime('%Y-%m'), shard_start, shard_end, first_id, n))
+        first_id += n
+    return plan
+
+
+def _write_shard(job):
+    out_dir, key, shard_start, shard_end, first_id, n, seed, today, chunk_size, legacy, num_customers = job
+    return write_scale_files(out_dir, n, seed, shard_start, shard_end, today, chunk_size=chunk_size,
+                             legacy=legacy, seed_key=(shard_start.year, shard_start.month),
+                             first_id=first_id, num_customers=num_customers, suffix=f".{key}")
+
+
+def concat_shards(shard_paths, out_path):
+    """Stitch shard files together as raw bytes, keeping only the first header."""
+    with open(out_path, 'wb') as out:
+        for i, path in enumerate(shard_paths):
+            with open(path, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out, 1024 * 1024)
+    return out_path
+
+
+def write_sharded_files(out_dir, rows, seed, start, end, today, workers=None, chunk_size=CHUNK_SIZE,
+                        legacy=True, concat=False):
+    shard_dir = os.path.join(out_dir, SHARD_DIR)
+    num_customers = max(1, rows // 4)
+    jobs = [(shard_dir, key, s, e, first_id, n, seed, today, chunk_size, legacy, num_customers)
+            for key, s, e, first_id, n in plan_month_shards(rows, start, end)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() preserves shard order, which concat relies on
+        results = list(pool.map(_write_shard, jobs))
+
+    paths = [p for shard_paths in results for p in shard_paths]
+    if concat:
+        names = ["appointments.csv"] + (["customers.csv"] if legacy else [])
+        paths = [concat_shards([shard_paths[i] for shard_paths in results], os.path.join(out_dir, name))
+                 for i, name in enumerate(names)]
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Relational mode: fixtures consistent with public/data master tables
+# ---------------------------------------------------------------------------
+# Usage: python generate_data.py --rows 200_000 --masters public/data --out build/fixtures
+#
+# staff.csv / services.csv / rooms.csv / equipment.csv are indexed once into
+# NumPy tables. Every visit is executed by an active staff member who is
+# certified for the service, has the service's executor_role and works that
+# weekday; executed visits book duration + buffer_time minutes against the
+# staff member's max_hours_per_week for that ISO week. Visits that cannot be
+# placed under any cap are dropped and reported. appointments.csv,
+# customer_visits.csv, staff_workload.csv and customers_profile.csv are all
+# derived from the same rows.
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+ASSIGN_ATTEMPTS = 4
+# Spare capacity when sizing the roster: assignment is random, so caps bind before 100%
+ROSTER_HEADROOM = 1.25
+MAX_HALL_SERVICES = 16
+
+# services.csv category -> rooms.csv room_type, where the names differ
+CATEGORY_ROOM_TYPE = {"inject": "procedure", "drip": "iv"}
+
+# Statuses that put minutes on a staff member's schedule
+WORKLOAD_STATUSES = {"completed", "checked_in", "booked"}
+
+WORKLOAD_COLUMNS = ['date', 'staff_id', 'staff_name', 'staff_type', 'staff_role', 'cases', 'minutes', 'week']
+PROFILE_COLUMNS = ['customer_id', 'gender', 'age', 'birth_year', 'age_group',
+                   'first_visit_date', 'last_visit_date', 'visit_count']
+
+
+def read_master_csv(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return [{k.strip(): (v or "").strip() for k, v in row.items()} for row in csv.DictReader(f)]
+
+
+def parse_availability(value):
+    """'Mon-Sat|AM/PM (rotate)' -> {0, 1, 2, 3, 4, 5}"""
+    span = value.split('|')[0].strip()
+    first, _, last = span.partition('-')
+    try:
+        lo = WEEKDAY_NAMES.index(first.strip())
+        hi = WEEKDAY_NAMES.index((last or first).strip())
+    except ValueError:
+        return set(range(5))
+    return set(range(lo, hi + 1))
+
+
+def age_group(age):
+    if age <= 25:
+        return "18-25"
+    if age <= 35:
+        return "26-35"
+    if age <= 45:
+        return "36-45"
+    if age <= 60:
+        return "46-60"
+    return "60+"
+
+
+class RosterTooSmall(Exception):
+    """The staff roster cannot take the requested number of visits."""
+
+
+def clone_roster(staff, copies):
+    """The roster repeated `copies` times; copy k > 1 gets "-k" on its staff_id and staff_name."""
+    if copies <= 1:
+        return staff
+    return staff + [dict(r, staff_id=f"{r['staff_id']}-{k}", staff_name=f"{r['staff_name']}-{k}")
+                    for k in range(2, copies + 1) for r in staff]
+
+
+def build_master_index(data_dir, start, end, today, copies=1):
+    """Read the master tables once and build the lookup/candidate tables."""
+    roster = clone_roster(read_master_csv(os.path.join(data_dir, 'staff.csv')), copies)
+    staff = [r for r in roster if r.get('status', 'active').lower() == 'active']
+    services = read_master_csv(os.path.join(data_dir, 'services.csv'))
+    rooms = read_master_csv(os.path.join(data_dir, 'rooms.csv'))
+    equipment = read_master_csv(os.path.join(data_dir, 'equipment.csv'))
+
+    certified = [set(filter(None, (x.strip() for x in r['certified_services'].split('|')))) for r in staff]
+    available = [parse_availability(r.get('availability', '')) for r in staff]
+    staff_types = [r['staff_type'].lower() for r in staff]
+
+    # cand[weekday, service, j] = j-th eligible staff index, padded with -1
+    candidates = [[[i for i in range(len(staff))
+                    if svc['service_name'] in certified[i]
+                    and staff_types[i] == svc['executor_role'].lower()
+                    and wd in available[i]]
+                   for svc in services] for wd in range(7)]
+    width = max(1, max(len(c) for per_wd in candidates for c in per_wd))
+    cand = np.full((7, len(services), width), -1, dtype=np.int64)
+    ncand = np.zeros((7, len(services)), dtype=np.int64)
+    for wd in range(7):
+        for j, c in enumerate(candidates[wd]):
+            cand[wd, j, :len(c)] = c
+            ncand[wd, j] = len(c)
+
+    unstaffed = [svc['service_name'] for j, svc in enumerate(services) if not ncand[:, j].any()]
+    if unstaffed:
+        print(f"Skipping services with no certified staff: {', '.join(unstaffed)}")
+
+    # Service mix per weekday, restricted to what can be staffed that day
+    service_p = np.zeros((7, len(services)))
+    for wd in range(7):
+        bookable = ncand[wd] > 0
+        if bookable.any():
+            service_p[wd, bookable] = 1.0 / bookable.sum()
+
+    # Only sample days on which the clinic can staff anything
+    day_p = day_weights(start, end)
+    open_weekdays = service_p.sum(axis=1) > 0
+    day_p = day_p * open_weekdays[(np.arange(len(day_p)) + start.weekday()) % 7]
+    if day_p.sum() > 0:
+        day_p /= day_p.sum()
+
+    room_by_type = {}
+    for r in rooms:
+        room_by_type.setdefault(r['room_type'], r['room_name'])
+    service_room, service_equipment = [], []
+    for svc in services:
+        keyword = svc['service_name'].split()[0]
+        match = next((e for e in equipment if e['equipment_name'].startswith(keyword)), None)
+        service_equipment.append(match['equipment_name'] if match else "")
+        category = svc['category']
+        service_room.append(match['room_name'] if match
+                            else room_by_type.get(CATEGORY_ROOM_TYPE.get(category, category), ""))
+
+    names = np.array([r['staff_name'] for r in staff], dtype=object)
+    lookups = build_lookups(start, end, today)
+    lookups.update({
+        'treatments': np.array([svc['service_name'] for svc in services], dtype=object),
+        'prices': np.array([str(int(float(svc['price'] or 0))) for svc in services] + ["0"], dtype=object),
+        'equipment': np.array(service_equipment, dtype=object),
+        'rooms': np.array(service_room, dtype=object),
+        # chunk['doctor'] and chunk['nurse'] both hold the executing staff index
+        'doctors': np.where(np.array(staff_types) == "doctor", names, ""),
+        'nurses': names,
+        'staff_roles': np.array(staff_types, dtype=object),
+        'day_p': day_p,
+        'service_p': service_p,
+        'cand': cand,
+        'ncand': ncand,
+        'service_duration': np.array([int(svc['duration'] or 0) for svc in services], dtype=np.int64),
+        'service_minutes': np.array([int(svc['duration'] or 0) + int(svc['buffer_time'] or 0)
+                                     for svc in services], dtype=np.int64),
+        'weekly_cap': np.array([int(r.get('max_hours_per_week') or 40) * 60 for r in staff], dtype=np.int64),
+        'workload_status': np.array([st in WORKLOAD_STATUSES for st in lookups['statuses']]),
+        'staff': staff,
+        'roster': roster,
+        'start_weekday': start.weekday(),
+    })
+    return lookups
+
+
+def roster_copies(lookups, rows):
+    """How many copies of the roster `rows` visits need so weekly caps do not drop any.
+
+    Per ISO week, the expected minutes of every set of services are compared
+    with the weekly caps of the staff certified for any of them. By Hall's
+    theorem the week can be staffed (fractionally) exactly when no set needs
+    more than that, so the tightest ratio, with headroom for the random
+    assignment, gives the number of copies. Past MAX_HALL_SERVICES services only
+    single services and the whole mix are checked.
+    """
+    start_weekday = lookups['start_weekday']
+    num_days = len(lookups['day_p'])
+    day = np.arange(num_days)
+    week = (day + start_weekday) // 7
+    # Booked (future) visits always count toward the cap; past ones only when realized
+    status_p = np.array(STATUS_WEIGHTS + [0.0])
+    realized = float((status_p * lookups['workload_status']).sum())
+    work = np.where(day >= lookups['future_from'], 1.0, realized)
+
+    # demand[week, service] in minutes
+    visits = rows * lookups['day_p'] * work
+    per_day = visits[:, None] * lookups['service_p'][(day + start_weekday) % 7] * lookups['service_minutes']
+    demand = np.zeros((week.max() + 1, per_day.shape[1]))
+    np.add.at(demand, week, per_day)
+
+    cap = lookups['weekly_cap'].astype(float)
+    cand, ncand = lookups['cand'], lookups['ncand']
+    eligible = np.zeros((cand.shape[1], len(cap)), dtype=bool)
+    for wd in range(7):
+        for j in range(cand.shape[1]):
+            eligible[j, cand[wd, j, :ncand[wd, j]]] = True
+    staffed = np.flatnonzero(eligible.any(axis=1))
+    if not len(staffed):
+        return 1
+
+    k = len(staffed)
+    if k <= MAX_HALL_SERVICES:
+        # Every non-empty subset of the staffed services, as rows of a 0/1 matrix
+        subsets = (np.arange(1, 1 << k)[:, None] >> np.arange(k)) & 1
+    else:
+        subsets = np.vstack((np.eye(k, dtype=np.int64), np.ones((1, k), dtype=np.int64)))
+    subset_cap = ((subsets @ eligible[staffed]) > 0) @ cap
+    subset_demand = demand[:, staffed] @ subsets.T
+    need = (subset_demand / subset_cap).max()
+    return max(1, math.ceil(need * ROSTER_HEADROOM))
+
+
+def assign_staff(rng, lookups, weekday, week, service, minutes, used):
+    """Pick a certified staff member per visit without breaking weekly caps.
+
+    `used` is a flat (week * num_staff + staff) minute counter shared across
+    chunks. Each visit first tries ASSIGN_ATTEMPTS random candidates; the few
+    left over then try every candidate in turn, so a visit is only dropped when
+    all of its certified staff are full that week. Returns staff indices with
+    -1 for visits that could not be placed.
+    """
+    num_staff = len(lookups['nurses'])
+    cap = lookups['weekly_cap']
+    staff = np.full(len(service), -1, dtype=np.int64)
+    pending = np.arange(len(service))
+
+    for attempt in range(ASSIGN_ATTEMPTS + lookups['cand'].shape[2]):
+        if not len(pending):
+            break
+        wd, svc = weekday[pending], service[pending]
+        if attempt < ASSIGN_ATTEMPTS:
+            pick = (rng.random(len(pending)) * lookups['ncand'][wd, svc]).astype(np.int64)
+        else:
+            pending = pending[lookups['ncand'][wd, svc] > attempt - ASSIGN_ATTEMPTS]
+            if not len(pending):
+                break
+            wd, svc = weekday[pending], service[pending]
+            pick = np.full(len(pending), attempt - ASSIGN_ATTEMPTS, dtype=np.int64)
+        candidate = lookups['cand'][wd, svc, pick]
+        key = week[pending] * num_staff + candidate
+        cost = minutes[pending]
+
+        # Running minutes per (week, staff) in row order, on top of earlier chunks
+        order = np.argsort(key, kind='stable')
+        sorted_key, sorted_cost = key[order], cost[order]
+        running = np.cumsum(sorted_cost)
+        group_start = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+        offset = (running - sorted_cost)[group_start][np.cumsum(group_start) - 1]
+        fits_sorted = running - offset + used[sorted_key] <= cap[candidate[order]]
+        fits = np.empty_like(fits_sorted)
+        fits[order] = fits_sorted
+
+        staff[pending[fits]] = candidate[fits]
+        used += np.bincount(key[fits], weights=cost[fits], minlength=len(used)).astype(np.int64)
+        pending = pending[~fits]
+    return staff
+
+
+def generate_relational_chunk(rng, lookups, first_id, n, num_customers, used, day=None):
+    """Draw `n` visits (all on day index `day` if given) and assign staff; unplaceable visits are dropped."""
+    start_weekday = lookups['start_weekday']
+    if day is None:
+        day = rng.choice(len(lookups['day_p']), size=n, p=lookups['day_p'])
+    else:
+        day = np.full(n, day, dtype=np.int64)
+    weekday = (day + start_weekday) % 7
+    week = (day + start_weekday) // 7
+
+    service = np.empty(n, dtype=np.int64)
+    for wd in range(7):
+        mask = weekday == wd
+        if mask.any():
+            service[mask] = rng.choice(lookups['service_p'].shape[1], size=mask.sum(), p=lookups['service_p'][wd])
+
+    status = rng.choice(len(APPOINTMENT_STATUSES), size=n, p=STATUS_WEIGHTS)
+    status[day >= lookups['future_from']] = len(APPOINTMENT_STATUSES)
+    minutes = lookups['service_minutes'][service] * lookups['workload_status'][status]
+
+    staff = assign_staff(rng, lookups, weekday, week, service, minutes, used)
+    keep = staff >= 0
+    kept = int(keep.sum())
+
+    customer = rng.integers(0, num_customers, size=n)[keep]
+    return {
+        'id': np.arange(first_id, first_id + kept),
+        'day': day[keep],
+        'time': rng.integers(0, len(TIME_SLOTS), size=n)[keep],
+        'treatment': service[keep],
+        'doctor': staff[keep],
+        'nurse': staff[keep],
+        'room': service[keep],
+        'source': rng.integers(0, len(SOURCES), size=n)[keep],
+        'status': status[keep],
+        'minutes': minutes[keep],
+        'is_new': (rng.random(n) < 0.2)[keep],
+        'customer': customer,
+        'age': 20 + (customer * 7919) % 41,
+        'female': (customer * 2654435761) % 4 != 0,
+    }
+
+
+def write_staff_workload(path, lookups, start, cases, minutes):
+    """One row per (day, staff), like the hand-built staff_workload.csv."""
+    staff = lookups['staff']
+    num_days = cases.shape[0]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(",".join(WORKLOAD_COLUMNS) + "\n")
+        prefix = [f"{r['staff_id']},{r['staff_name']},{r['staff_type']},{r['staff_type']}," for r in staff]
+        for d in range(num_days):
+            day = start + timedelta(days=d)
+            iso = day.isoformat()
+            week = day.isocalendar()[1]
+            f.write("".join(f"{iso},{prefix[i]}{cases[d, i]},{minutes[d, i]},{week}\n" for i in range(len(staff))))
+
+
+def write_customer_profiles(path, lookups, today, first_day, last_day, visits):
+    seen = np.flatnonzero(visits)
+    age = 20 + (seen * 7919) % 41
+    female = (seen * 2654435761) % 4 != 0
+    dates = lookups['dates']
+    groups = {a: age_group(a) for a in range(121)}
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(",".join(PROFILE_COLUMNS) + "\n")
+        for lo in range(0, len(seen), CHUNK_SIZE):
+            sl = slice(lo, lo + CHUNK_SIZE)
+            f.write("".join(
+                f"C{c:07d},{'female' if fem else 'male'},{a},{today.year - a},{groups[a]},{dates[fd]},{dates[ld]},{v}\n"
+                for c, fem, a, fd, ld, v in zip(seen[sl].tolist(), female[sl].tolist(), age[sl].tolist(),
+                                                first_day[seen[sl]].tolist(), last_day[seen[sl]].tolist(),
+                                                visits[seen[sl]].tolist())))
+
+
+def write_roster(path, roster):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(roster[0]))
+        writer.writeheader()
+        writer.writerows(roster)
+
+
+def write_relational_files(out_dir, data_dir, rows, seed, start, end, today, chunk_size=CHUNK_SIZE,
+                           staff_copies=None):
+    """Write the relational fixture; returns (paths, rows written).
+
+    The roster is fixed and weekly caps are enforced, so it is cloned
+    `staff_copies` times, by default as many as roster_copies estimates. If
+    the estimate still drops visits, the fixture is regenerated with one more
+    copy. The roster used is written to out_dir/staff.csv so the fixture joins
+    on its own. An explicit `staff_copies` that cannot hold every visit raises
+    RosterTooSmall.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    roster_path = os.path.join(out_dir, 'staff.csv')
+    in_place = os.path.abspath(roster_path) == os.path.abspath(os.path.join(data_dir, 'staff.csv'))
+    copies = staff_copies or roster_copies(build_master_index(data_dir, start, end, today), rows)
+    while True:
+        if copies > 1 and in_place:
+            raise RosterTooSmall(f"{rows:,} visits need {copies} copies of the staff roster; "
+                                 f"use an --out directory other than {data_dir} so staff.csv is not overwritten")
+        lookups = build_master_index(data_dir, start, end, today, copies=copies)
+        if copies > 1:
+            print(f"Staff roster cloned x{copies} ({len(lookups['staff'])} active staff) to fit {rows:,} visits")
+        paths, written = _write_relational(out_dir, lookups, rows, seed, start, today, chunk_size)
+        if written == rows:
+            break
+        if staff_copies:
+            raise RosterTooSmall(f"Only {written:,} of {rows:,} visits fit the staff roster x{copies} under "
+                                 f"max_hours_per_week; pass a larger --staff-copies")
+        print(f"  {rows - written:,} visits did not fit; retrying with x{copies + 1}")
+        copies += 1
+
+    if not in_place:
+        write_roster(roster_path, lookups['roster'])
+        paths.append(roster_path)
+    return paths, written
+
+
+def _write_relational(out_dir, lookups, rows, seed, start, today, chunk_size):
+    num_days = len(lookups['dates'])
+    num_staff = len(lookups['nurses'])
+    num_weeks = (num_days + start.weekday()) // 7 + 1
+    num_customers = max(1, rows // 4)
+
+    used = np.zeros(num_weeks * num_staff, dtype=np.int64)
+    cases = np.zeros(num_days * num_staff, dtype=np.int64)
+    minutes = np.zeros(num_days * num_staff, dtype=np.int64)
+    first_day = np.full(num_customers, num_days, dtype=np.int64)
+    last_day = np.full(num_customers, -1, dtype=np.int64)
+    visits = np.zeros(num_customers, dtype=np.int64)
+
+    appt_path = os.path.join(out_dir, "appointments.csv")
+    visits_path = os.path.join(out_dir, "customer_visits.csv")
+    written = 0
+    with open(appt_path, 'w', newline='', encoding='utf-8') as appt_f, \
+            open(visits_path, 'w', newline='', encoding='utf-8') as visits_f:
+        appt_f.write(",".join(APPOINTMENT_COLUMNS) + "\n")
+        visits_f.write(",".join(LEGACY_COLUMNS) + "\n")
+
+        for k, lo in enumerate(range(0, rows, chunk_size)):
+            n = min(chunk_size, rows - lo)
+            rng = np.random.default_rng([seed, k])
+            chunk = generate_relational_chunk(rng, lookups, written, n, num_customers, used)
+            written += len(chunk['id'])
+
+            slot = chunk['day'] * num_staff + chunk['nurse']
+            worked = chunk['minutes'] > 0
+            cases += np.bincount(slot[worked], minlength=len(cases))
+            minutes += np.bincount(slot, weights=chunk['minutes'], minlength=len(minutes)).astype(np.int64)
+            np.minimum.at(first_day, chunk['customer'], chunk['day'])
+            np.maximum.at(last_day, chunk['customer'], chunk['day'])
+            visits += np.bincount(chunk['customer'], minlength=num_customers)
+
+            appt_f.write(format_appointments(chunk, lookups))
+            visits_f.write(format_legacy(chunk, lookups))
+
+    workload_path = os.path.join(out_dir, "staff_workload.csv")
+    profile_path = os.path.join(out_dir, "customers_profile.csv")
+    write_staff_workload(workload_path, lookups, start,
+                         cases.reshape(num_days, num_staff), minutes.reshape(num_days, num_staff))
+    write_customer_profiles(profile_path, lookups, today, first_day, last_day, visits)
+
+    return [appt_path, visits_path, workload_path, profile_path], written
+
+
+# ---------------------------------------------------------------------------
+# Tick mode: append simulated days to an existing fixture directory
+# ---------------------------------------------------------------------------
+# Usage: python generate_data.py tick --days 1 --dir build/fixtures
+#
+# Only file tails are read. staff_workload.csv is the clock: its last complete
+# day is the last simulated day, and it is appended last, so rows left behind
+# by an interrupted tick are cut off on the next run. Every day is seeded from
+# (seed, date), so re-running a tick (or --until the same date) reproduces the
+# same bytes. New days are written as "booked"; once the clock moves past a
+# day, its booked rows get a final status in appointments_status_delta.csv
+# instead of a rewrite of appointments.csv.
+
+STATUS_DELTA_FILE = "appointments_status_delta.csv"
+STATUS_DELTA_COLUMNS = ['appointment_id', 'date', 'status']
+EQUIPMENT_LOG_COLUMNS = ['log_id', 'date', 'time', 'equipment_name', 'staff_name', 'duration_min', 'status']
+TAIL_BLOCK = 64 * 1024
+
+
+def iter_lines_reversed(path):
+    """Yield (offset, line) pairs from the end of a file, reading backwards in blocks."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        buf = b""
+        while pos > 0:
+            step = min(TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + buf).split(b"\n")
+            buf = lines[0]  # may continue before `pos`
+            offset = pos + len(buf) + 1
+            complete = []
+            for line in lines[1:]:
+                complete.append((offset, line))
+                offset += len(line) + 1
+            for line_offset, line in reversed(complete):
+                if line.strip():
+                    yield line_offset, line
+        if buf.strip():
+            yield 0, buf
+
+
+def read_header(path):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return f.readline().rstrip("\r\n").split(',')
+
+
+def read_tail(path, stop):
+    """Data rows from the end of `path`, newest first, up to the first row where `stop(row)` is true.
+
+    Returns (rows, byte offset of the oldest returned row).
+    """
+    header = read_header(path)
+    rows, first_offset = [], None
+    for offset, line in iter_lines_reversed(path):
+        if offset == 0:
+            break  # header
+        row = dict(zip(header, line.decode('utf-8').rstrip("\r").split(',')))
+        if stop(row):
+            break
+        rows.append(row)
+        first_offset = offset
+    return rows, first_offset
+
+
+def last_row(path):
+    """Newest data row of `path`, or None."""
+    if not os.path.exists(path):
+        return None
+    for offset, line in iter_lines_reversed(path):
+        if offset == 0:
+            return None  # header only
+        return dict(zip(read_header(path), line.decode('utf-8').rstrip("\r").split(',')))
+    return None
+
+
+def truncate_after(path, clock):
+    """Cut trailing rows dated after `clock`, left behind by an interrupted tick."""
+    if not os.path.exists(path):
+        return
+    rows, offset = read_tail(path, lambda row: row['date'] <= clock)
+    if rows:
+        with open(path, 'r+b') as f:
+            f.truncate(offset)
+        print(f"Recovered {path}: dropped {len(rows)} rows after {clock}")
+
+
+def last_complete_day(workload_path, staff_count):
+    """Last date with a full staff grid in staff_workload.csv, trimming a partial trailing day."""
+    while True:
+        last = last_row(workload_path)
+        if last is None:
+            raise SystemExit(f"{workload_path} has no rows to continue from")
+        rows, offset = read_tail(workload_path, lambda row: row['date'] != last['date'])
+        if len(rows) >= staff_count:
+            return last['date']
+        with open(workload_path, 'r+b') as f:
+            f.truncate(offset)
+        print(f"Recovered {workload_path}: dropped partial day {last['date']}")
+
+
+def id_counter(value):
+    """'A00000123' / 'E0199' -> 123 / 199"""
+    digits = value.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+    return int(digits) if digits.isdigit() else -1
+
+
+def ensure_header(path, columns):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            f.write(",".join(columns) + "\n")
+
+
+def final_statuses(seed, day, ids):
+    """Outcome of one day's booked visits; a pure function of (seed, day, ids)."""
+    rng = np.random.default_rng([seed, day.toordinal(), 1])
+    picks = rng.choice(len(APPOINTMENT_STATUSES), size=len(ids), p=STATUS_WEIGHTS)
+    return "".join(f"{i},{day.isoformat()},{APPOINTMENT_STATUSES[k]}\n" for i, k in zip(ids, picks.tolist()))
+
+
+def tick(data_dir, masters_dir, seed, days=None, until=None, per_day=80, num_customers=20_000):
+    workload_path = os.path.join(data_dir, "staff_workload.csv")
+    appt_path = os.path.join(data_dir, "appointments.csv")
+    equip_path = os.path.join(data_dir, "equipment_log.csv")
+    delta_path = os.path.join(data_dir, STATUS_DELTA_FILE)
+
+    staff_count = sum(1 for r in read_master_csv(os.path.join(masters_dir, 'staff.csv'))
+                      if r.get('status', 'active').lower() == 'active')
+    clock = parse_day(last_complete_day(workload_path, staff_count))
+    resumed = os.path.exists(delta_path)  # earlier ticks wrote the clock day themselves
+    if resumed:
+        for path in (appt_path, equip_path, delta_path):
+            truncate_after(path, clock.isoformat())
+    ensure_header(appt_path, APPOINTMENT_COLUMNS)
+    ensure_header(equip_path, EQUIPMENT_LOG_COLUMNS)
+    ensure_header(delta_path, STATUS_DELTA_COLUMNS)
+
+    target = until or clock + timedelta(days=days)
+    if target <= clock:
+        print(f"Already simulated through {clock}; nothing to do")
+        return 0
+
+    first_day = clock + timedelta(days=1)
+    lookups = build_master_index(masters_dir, first_day, target, today=clock)  # everything new is booked
+    staff = lookups['staff']
+    num_staff = len(staff)
+    num_days = len(lookups['dates'])
+    num_weeks = (num_days + first_day.weekday()) // 7 + 1
+
+    # Minutes already booked earlier in the ISO week that the first new day falls in
+    used = np.zeros(num_weeks * num_staff, dtype=np.int64)
+    monday = (first_day - timedelta(days=first_day.weekday())).isoformat()
+    staff_index = {r['staff_id']: i for i, r in enumerate(staff)}
+    week_rows, _ = read_tail(workload_path, lambda row: row['date'] < monday)
+    for row in week_rows:
+        if row['staff_id'] in staff_index:
+            used[staff_index[row['staff_id']]] += int(row['minutes'] or 0)
+
+    last_appt = last_row(appt_path)
+    last_equip = last_row(equip_path)
+    next_id = id_counter(last_appt['appointment_id']) + 1 if last_appt else 0
+    next_log = id_counter(last_equip['log_id']) + 1 if last_equip else 0
+
+    # The previous tick left the clock day booked; finalize it unless already done
+    delta = []
+    last_delta = last_row(delta_path)
+    if resumed and (last_delta is None or last_delta['date'] < clock.isoformat()):
+        clock_rows, _ = read_tail(appt_path, lambda row: row['date'] < clock.isoformat())
+        ids = [r['appointment_id'] for r in reversed(clock_rows)
+               if r['date'] == clock.isoformat() and r['status'] == 'booked']
+        delta.append(final_statuses(seed, clock, ids))
+
+    appt_chunks, equip_chunks, workload_chunks = [], [], []
+    for d in range(num_days):
+        day = first_day + timedelta(days=d)
+        rng = np.random.default_rng([seed, day.toordinal()])
+        n = 0
+        if lookups['day_p'][d] > 0:
+            n = int(rng.poisson(per_day * WEEKDAY_WEIGHTS[day.weekday()] * MONTH_FACTORS[day.month - 1]))
+        chunk = generate_relational_chunk(rng, lookups, next_id, n, num_customers, used, day=d)
+        next_id += len(chunk['id'])
+        appt_chunks.append(format_appointments(chunk, lookups) if n else "")
+
+        staff_of = chunk['nurse']
+        cases = np.bincount(staff_of[chunk['minutes'] > 0], minlength=num_staff)
+        minutes = np.bincount(staff_of, weights=chunk['minutes'], minlength=num_staff).astype(np.int64)
+        week = day.isocalendar()[1]
+        workload_chunks.append("".join(
+            f"{day.isoformat()},{r['staff_id']},{r['staff_name']},{r['staff_type']},{r['staff_type']},"
+            f"{cases[i]},{minutes[i]},{week}\n" for i, r in enumerate(staff)))
+
+        for t, svc, s in zip(chunk['time'].tolist(), chunk['treatment'].tolist(), staff_of.tolist()):
+            equipment = lookups['equipment'][svc]
+            if equipment:
+                equip_chunks.append(f"E{next_log:04d},{day.isoformat()},{TIME_SLOTS[t]},{equipment},"
+                                    f"{lookups['nurses'][s]},{lookups['service_duration'][svc]},Normal\n")
+                next_log += 1
+
+        if day < target:
+            delta.append(final_statuses(seed, day, [f"A{i:08d}" for i in chunk['id'].tolist()]))
+
+    # staff_workload.csv goes last: it is what marks the days as done
+    for path, parts in ((appt_path, appt_chunks), (equip_path, equip_chunks),
+                        (delta_path, delta), (workload_path, workload_chunks)):
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            f.write("".join(parts))
+
+    print(f"Simulated {first_day} .. {target}: {sum(c.count(chr(10)) for c in appt_chunks):,} appointments")
+    return num_days
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate clinic CSV fixtures.")
+    parser.add_argument('--rows', type=int, help="Scale mode: number of visits to generate (e.g. 5_000_000)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='.', help="Output directory")
+    parser.add_argument('--start', type=parse_day, default=SCALE_START)
+    parser.add_argument('--end', type=parse_day, default=SCALE_END)
+    parser.add_argument('--today', type=parse_day, default=SCALE_TODAY,
+                        help="Visits after this day are generated as booked")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--no-legacy', action='store_true', help="Only write appointments.csv")
+    parser.add_argument('--workers', type=int,
+                        help="Sharded mode: write one file per month using this many processes")
+    parser.add_argument('--concat', action='store_true',
+                        help="Sharded mode: also stitch shards into single appointments.csv / customers.csv")
+    parser.add_argument('--masters', metavar='DIR',
+                        help="Relational mode: derive staff/services/rooms from the master CSVs in DIR")
+    parser.add_argument('--staff-copies', type=int,
+                        help="Relational mode: clone the staff roster this many times (default: sized to --rows)")
+
+    commands = parser.add_subparsers(dest='command')
+    tick_parser = commands.add_parser('tick', help="Append simulated days to an existing fixture directory")
+    span = tick_parser.add_mutually_exclusive_group(required=True)
+    span.add_argument('--days', type=int, help="Append this many days after the last simulated day")
+    span.add_argument('--until', type=parse_day, help="Append days up to and including this date")
+    tick_parser.add_argument('--dir', default='public/data', help="Directory holding the CSVs to extend")
+    tick_parser.add_argument('--masters', default='public/data', metavar='DIR')
+    tick_parser.add_argument('--seed', type=int, default=0)
+    tick_parser.add_argument('--per-day', type=int, default=80, help="Average visits per open day")
+    tick_parser.add_argument('--customers', type=int, default=20_000, help="Size of the customer pool")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'tick':
+        t0 = time.perf_counter()
+        tick(args.dir, args.masters, args.seed, days=args.days, until=args.until,
+             per_day=args.per_day, num_customers=args.customers)
+        print(f"Tick finished in {time.perf_counter() - t0:.2f}s")
+        return
+    if args.masters and args.workers:
+        parser.error("--masters tracks weekly staff caps across the whole range and cannot be sharded")
+
+    if args.rows is None:
+        # Original small demo dataset
+        generate_customers_csv()
+        generate_rooms_usage_csv()
+        return
+
+    t0 = time.perf_counter()
+    rows = args.rows
+    if args.masters:
+        try:
+            paths, rows = write_relational_files(args.out, args.masters, args.rows, args.seed, args.start,
+                                                 args.end, args.today, chunk_size=args.chunk_size,
+                                                 staff_copies=args.staff_copies)
+        except RosterTooSmall as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+    elif args.workers:
+        paths = write_sharded_files(args.out, args.rows, args.seed, args.start, args.end, args.today,
+                                    workers=args.workers, chunk_size=args.chunk_size,
+                                    legacy=not args.no_legacy, concat=args.concat)
+    else:
+        paths = write_scale_files(args.out, args.rows, args.seed, args.start, args.end, args.today,
+                                  chunk_size=args.chunk_size, legacy=not args.no_legacy)
+    elapsed = time.perf_counter() - t0
+    if args.workers and len(paths) > 4:
+        print(f"Wrote {len(paths)} shard files under {os.path.join(args.out, SHARD_DIR)}")
+    else:
+        for path in paths:
+            print(f"Wrote {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    print(f"{rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
 if __name__ == "__main__":
-    generate_customers_csv()
-    generate_rooms_usage_csv()
+    main()
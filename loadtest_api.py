@@ -0,0 +1,432 @@
+"""Asyncio load generator and latency benchmark for the backend API.
+
+Uploads generated appointment CSVs to POST /api/ingest/appointments at a chosen
+concurrency, while read workers hit the appointments, data-health and health
+routes. Reports throughput, p50/p95/p99 latency, status codes and error rates
+per route as JSON. Each report records the commit it ran against, so reports
+from different commits can be compared.
+
+Payloads come from generate_data.py's relational mode (--masters), so doctor
+and service references resolve and rows take the batched createMany path
+instead of quarantine. Each upload gets its own appointment_id range. No two
+payloads share a file hash (no 409 DUPLICATE_IMPORT), and append mode
+inserts rather than replaces. staff.csv and services.csv are ingested first so
+the reference tables exist.
+
+The ingest router rate-limits to 30 requests/min per IP. 429s are reported
+as `rate_limited` rather than errors, so raise MAX_REQUESTS in
+apps/backend/src/routes/ingest.ts for sustained ingest runs.
+
+/api/appointments and /api/data/health are not mounted by src/server.ts, so
+--start-backend runs apps/backend/scripts/loadtest-server.ts, which mounts them
+next to the production routes. Against a backend started some other way, pass
+--read for the routes it serves.
+
+The HTTP client is a small keep-alive HTTP/1.1 implementation on asyncio
+streams, so no third-party packages are needed.
+
+Usage:
+    python loadtest_api.py --base-url http://localhost:3000 --uploads 20 --rows 2000 --ingest-concurrency 4
+    python loadtest_api.py --start-backend --uploads 10 --read-concurrency 32 --out loadtest_result.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import generate_data
+
+DEFAULT_READS = [
+    ("/api/appointments?page=1&pageSize=50", 4),
+    ("/api/appointments?start_date=2025-01-01&end_date=2025-01-31&pageSize=200", 2),
+    ("/api/data/health", 2),
+    ("/api/health/db", 1),
+    ("/api/system/health", 1),
+]
+INGEST_PATH = "/api/ingest/appointments"
+SETUP_UPLOADS = [("/api/ingest/staff", "staff.csv"), ("/api/ingest/services", "services.csv")]
+
+# Rows generated for the fixture that payloads are cut from
+FIXTURE_ROWS = 60_000
+BACKEND_DIR = os.path.join("apps", "backend")
+# Relative to BACKEND_DIR; mounts the query routes that src/server.ts leaves out
+BACKEND_ENTRY = os.path.join("scripts", "loadtest-server.ts")
+STARTUP_TIMEOUT = 90
+
+
+# ---------- Minimal HTTP/1.1 client ----------
+
+class HttpConnection:
+    """One keep-alive connection; requests on it are sequential."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
+
+    async def request(self, method, path, body=b"", headers=None):
+        """(status, response body); reconnects once if the server closed the idle connection."""
+        for attempt in (0, 1):
+            if self.writer is None:
+                await self._connect()
+            try:
+                return await self._roundtrip(method, path, body, headers or {})
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _roundtrip(self, method, path, body, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', "").lower() == "chunked":
+            data = bytearray()
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                data += chunk[:-2]
+            payload = bytes(data)
+        else:
+            payload = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+
+        if response_headers.get('connection', "").lower() == "close":
+            await self.close()
+        return status, payload
+
+
+def multipart(filename, data, field="file"):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n").encode('utf-8') + data + f"\r\n--{boundary}--\r\n".encode('ascii')
+    return body, {'Content-Type': f"multipart/form-data; boundary={boundary}"}
+
+
+# ---------- Payloads ----------
+
+def load_fixture_lines(masters, seed, fixture=None):
+    """(header line, data lines) of an appointments.csv generated from the master tables."""
+    tmp = None
+    if fixture is None:
+        tmp = tempfile.mkdtemp(prefix="loadtest_")
+        generate_data.write_relational_files(tmp, masters, FIXTURE_ROWS, seed, generate_data.SCALE_START,
+                                             generate_data.SCALE_END, generate_data.SCALE_TODAY)
+        fixture = os.path.join(tmp, "appointments.csv")
+    try:
+        with open(fixture, 'rb') as f:
+            header = f.readline()
+            lines = [line for line in f if line.strip()]
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if not header.lstrip(b"\xef\xbb\xbf").startswith(b"appointment_id,"):
+        raise SystemExit("Fixture must have appointment_id as its first column")
+    if not lines:
+        raise SystemExit("Fixture has no rows")
+    return header, lines
+
+
+def build_payloads(header, lines, uploads, rows, run_id):
+    """One CSV per upload, cycling through the fixture with unique appointment_ids."""
+    payloads = []
+    cursor = 0
+    for u in range(uploads):
+        out = [header]
+        for r in range(rows):
+            rest = lines[cursor % len(lines)].split(b",", 1)[1]
+            out.append(f"L{run_id}-{u:04d}-{r:07d},".encode('ascii') + rest)
+            cursor += 1
+        payloads.append(b"".join(out))
+    return payloads
+
+
+# ---------- Load ----------
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # route -> [(latency_s, status)]
+
+    def add(self, route, latency, status):
+        self.samples.setdefault(route, []).append((latency, status))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    # Nearest-rank
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, elapsed, rows_per_request=None):
+    latencies = sorted(s[0] for s in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = sum(1 for _, s in samples if 200 <= s < 300)
+    limited = statuses.get("429", 0)
+    errors = len(samples) - ok - limited
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    stats = {
+        'requests': len(samples),
+        'ok': ok,
+        'rate_limited': limited,
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+        'status_codes': statuses,
+    }
+    if rows_per_request:
+        stats['rows_per_s'] = round(ok * rows_per_request / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+async def timed(conn, recorder, route, method, path, body=b"", headers=None):
+    t0 = time.perf_counter()
+    try:
+        status, _ = await conn.request(method, path, body, headers)
+    except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError):
+        status = 599  # transport failure
+        await conn.close()
+    recorder.add(route, time.perf_counter() - t0, status)
+    return status
+
+
+async def ingest_worker(host, port, queue, recorder, mode):
+    conn = HttpConnection(host, port)
+    try:
+        while True:
+            try:
+                index, payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            body, headers = multipart(f"loadtest_{index:04d}.csv", payload)
+            await timed(conn, recorder, "ingest", "POST", f"{INGEST_PATH}?mode={mode}", body, headers)
+    finally:
+        await conn.close()
+
+
+async def read_worker(host, port, reads, recorder, stop, rng):
+    conn = HttpConnection(host, port)
+    paths = [p for p, _ in reads]
+    weights = [w for _, w in reads]
+    try:
+        while not stop.is_set():
+            path = rng.choices(paths, weights)[0]
+            await timed(conn, recorder, path, "GET", path)
+    finally:
+        await conn.close()
+
+
+async def setup_references(host, port, masters):
+    conn = HttpConnection(host, port)
+    try:
+        for path, name in SETUP_UPLOADS:
+            with open(os.path.join(masters, name), 'rb') as f:
+                body, headers = multipart(name, f.read())
+            status, _ = await conn.request("POST", path, body, headers)
+            # 409: the same master file was already ingested
+            print(f"  setup {path}: HTTP {status}")
+    finally:
+        await conn.close()
+
+
+async def run_load(base_url, payloads, reads, args):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    if not args.skip_setup:
+        await setup_references(host, port, args.masters)
+
+    recorder = Recorder()
+    queue = asyncio.Queue()
+    for item in enumerate(payloads):
+        queue.put_nowait(item)
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+
+    t0 = time.perf_counter()
+    readers = [asyncio.create_task(read_worker(host, port, reads, recorder, stop, random.Random(rng.random())))
+               for _ in range(args.read_concurrency if reads else 0)]
+    ingesters = [ingest_worker(host, port, queue, recorder, args.mode) for _ in range(args.ingest_concurrency)]
+    ingest_start = time.perf_counter()
+    await asyncio.gather(*ingesters)
+    ingest_elapsed = time.perf_counter() - ingest_start
+    # Reads keep running for at least --duration seconds
+    remaining = args.duration - (time.perf_counter() - t0)
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+    stop.set()
+    await asyncio.gather(*readers)
+    elapsed = time.perf_counter() - t0
+
+    routes = {}
+    if 'ingest' in recorder.samples:
+        routes['ingest'] = summarize(recorder.samples['ingest'], ingest_elapsed, args.rows)
+    read_samples = []
+    for route, samples in sorted(recorder.samples.items()):
+        if route != 'ingest':
+            routes[route] = summarize(samples, elapsed)
+            read_samples += samples
+    if read_samples:
+        routes['reads (all)'] = summarize(read_samples, elapsed)
+    return routes, elapsed
+
+
+# ---------- Backend process ----------
+
+def start_backend(port, db_path):
+    """Start the load-test entrypoint against a throwaway SQLite file; returns the process."""
+    env = dict(os.environ, PORT=str(port), DATABASE_URL=f"file:{os.path.abspath(db_path)}")
+    npx = shutil.which("npx")
+    if not npx:
+        raise SystemExit("npx not found; start the backend yourself and pass --base-url")
+    subprocess.run([npx, "prisma", "db", "push", "--skip-generate", "--accept-data-loss"], cwd=BACKEND_DIR,
+                   env=env, check=True)
+    return subprocess.Popen([npx, "ts-node", BACKEND_ENTRY], cwd=BACKEND_DIR, env=env)
+
+
+async def wait_for_health(base_url, timeout=STARTUP_TIMEOUT):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        conn = HttpConnection(parts.hostname, parts.port or 80)
+        try:
+            status, _ = await conn.request("GET", "/api/health")
+            if status == 200:
+                return
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await conn.close()
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"Backend did not become healthy at {base_url} within {timeout}s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_read(value):
+    path, _, weight = value.partition("=")
+    return path, float(weight or 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the ingest and query API.")
+    parser.add_argument('--base-url', default='http://127.0.0.1:3000')
+    parser.add_argument('--start-backend', action='store_true',
+                        help="Start apps/backend (all read routes mounted) with a throwaway SQLite database")
+    parser.add_argument('--masters', default='public/data', help="staff/services/rooms/equipment.csv directory")
+    parser.add_argument('--fixture', help="appointments.csv to cut payloads from (default: generate one)")
+    parser.add_argument('--uploads', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=2000, help="Rows per upload")
+    parser.add_argument('--mode', choices=['append', 'replace'], default='append')
+    parser.add_argument('--ingest-concurrency', type=int, default=2)
+    parser.add_argument('--read-concurrency', type=int, default=16)
+    parser.add_argument('--read', action='append', type=parse_read, metavar='PATH[=WEIGHT]',
+                        help="Read route to include (repeatable; default: appointments, data health, health)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Minimum seconds of read traffic")
+    parser.add_argument('--skip-setup', action='store_true', help="Do not ingest staff.csv/services.csv first")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', default='', help="Free-form label stored in the report")
+    parser.add_argument('--out', default='loadtest_result.json')
+    args = parser.parse_args(argv)
+
+    reads = args.read or DEFAULT_READS
+    header, lines = load_fixture_lines(args.masters, args.seed, args.fixture)
+    run_id = uuid.uuid4().hex[:6]
+    payloads = build_payloads(header, lines, args.uploads, args.rows, run_id)
+    print(f"Prepared {len(payloads)} payloads of {args.rows:,} rows "
+          f"({sum(map(len, payloads)) / 1024 / 1024:.1f} MB total)")
+
+    backend = tmp_dir = None
+    try:
+        if args.start_backend:
+            tmp_dir = tempfile.mkdtemp(prefix="loadtest_db_")
+            backend = start_backend(urlsplit(args.base_url).port or 3000, os.path.join(tmp_dir, "loadtest.db"))
+        asyncio.run(wait_for_health(args.base_url))
+        routes, elapsed = asyncio.run(run_load(args.base_url, payloads, reads, args))
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=10)
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report = {
+        'label': args.label,
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'base_url': args.base_url,
+        'params': {
+            'uploads': args.uploads, 'rows_per_upload': args.rows, 'mode': args.mode,
+            'ingest_concurrency': args.ingest_concurrency, 'read_concurrency': args.read_concurrency,
+            'duration_s': args.duration, 'reads': [[p, w] for p, w in reads],
+        },
+        'elapsed_s': round(elapsed, 3),
+        'routes': routes,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for route, stats in routes.items():
+        lat = stats['latency_ms']
+        extra = f"  {stats['rows_per_s']:,.0f} rows/s" if 'rows_per_s' in stats else ""
+        print(f"{route:<72} {stats['requests']:>6} req  {stats['throughput_rps']:>8.1f} req/s  "
+              f"p50 {lat['p50']}ms  p95 {lat['p95']}ms  p99 {lat['p99']}ms  "
+              f"errors {stats['error_rate']:.1%}  429 {stats['rate_limited']}{extra}")
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,61 +1,299 @@
+"""Batch image optimization for src/assets.
+
+Every JPEG/PNG master under src/assets is downscaled to --max-width and
+encoded to WebP next to it (`<name>.webp`, as launchCover.css expects). The
+quality is the highest one whose output fits --target-kb. It is found by
+bisecting over in-memory encodes, so no temporary files are written. Masters are
+never overwritten.
+
+Each master also gets a responsive width ladder (--widths, default
+480/960/1440/1920) in WebP and AVIF under --responsive-dir. Each rung's size
+budget is --target-kb scaled by its pixel count. A ~1 KB blurred WebP
+placeholder is also encoded as a data URI. responsive_manifest.json in that
+directory lists the `srcset` strings and placeholders. launchCoverPage.ts
+bundles it at build time, paints the placeholder immediately and then loads
+the rung that fits the screen. AVIF is skipped if this Pillow build cannot encode it.
+
+image_manifest.json (in the assets directory) records each master's size,
+mtime, SHA-256 and the settings used. A master whose stat and settings match
+is skipped without being read. One whose content is unchanged is skipped
+after hashing. Everything else is encoded in a process pool.
+
+Replaces compress_bg.py and the single hard-coded path of the old script.
+
+Usage:
+    python optimize_images.py
+    python optimize_images.py --assets src/assets --target-kb 150 --workers 8 --force
+    python optimize_images.py --widths 640,1280 --formats webp   # custom ladder
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
 import os
-from PIL import Image
-
-def get_size_kb(path):
-    if not os.path.exists(path):
-        return 0
-    return os.path.getsize(path) / 1024
-
-def optimize_image(path, target_width=1920):
-    if not os.path.exists(path):
-        print(f"File not found: {path}")
-        return
-
-    print(f"Processing {path}...")
-    original_size = get_size_kb(path)
-    print(f"  Original Size: {original_size:.2f} KB")
-
-    try:
-        with Image.open(path) as img:
-            # Resize logic
-            w_percent = (target_width / float(img.size[0]))
-            if w_percent < 1: # Only downscale
-                h_size = int((float(img.size[1]) * float(w_percent)))
-                img = img.resize((target_width, h_size), Image.Resampling.LANCZOS)
-                print(f"  Resized to: {target_width}x{h_size}")
-            else:
-                print(f"  Image width {img.size[0]} <= {target_width}, skipping resize.")
-
-            # Construct new filename (we overwrite or create webp)
-            base, ext = os.path.splitext(path)
-            
-            # Save as WebP
-            webp_path = base + ".webp"
-            img.save(webp_path, "WEBP", quality=65, method=6)
-            new_webp_size = get_size_kb(webp_path)
-            print(f"  Saved WebP: {new_webp_size:.2f} KB ({webp_path})")
-
-            # Save as JPG (Fallback) if original was jpg or we want a jpg fallback
-            if ext.lower() in ['.jpg', '.jpeg']:
-                jpg_path = path # Overwrite original jpg
-                img = img.convert("RGB") # Ensure RGB for JPG
-                img.save(jpg_path, "JPEG", quality=65, optimize=True)
-                new_jpg_size = get_size_kb(jpg_path)
-                print(f"  Saved JPG: {new_jpg_size:.2f} KB ({jpg_path})")
-
-    except Exception as e:
-        print(f"  Error processing {path}: {e}")
-
-# Target Files
-assets_dir = r"d:\AI_Class\clinic_dashboard_ai\src\assets"
-bg_jpg = os.path.join(assets_dir, "ai_operations_center_bg.jpg")
-bg_webp = os.path.join(assets_dir, "ai_operations_center_bg.webp")
-
-# We can process the JPG as the source master if it exists
-if os.path.exists(bg_jpg):
-    optimize_image(bg_jpg)
-elif os.path.exists(bg_webp):
-    # If only webp exists, optimize it
-    optimize_image(bg_webp)
-else:
-    print("No background image found to optimize.")
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageFilter, features
+
+MANIFEST_NAME = "image_manifest.json"
+MANIFEST_VERSION = 1
+MASTER_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+DEFAULT_MAX_WIDTH = 1920
+DEFAULT_TARGET_KB = 150
+MIN_QUALITY = 40
+MAX_QUALITY = 90
+
+RESPONSIVE_DIR = os.path.join('public', 'images', 'responsive')
+RESPONSIVE_MANIFEST = "responsive_manifest.json"
+DEFAULT_WIDTHS = "480,960,1440,1920"
+DEFAULT_FORMATS = "avif,webp"
+FORMATS = {'webp': "WEBP", 'avif': "AVIF"}
+# Smallest per-rung budget, so tiny rungs are not starved of quality
+MIN_RUNG_KB = 12
+
+PLACEHOLDER_WIDTH = 32
+PLACEHOLDER_TARGET_KB = 1
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def resize_to_width(img, width):
+    """Downscale (never upscale) to `width`, keeping the aspect ratio."""
+    if img.size[0] <= width:
+        return img
+    height = round(img.size[1] * width / img.size[0])
+    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def encode(img, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buffer, fmt, quality=quality, method=6)
+    else:
+        img.save(buffer, fmt, quality=quality)
+    return buffer.getvalue()
+
+
+def encode_to_target(img, fmt, target_kb, lo=MIN_QUALITY, hi=MAX_QUALITY):
+    """(bytes, quality): the highest quality in [lo, hi] that fits target_kb.
+
+    Quality is bisected with in-memory encodes (about log2(hi - lo) of them).
+    If even `lo` does not fit, the `lo` encode is returned.
+    """
+    limit = target_kb * 1024
+    floor = lo
+    best = None
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        data = encode(img, fmt, quality)
+        if len(data) <= limit:
+            best = (data, quality)
+            lo = quality + 1
+        else:
+            hi = quality - 1
+    if best is None:
+        best = (encode(img, fmt, floor), floor)
+    return best
+
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def available_formats(names):
+    """The requested ladder formats this Pillow build can encode."""
+    return [name for name in names if name != 'avif' or features.check('avif')]
+
+
+def output_entry(path, fmt, img, quality, data):
+    return {'path': path.replace(os.sep, '/'), 'format': fmt, 'width': img.size[0], 'height': img.size[1],
+            'quality': quality, 'bytes': len(data)}
+
+
+def build_ladder(img, stem, settings):
+    """Encode every (width, format) rung; returns output entries."""
+    outputs = []
+    full_pixels = img.size[0] * img.size[1]
+    widths = sorted({min(w, img.size[0]) for w in settings['widths']})
+    for width in widths:
+        rung = resize_to_width(img, width)
+        budget = max(MIN_RUNG_KB, settings['target_kb'] * rung.size[0] * rung.size[1] / full_pixels)
+        for fmt in settings['formats']:
+            data, quality = encode_to_target(rung, FORMATS[fmt], budget)
+            path = os.path.join(settings['responsive_dir'], f"{stem}-{rung.size[0]}.{fmt}")
+            write_atomic(path, data)
+            outputs.append(output_entry(path, fmt, rung, quality, data))
+    return outputs
+
+
+def placeholder(img):
+    """Tiny blurred WebP as a data URI, painted before any rung has loaded."""
+    tiny = resize_to_width(img, PLACEHOLDER_WIDTH).filter(ImageFilter.GaussianBlur(1))
+    data, _ = encode_to_target(tiny, "WEBP", PLACEHOLDER_TARGET_KB, lo=10, hi=60)
+    return "data:image/webp;base64," + base64.b64encode(data).decode('ascii')
+
+
+def optimize_image(job):
+    """Encode one master; returns (name, manifest entry)."""
+    path, digest, settings = job
+    base = os.path.splitext(path)[0]
+    t0 = time.perf_counter()
+    with Image.open(path) as src:
+        keep_alpha = src.mode in ("RGBA", "LA", "PA") or "transparency" in src.info
+        img = resize_to_width(src.convert("RGBA" if keep_alpha else "RGB"), settings['max_width'])
+
+    data, quality = encode_to_target(img, "WEBP", settings['target_kb'])
+    webp_path = base + ".webp"
+    write_atomic(webp_path, data)
+    outputs = [output_entry(webp_path, 'webp', img, quality, data)]
+
+    entry = {}
+    if settings['widths']:
+        os.makedirs(settings['responsive_dir'], exist_ok=True)
+        outputs += build_ladder(img, os.path.basename(base), settings)
+        entry['placeholder'] = placeholder(img)
+
+    stat = os.stat(path)
+    entry.update({
+        'sha256': digest,
+        'bytes': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'settings': settings,
+        'width': img.size[0],
+        'height': img.size[1],
+        'outputs': outputs,
+        'seconds': round(time.perf_counter() - t0, 3),
+    })
+    return os.path.basename(path), entry
+
+
+def write_responsive_manifest(images, settings):
+    """responsive_manifest.json: srcset strings (URLs relative to public/) and placeholders per image."""
+    public_root = os.path.dirname(os.path.dirname(settings['responsive_dir']))
+    manifest = {}
+    for name, entry in images.items():
+        if 'placeholder' not in entry:
+            continue
+        srcset = {}
+        for fmt in settings['formats']:
+            rungs = [o for o in entry['outputs'] if o['format'] == fmt and os.path.dirname(o['path']) ==
+                     settings['responsive_dir'].replace(os.sep, '/')]
+            srcset[fmt] = ", ".join(f"{os.path.relpath(o['path'], public_root).replace(os.sep, '/')} {o['width']}w"
+                                    for o in rungs)
+        manifest[os.path.splitext(name)[0]] = {
+            'width': entry['width'],
+            'height': entry['height'],
+            'placeholder': entry['placeholder'],
+            'srcset': srcset,
+        }
+    path = os.path.join(settings['responsive_dir'], RESPONSIVE_MANIFEST)
+    os.makedirs(settings['responsive_dir'], exist_ok=True)
+    write_atomic(path, json.dumps({'formats': settings['formats'], 'images': manifest},
+                                  indent=2, ensure_ascii=False).encode('utf-8'))
+    return path
+
+
+def list_masters(assets_dir):
+    return sorted(name for name in os.listdir(assets_dir)
+                  if name.lower().endswith(MASTER_EXTENSIONS) and os.path.isfile(os.path.join(assets_dir, name)))
+
+
+def outputs_exist(entry):
+    return all(os.path.exists(o['path']) for o in entry.get('outputs', []))
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'images': {}}
+
+
+def plan(assets_dir, manifest, settings, force=False):
+    """Split masters into (unchanged entries, jobs to encode)."""
+    unchanged, jobs = {}, []
+    for name in list_masters(assets_dir):
+        path = os.path.join(assets_dir, name)
+        previous = manifest['images'].get(name)
+        current = bool(previous) and previous.get('settings') == settings and outputs_exist(previous)
+        if not force and current:
+            stat = os.stat(path)
+            # Same size and mtime: skip without reading the file
+            if (stat.st_size, stat.st_mtime_ns) == (previous['bytes'], previous['mtime_ns']):
+                unchanged[name] = previous
+                continue
+            digest = file_sha256(path)
+            if digest == previous['sha256']:
+                unchanged[name] = dict(previous, bytes=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+        else:
+            digest = file_sha256(path)
+        jobs.append((path, digest, settings))
+    return unchanged, jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimize src/assets images into size-targeted WebP.")
+    parser.add_argument('--assets', default=os.path.join('src', 'assets'))
+    parser.add_argument('--max-width', type=int, default=DEFAULT_MAX_WIDTH)
+    parser.add_argument('--target-kb', type=float, default=DEFAULT_TARGET_KB)
+    parser.add_argument('--widths', default=DEFAULT_WIDTHS, help="Responsive ladder widths ('' to disable)")
+    parser.add_argument('--formats', default=DEFAULT_FORMATS, help="Responsive ladder formats: avif,webp")
+    parser.add_argument('--responsive-dir', default=RESPONSIVE_DIR)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--force', action='store_true', help="Re-encode even if nothing changed")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.assets):
+        print(f"Assets directory not found: {args.assets}")
+        return 1
+
+    t0 = time.perf_counter()
+    manifest_path = os.path.join(args.assets, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    requested = [f.strip().lower() for f in args.formats.split(',') if f.strip()]
+    formats = available_formats(requested)
+    if len(formats) < len(requested):
+        print("This Pillow build cannot encode AVIF; writing the other formats only")
+    settings = {
+        'max_width': args.max_width,
+        'target_kb': args.target_kb,
+        'widths': sorted({int(w) for w in args.widths.split(',') if w.strip()}),
+        'formats': formats,
+        'responsive_dir': args.responsive_dir.replace(os.sep, '/'),
+    }
+    images, jobs = plan(args.assets, manifest, settings, args.force)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for name, entry in pool.map(optimize_image, jobs):
+                images[name] = entry
+                print(f"  {name}: {entry['bytes'] / 1024:.1f} KB -> {len(entry['outputs'])} files "
+                      f"in {entry['seconds']:.1f}s")
+                for o in entry['outputs']:
+                    print(f"    {o['path']}: {o['bytes'] / 1024:.1f} KB (q{o['quality']}, {o['width']}px)")
+
+    manifest['images'] = dict(sorted(images.items()))
+    write_atomic(manifest_path, json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+    if settings['widths']:
+        print(f"Responsive manifest written to {write_responsive_manifest(manifest['images'], settings)}")
+    print(f"{len(jobs)} optimized, {len(images) - len(jobs)} unchanged in {time.perf_counter() - t0:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
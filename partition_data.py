@@ -0,0 +1,281 @@
+"""Split appointments.csv and staff_workload.csv into date-partitioned shards.
+
+Every record is copied byte-for-byte into the shard for its month ("2025-03")
+or ISO week ("2025-W09", the same week number as staff_workload.csv's `week`
+column), and every shard repeats the source header. Records are split on
+newlines outside quotes, so a quoted field containing a line break stays in
+one record.
+
+The first pass only hashes each shard's would-be content in memory. Shards
+whose hash matches the manifest (and whose file exists) are left untouched.
+A second pass writes just the changed shards, starting at the first record of
+the earliest changed one, so appending a new month to the export reads the
+tail twice and writes only that month's file. Nothing is rewritten when no
+shard changed.
+
+manifest.json lists, per table, every shard's partition bounds, the first and
+last date actually present, row count, byte size and SHA-256. DataStore can
+fetch just the shards overlapping the visible range:
+
+    {"version": 1, "granularity": "month", "tables": {"appointments": {
+        "source": "appointments.csv", "header": [...], "rows": 109883, "skipped": 0,
+        "shards": [{"key": "2024-01", "file": "appointments/appointments.2024-01.csv",
+                    "start": "2024-01-01", "end": "2024-01-31", "first_date": "2024-01-01",
+                    "last_date": "2024-01-31", "rows": 3906, "bytes": 495021, "sha256": "..."}]}}}
+
+Usage:
+    python partition_data.py                          # month shards under public/data/partitions
+    python partition_data.py --by week --tables staff_workload
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+MANIFEST_VERSION = 1
+DEFAULT_TABLES = ["appointments", "staff_workload"]
+DATE_COLUMN = "date"
+
+# Shard files kept open at once; older ones are closed and reopened for append
+MAX_OPEN_SHARDS = 64
+
+
+def partition_key(day, by):
+    """(key, start, end) of the month or ISO week containing `day`."""
+    if by == "week":
+        year, week, weekday = day.isocalendar()
+        start = day - timedelta(days=weekday - 1)
+        return f"{year}-W{week:02d}", start, start + timedelta(days=6)
+    start = day.replace(day=1)
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return f"{day.year}-{day.month:02d}", start, end
+
+
+def iter_records(f):
+    """Yield (byte offset, raw record) for every CSV record after the current position.
+
+    A record ends at a newline outside quotes ("" escapes keep the quote count
+    even), so quoted fields with embedded newlines are kept whole. The last
+    record gets a newline if the file does not end with one.
+    """
+    offset = f.tell()
+    record, quotes, start = b"", 0, offset
+    for line in f:
+        if not record:
+            start = offset
+        offset += len(line)
+        record += line
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            if record.strip():
+                yield start, record if record.endswith(b"\n") else record + b"\n"
+            record, quotes = b"", 0
+    if record.strip():
+        yield start, record if record.endswith(b"\n") else record + b"\n"
+
+
+def record_date(record, index):
+    """The date field of one raw CSV record; falls back to the csv module for quoted prefixes."""
+    fields = record.split(b",", index + 1)
+    if len(fields) > index and not any(b'"' in f for f in fields[:index + 1]):
+        value = fields[index]
+    else:
+        row = next(csv.reader(io.StringIO(record.decode("utf-8"), newline="")), [])
+        value = row[index].encode("utf-8") if len(row) > index else b""
+    return value.strip().decode("ascii", "replace")
+
+
+class ShardStats:
+    """First pass: one partition's content hash and bounds, without writing it."""
+
+    def __init__(self, header, start, end):
+        self.start, self.end = start, end
+        self.first_date = self.last_date = None
+        self.first_offset = None
+        self.rows = 0
+        self.bytes = len(header)
+        self.hash = hashlib.sha256(header)
+
+    def add(self, record, day, offset):
+        self.hash.update(record)
+        self.bytes += len(record)
+        self.rows += 1
+        if self.first_offset is None:
+            self.first_offset = offset
+        if self.first_date is None or day < self.first_date:
+            self.first_date = day
+        if self.last_date is None or day > self.last_date:
+            self.last_date = day
+
+
+class ShardWriter:
+    """Second pass: one changed partition written to a temp file, replaced on close."""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.tmp = path + ".tmp"
+        self.handle = open(self.tmp, 'wb')
+        self.handle.write(header)
+
+    def write(self, data):
+        if self.handle is None:
+            self.handle = open(self.tmp, 'ab')
+        self.handle.write(data)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def commit(self):
+        self.close()
+        os.replace(self.tmp, self.path)
+
+
+def iter_keyed_records(f, index, by, start_offset=None):
+    """Yield (key, start, end, day, offset, record); records without a valid date yield key None."""
+    if start_offset is not None:
+        f.seek(start_offset)
+    for offset, record in iter_records(f):
+        day = record_date(record, index)
+        try:
+            key, start, end = partition_key(date.fromisoformat(day), by)
+        except ValueError:
+            yield None, None, None, day, offset, record
+            continue
+        yield key, start, end, day, offset, record
+
+
+def write_shards(f, index, by, header, dirty, start_offset):
+    """Rewrite the shards in `dirty` ({key: path}) from the source, reading from start_offset."""
+    writers = {}
+    open_writers = OrderedDict()
+    for key, _, _, _, _, record in iter_keyed_records(f, index, by, start_offset):
+        if key not in dirty:
+            continue
+        writer = writers.get(key)
+        if writer is None:
+            writer = writers[key] = ShardWriter(dirty[key], header)
+        writer.write(record)
+
+        open_writers[key] = writer
+        open_writers.move_to_end(key)
+        if len(open_writers) > MAX_OPEN_SHARDS:
+            open_writers.popitem(last=False)[1].close()
+    for writer in writers.values():
+        writer.commit()
+
+
+def partition_table(src_path, out_dir, name, by, previous=None):
+    """Stream one CSV into shards under out_dir/name; returns (manifest entry, shards written)."""
+    previous = {s['key']: s for s in (previous or {}).get('shards', [])}
+    table_dir = os.path.join(out_dir, name)
+    os.makedirs(table_dir, exist_ok=True)
+
+    stats = {}
+    rows = skipped = 0
+    with open(src_path, 'rb') as f:
+        header = f.readline()
+        columns = [h.strip() for h in next(csv.reader([header.decode('utf-8-sig')]), [])]
+        if DATE_COLUMN not in columns:
+            raise SystemExit(f"{src_path}: no '{DATE_COLUMN}' column")
+        index = columns.index(DATE_COLUMN)
+        data_start = f.tell()
+
+        for key, start, end, day, offset, record in iter_keyed_records(f, index, by):
+            if key is None:
+                skipped += 1
+                continue
+            shard = stats.get(key)
+            if shard is None:
+                shard = stats[key] = ShardStats(header, start, end)
+            shard.add(record, day, offset)
+            rows += 1
+
+        shards, dirty = [], {}
+        for key in sorted(stats):
+            shard = stats[key]
+            digest = shard.hash.hexdigest()
+            path = os.path.join(table_dir, f"{name}.{key}.csv")
+            old = previous.get(key)
+            if not (old and old['sha256'] == digest and os.path.exists(path)):
+                dirty[key] = path
+            shards.append({
+                'key': key,
+                'file': f"{name}/{os.path.basename(path)}",
+                'start': shard.start.isoformat(),
+                'end': shard.end.isoformat(),
+                'first_date': shard.first_date,
+                'last_date': shard.last_date,
+                'rows': shard.rows,
+                'bytes': shard.bytes,
+                'sha256': digest,
+            })
+        if dirty:
+            start_offset = min(stats[key].first_offset for key in dirty)
+            write_shards(f, index, by, header, dirty, max(start_offset, data_start))
+
+    # Partitions that disappeared from the source (or a previous --by) are stale
+    for key, old in previous.items():
+        if key not in stats:
+            stale = os.path.join(out_dir, old['file'])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    entry = {'source': os.path.basename(src_path), 'header': columns, 'rows': rows,
+             'skipped': skipped, 'shards': shards}
+    return entry, len(dirty)
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'granularity': None, 'tables': {}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition appointment/workload CSVs into date shards.")
+    parser.add_argument('--src', default='public/data')
+    parser.add_argument('--out', default='public/data/partitions')
+    parser.add_argument('--by', choices=['month', 'week'], default='month')
+    parser.add_argument('--tables', default=','.join(DEFAULT_TABLES), help="Comma-separated CSV names without .csv")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, 'manifest.json')
+    manifest = load_manifest(manifest_path)
+    # Switching --by changes every key, so the old shards are removed as stale
+    manifest['granularity'] = args.by
+
+    for name in [t.strip() for t in args.tables.split(',') if t.strip()]:
+        src_path = os.path.join(args.src, name + '.csv')
+        if not os.path.exists(src_path):
+            print(f"Skipping {name}: {src_path} not found")
+            continue
+        t0 = time.perf_counter()
+        entry, written = partition_table(src_path, args.out, name, args.by, manifest['tables'].get(name))
+        manifest['tables'][name] = entry
+        elapsed = time.perf_counter() - t0
+        print(f"{name}: {entry['rows']:,} rows -> {len(entry['shards'])} {args.by} shards "
+              f"({written} written, {len(entry['shards']) - written} unchanged) in {elapsed:.2f}s")
+        if entry['skipped']:
+            print(f"  {entry['skipped']:,} rows without a valid date were skipped")
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, manifest_path)
+    print(f"Manifest written to {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
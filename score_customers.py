@@ -0,0 +1,317 @@
+"""Batch RFM and churn scoring for the customer insights page.
+
+rfmSelector.ts and churnRiskSelector.ts recompute recency, frequency and
+monetary value over every visit whenever the customer page opens. This job
+computes them once from customer_visits.csv and customers_profile.csv and writes
+one row per customer, using the selectors' own rules:
+
+    segment     high_value (F >= 5 and M >= mean M), low_value (F < 3 or M < mean M / 2),
+                otherwise medium_value
+    churn_risk  high (>= 90 days since the last visit), medium (>= 60), low
+
+It also writes quantile scores r_score/f_score/m_score (1-5, 5 = best, split at
+the quintiles of customers with visits), combined into `rfm` = r * 100 + f * 10 + m
+(545 for R5 F4 M5; 0 for customers without visits).
+
+Only Completed visits count. Visits are streamed in chunks of --chunk-rows and
+folded into per-customer arrays (visit count, revenue sum, first and last
+date) with bincount/maximum.at, so memory grows with the number of customers,
+not visits. Customers in customers_profile.csv without a completed visit
+fall back to the profile's visit_count and visit dates, with zero spend
+(profiles without a last_visit_date are left out).
+
+Output (same CSNP columnar format as build_data_snapshot.py):
+    public/data/cubes/customer_scores.bin   per-customer columns
+    public/data/cubes/customer_scores.json  as_of date, quintile edges, mean monetary, segment/churn counts
+
+Usage:
+    python score_customers.py
+    python score_customers.py --visits build/fixtures/customer_visits.csv --as-of 2026-02-28
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from build_data_snapshot import ArrayColumn, write_snapshot
+
+CHUNK_ROWS = 200_000
+COUNTED_STATUSES = {"completed"}
+
+# Same thresholds as rfmSelector.ts / churnRiskSelector.ts
+HIGH_VALUE_MIN_FREQUENCY = 5
+LOW_VALUE_MAX_FREQUENCY = 3
+CHURN_HIGH_DAYS = 90
+CHURN_MEDIUM_DAYS = 60
+QUANTILE_BINS = 5
+
+NO_DATE = np.iinfo(np.int64).min
+
+
+class CustomerTotals:
+    """Per-customer running totals, grown as new customer ids appear."""
+
+    def __init__(self):
+        self.codes = {}
+        self.ids = []
+        self.frequency = np.zeros(0, dtype=np.int64)
+        self.monetary = np.zeros(0, dtype=np.float64)
+        self.first = np.zeros(0, dtype=np.int64)
+        self.last = np.zeros(0, dtype=np.int64)
+
+    def code_of(self, customer_ids):
+        codes = self.codes
+        out = np.empty(len(customer_ids), dtype=np.int64)
+        for i, cid in enumerate(customer_ids):
+            code = codes.get(cid)
+            if code is None:
+                code = codes[cid] = len(self.ids)
+                self.ids.append(cid)
+            out[i] = code
+        self._grow(len(self.ids))
+        return out
+
+    def _grow(self, n):
+        old = len(self.frequency)
+        if n <= old:
+            return
+        size = max(n, old * 2, 1024)
+        self.frequency = np.concatenate((self.frequency, np.zeros(size - old, np.int64)))
+        self.monetary = np.concatenate((self.monetary, np.zeros(size - old, np.float64)))
+        self.first = np.concatenate((self.first, np.full(size - old, np.iinfo(np.int64).max)))
+        self.last = np.concatenate((self.last, np.full(size - old, NO_DATE)))
+
+    def add_chunk(self, customer_ids, days, revenue):
+        codes = self.code_of(customer_ids)
+        n = len(self.frequency)
+        self.frequency += np.bincount(codes, minlength=n)
+        self.monetary += np.bincount(codes, revenue, minlength=n)
+        np.minimum.at(self.first, codes, days)
+        np.maximum.at(self.last, codes, days)
+
+    def trimmed(self):
+        n = len(self.ids)
+        return self.frequency[:n], self.monetary[:n], self.first[:n], self.last[:n]
+
+
+def parse_days(values):
+    """'YYYY-MM-DD' strings -> day numbers (days since 1970-01-01); NO_DATE where unparsable."""
+    try:
+        return np.array(values, dtype='datetime64[D]').astype(np.int64)
+    except ValueError:
+        out = np.full(len(values), NO_DATE, dtype=np.int64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = np.datetime64(value, 'D').astype(np.int64)
+            except ValueError:
+                pass
+        return out
+
+
+def parse_revenue(values):
+    try:
+        return np.array([v or 0 for v in values], dtype=np.float64)
+    except ValueError:
+        out = np.zeros(len(values))
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except ValueError:
+                pass
+        return out
+
+
+def read_visits(path, totals, chunk_rows=CHUNK_ROWS):
+    """Fold completed visits into `totals`; returns (rows read, rows counted, rows skipped)."""
+    read = counted = skipped = 0
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        try:
+            cid, day, status, revenue = (header.index(c) for c in ('customer_id', 'visit_date', 'status', 'revenue'))
+        except ValueError as exc:
+            raise SystemExit(f"{path}: {exc}")
+        width = max(cid, day, status, revenue)
+
+        ids, days, amounts = [], [], []
+
+        def flush():
+            nonlocal skipped
+            parsed = parse_days(days)
+            valid = parsed != NO_DATE
+            skipped += int((~valid).sum())
+            if valid.any():
+                keep = np.flatnonzero(valid)
+                totals.add_chunk([ids[i] for i in keep], parsed[keep], parse_revenue(amounts)[keep])
+            ids.clear()
+            days.clear()
+            amounts.clear()
+
+        for row in reader:
+            if not row:
+                continue
+            read += 1
+            if len(row) <= width or not row[cid].strip():
+                skipped += 1
+                continue
+            if row[status].strip().lower() not in COUNTED_STATUSES:
+                continue
+            counted += 1
+            ids.append(row[cid].strip())
+            days.append(row[day].strip())
+            amounts.append(row[revenue].strip())
+            if len(ids) >= chunk_rows:
+                flush()
+        if ids:
+            flush()
+    return read, counted, skipped
+
+
+def read_profiles(path):
+    """{customer_id: row} from customers_profile.csv."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return {r['customer_id'].strip(): r for r in csv.DictReader(f) if r.get('customer_id', "").strip()}
+
+
+def add_profile_only(totals, profiles):
+    """Customers with a profile but no completed visit, from their profile counts and dates.
+
+    Returns (added, skipped for lack of a last_visit_date).
+    """
+    missing = [cid for cid in profiles if cid not in totals.codes]
+    if not missing:
+        return 0, 0
+    lasts = parse_days([profiles[c].get('last_visit_date', "").strip() for c in missing])
+    keep = np.flatnonzero(lasts != NO_DATE)
+    skipped = len(missing) - len(keep)
+    missing, lasts = [missing[i] for i in keep], lasts[keep]
+    firsts = parse_days([profiles[c].get('first_visit_date', "").strip() for c in missing])
+    codes = totals.code_of(missing)
+    totals.frequency[codes] = [int(float(profiles[c].get('visit_count') or 0)) for c in missing]
+    totals.first[codes] = np.where(firsts != NO_DATE, firsts, lasts)
+    totals.last[codes] = lasts
+    return len(missing), skipped
+
+
+def quantile_scores(values, mask, higher_is_better=True):
+    """1..QUANTILE_BINS by quintile of values[mask]; 0 outside the mask. Returns (scores, edges)."""
+    scores = np.zeros(len(values), dtype=np.int64)
+    if not mask.any():
+        return scores, []
+    edges = np.quantile(values[mask], np.linspace(0, 1, QUANTILE_BINS + 1)[1:-1])
+    bins = np.searchsorted(edges, values[mask], side='right') + 1
+    scores[mask] = bins if higher_is_better else QUANTILE_BINS + 1 - bins
+    return scores, [round(float(e), 2) for e in edges]
+
+
+def score(totals, as_of):
+    frequency, monetary, first, last = totals.trimmed()
+    recency = as_of - last
+    active = frequency > 0
+
+    r_score, r_edges = quantile_scores(recency, active, higher_is_better=False)
+    f_score, f_edges = quantile_scores(frequency, active)
+    m_score, m_edges = quantile_scores(monetary, active)
+
+    mean_monetary = float(monetary.mean()) if len(monetary) else 0.0
+    segment = np.where((frequency >= HIGH_VALUE_MIN_FREQUENCY) & (monetary >= mean_monetary), "high_value",
+                       np.where((frequency < LOW_VALUE_MAX_FREQUENCY) | (monetary < mean_monetary * 0.5),
+                                "low_value", "medium_value"))
+    churn = np.where(recency >= CHURN_HIGH_DAYS, "high", np.where(recency >= CHURN_MEDIUM_DAYS, "medium", "low"))
+
+    columns = {
+        'frequency': frequency, 'monetary': monetary, 'first': first, 'last': last, 'recency': recency,
+        'r_score': r_score, 'f_score': f_score, 'm_score': m_score, 'rfm': r_score * 100 + f_score * 10 + m_score,
+        'segment': segment, 'churn_risk': churn,
+    }
+    summary = {
+        'mean_monetary': round(mean_monetary, 2),
+        'quantile_edges': {'recency_days': r_edges, 'frequency': f_edges, 'monetary': m_edges},
+    }
+    return columns, summary
+
+
+def write_scores(out_dir, totals, profiles, columns, meta):
+    ids = np.array(totals.ids, dtype=str)
+    monetary = columns['monetary']
+    if np.all(monetary == np.round(monetary)):
+        monetary = monetary.astype(np.int64)
+
+    def profile_column(field):
+        return np.array([(profiles.get(cid, {}).get(field) or "").strip() for cid in totals.ids], dtype=str)
+
+    writers = [
+        ArrayColumn('customer_id', ids),
+        ArrayColumn('gender', profile_column('gender')),
+        ArrayColumn('age_group', profile_column('age_group')),
+        ArrayColumn('frequency', columns['frequency']),
+        ArrayColumn('monetary', monetary),
+        ArrayColumn('first_visit', columns['first'].astype('datetime64[D]')),
+        ArrayColumn('last_visit', columns['last'].astype('datetime64[D]')),
+        ArrayColumn('recency_days', columns['recency']),
+    ] + [ArrayColumn(name, columns[name]) for name in ('r_score', 'f_score', 'm_score', 'rfm', 'segment',
+                                                       'churn_risk')]
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "customer_scores.bin")
+    write_snapshot(path, dict(meta, rows=len(ids)), writers)
+    return path, len(ids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute per-customer RFM scores and churn risk.")
+    parser.add_argument('--visits', default='public/data/customer_visits.csv')
+    parser.add_argument('--profiles', default='public/data/customers_profile.csv')
+    parser.add_argument('--out', default='public/data/cubes')
+    parser.add_argument('--as-of', type=date.fromisoformat, default=date.today(),
+                        help="Reference date for recency (default: today, like the selectors)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.visits):
+        print(f"Error: File not found at {args.visits}")
+        return 1
+
+    t0 = time.perf_counter()
+    totals = CustomerTotals()
+    read, counted, skipped = read_visits(args.visits, totals, args.chunk_rows)
+    profiles = read_profiles(args.profiles)
+    profile_only, profile_skipped = add_profile_only(totals, profiles)
+    as_of = int(np.datetime64(args.as_of.isoformat(), 'D').astype(np.int64))
+    columns, summary = score(totals, as_of)
+
+    meta = {'source': os.path.basename(args.visits), 'as_of': args.as_of.isoformat()}
+    path, count = write_scores(args.out, totals, profiles, columns, meta)
+
+    segments, segment_counts = np.unique(columns['segment'], return_counts=True)
+    risks, risk_counts = np.unique(columns['churn_risk'], return_counts=True)
+    summary = dict(meta, **summary, **{
+        'customers': count,
+        'profile_only_customers': profile_only,
+        'profiles_without_dates': profile_skipped,
+        'visits_read': read,
+        'visits_counted': counted,
+        'visits_skipped': skipped,
+        'segments': {str(k): int(v) for k, v in zip(segments, segment_counts)},
+        'churn_risk': {str(k): int(v) for k, v in zip(risks, risk_counts)},
+        'seconds': round(time.perf_counter() - t0, 3),
+    })
+    with open(os.path.join(args.out, "customer_scores.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"{count:,} customers from {counted:,} completed visits ({read:,} read, {skipped:,} skipped) "
+          f"in {summary['seconds']:.2f}s")
+    print(f"  Segments: {summary['segments']}")
+    print(f"  Churn risk: {summary['churn_risk']}")
+    print(f"  Scores written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,399 @@
+"""Batch what-if staffing simulator over the staff and service master tables.
+
+The scheduling simulator page (SchedulerEngine/DemandEstimator) evaluates one
+scenario at a time in the browser. This script sweeps a grid of staffing and
+roster scenarios against the forecast in analysis_result.json, in a process
+pool, and reports for each one:
+
+    coverage        share of forecast treatment minutes that rostered, eligible staff can serve
+    unserved        minutes left over, by executor role and by weekday
+    overtime        rostered hours above max_hours_per_week, summed over staff-weeks
+    utilization     served minutes / rostered minutes
+
+Every scenario is written to scenarios.csv. simulation_report.json ranks the
+controllable options (hires x roster x transfer) by worst-case coverage
+across the demand and absence conditions, and names the best option for
+each condition.
+
+The master tables are indexed once: a service x staff eligibility matrix per
+transfer policy, and a staff x (day, shift) availability matrix from the
+availability column ("Mon-Sat|AM/PM"). Workers receive these through the pool
+initializer. Demand per (day, shift) and service is predicted_total x service
+mix x (duration + buffer_time). The mix comes from --history (an
+appointments.csv) when given, otherwise it is uniform over the services, as in
+generate_data.py's relational mode. Each shift is SHIFT_HOURS long.
+Services are allocated most-constrained first, and each draws from its eligible
+on-shift staff in proportion to their remaining minutes. This is vectorized
+over all shifts at once.
+
+Scenario axes (the grid is their Cartesian product):
+    --demand-scale   forecast multipliers
+    --hire           ROLE=0,1,2: extra staff per role, cloned from the role's most-certified member
+    --absence        probability that a rostered shift is lost (sampled per --replicas seed)
+    --roster         within_limit: each week, everyone takes the highest-demand available
+                     shifts up to max_hours_per_week; full: every available shift
+    --transfer       strict: certified staff only; services: services.csv `transferable`
+                     (yes = anyone in the executor role, limited = certified or senior)
+
+Usage:
+    python simulate_staffing.py
+    python simulate_staffing.py --demand-scale 1,1.2 --hire doctor=0,1 --hire therapist=0,1,2 --absence 0,0.1 --replicas 5
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+
+from generate_data import WEEKDAY_NAMES, parse_availability, read_master_csv
+
+SHIFTS = ("AM", "PM")
+SHIFT_HOURS = 4  # SchedulerEngine's per-shift heuristic
+ROLES = ("doctor", "nurse", "therapist", "consultant", "admin")
+ROSTERS = ("within_limit", "full")
+TRANSFERS = ("strict", "services")
+DEFAULT_SCALES = "0.9,1.0,1.1,1.25"
+DEFAULT_ABSENCE = "0,0.05,0.1"
+DEFAULT_HIRES = ["doctor=0,1", "nurse=0,1", "therapist=0,1,2", "consultant=0,1"]
+TOP_OPTIONS = 20
+
+_MODEL = None  # set in each worker by _init_worker
+
+
+def parse_shifts(value):
+    """'Mon-Sat|AM/PM (rotate)' -> {'AM', 'PM'}"""
+    _, _, part = value.partition('|')
+    found = {s for s in part.split('(')[0].replace(' ', '').split('/') if s in SHIFTS}
+    return found or set(SHIFTS)
+
+
+def load_forecast(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = json.load(f)
+    days = [date.fromisoformat(r['date']) for r in rows]
+    return days, np.array([float(r.get('predicted_total') or 0) for r in rows])
+
+
+def service_mix(services, history=None):
+    """(mix per service, AM share) from an appointments.csv, else uniform and 0.5."""
+    names = [s['service_name'] for s in services]
+    if history and os.path.exists(history):
+        counts, am, total = Counter(), 0, 0
+        with open(history, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                if (row.get('status') or "").strip().lower() == "cancelled":
+                    continue
+                counts[(row.get('service_item') or "").strip()] += 1
+                total += 1
+                am += (row.get('time') or "12").strip()[:2] < "12"
+        mix = np.array([counts[n] for n in names], dtype=np.float64)
+        if mix.sum() > 0:
+            return mix / mix.sum(), am / total
+    return np.full(len(names), 1.0 / len(names)), 0.5
+
+
+def build_model(data_dir, forecast_path, history=None):
+    """Index the master tables and the forecast once; the result is shipped to every worker."""
+    staff = [r for r in read_master_csv(os.path.join(data_dir, 'staff.csv'))
+             if r.get('status', 'active').lower() == 'active']
+    services = read_master_csv(os.path.join(data_dir, 'services.csv'))
+    days, predicted = load_forecast(forecast_path)
+    mix, am_share = service_mix(services, history)
+
+    service_names = [s['service_name'] for s in services]
+    slot_weekday = np.repeat([d.weekday() for d in days], len(SHIFTS))
+    slot_shift = np.tile(np.arange(len(SHIFTS)), len(days))
+    iso_weeks = [d.isocalendar()[:2] for d in days]
+    week_codes = {w: i for i, w in enumerate(sorted(set(iso_weeks)))}
+    slot_week = np.repeat([week_codes[w] for w in iso_weeks], len(SHIFTS))
+
+    minutes = np.array([int(s['duration'] or 0) + int(s['buffer_time'] or 0) for s in services], dtype=np.float64)
+    shift_share = np.array([am_share, 1 - am_share])
+    # demand[slot, service] in minutes
+    demand = (np.repeat(predicted, len(SHIFTS)) * shift_share[slot_shift])[:, None] * (mix * minutes)[None, :]
+
+    return {
+        'staff': [{'name': r['staff_name'], 'role': r['staff_type'].lower(), 'skill': r.get('skill_level', ''),
+                   'certified': set(filter(None, (x.strip() for x in r['certified_services'].split('|')))),
+                   'weekdays': parse_availability(r.get('availability', '')),
+                   'shifts': parse_shifts(r.get('availability', '')),
+                   'max_hours': float(r.get('max_hours_per_week') or 40)} for r in staff],
+        'service_names': service_names,
+        'service_roles': np.array([s['executor_role'].lower() for s in services]),
+        'transferable': [s.get('transferable', 'no').lower() for s in services],
+        'days': [d.isoformat() for d in days],
+        'slot_weekday': slot_weekday,
+        'slot_shift': slot_shift,
+        'slot_week': slot_week,
+        'demand': demand,
+    }
+
+
+def hire_template(model, role):
+    """The role's most-certified member, copied for hires."""
+    members = [s for s in model['staff'] if s['role'] == role]
+    if not members:
+        return None
+    return max(members, key=lambda s: (len(s['certified']), s['max_hours']))
+
+
+def scenario_staff(model, hires):
+    staff = list(model['staff'])
+    for role, count in hires.items():
+        template = hire_template(model, role)
+        if template is None:
+            continue
+        staff += [dict(template, name=f"New {role} {k + 1}") for k in range(count)]
+    return staff
+
+
+def eligibility(model, staff, transfer):
+    """eligible[service, staff]: who may perform each service under the transfer policy."""
+    roles = np.array([s['role'] for s in staff])
+    same_role = model['service_roles'][:, None] == roles[None, :]
+    certified = np.array([[name in s['certified'] for s in staff] for name in model['service_names']])
+    if transfer == "strict":
+        return same_role & certified
+    senior = np.array([s['skill'] == "senior" for s in staff])
+    rule = np.array(model['transferable'])[:, None]
+    return same_role & ((rule == "yes") | certified | ((rule == "limited") & senior[None, :]))
+
+
+def availability(model, staff):
+    """available[staff, slot] from each member's weekdays and shifts."""
+    weekday, shift = model['slot_weekday'], model['slot_shift']
+    return np.array([np.isin(weekday, list(s['weekdays'])) & np.isin(shift, [SHIFTS.index(x) for x in s['shifts']])
+                     for s in staff])
+
+
+def build_roster(model, staff, available, eligible, policy):
+    """rostered[staff, slot]."""
+    if policy == "full":
+        return available.copy()
+    # Each week, take the available shifts with the most demand this person can serve
+    relevant = (model['demand'] @ eligible).T  # [staff, slot]
+    budget = np.array([int(s['max_hours'] // SHIFT_HOURS) for s in staff])
+    rostered = np.zeros_like(available)
+    for week in np.unique(model['slot_week']):
+        cols = np.flatnonzero(model['slot_week'] == week)
+        score = np.where(available[:, cols], relevant[:, cols], -np.inf)
+        order = np.argsort(-score, axis=1, kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(len(cols))[None, :].repeat(len(staff), 0), axis=1)
+        rostered[:, cols] = (ranks < budget[:, None]) & available[:, cols]
+    return rostered
+
+
+def allocate(demand, eligible, capacity):
+    """Serve demand[slot, service] from capacity[slot, staff]; returns (served[slot, service], busy[slot, staff])."""
+    remaining = capacity.astype(np.float64).copy()
+    served = np.zeros_like(demand)
+    # Most constrained services first, so flexible staff are not used up by services anyone could take
+    for j in np.argsort(eligible.sum(axis=1), kind='stable'):
+        pool = remaining * eligible[j][None, :]
+        total = pool.sum(axis=1)
+        take = np.minimum(demand[:, j], total)
+        served[:, j] = take
+        share = np.divide(take, total, out=np.zeros_like(take), where=total > 0)
+        remaining -= pool * share[:, None]
+    return served, capacity - remaining
+
+
+def evaluate(scenario):
+    model = _MODEL
+    staff = scenario_staff(model, scenario['hires'])
+    eligible = eligibility(model, staff, scenario['transfer'])
+    available = availability(model, staff)
+    rostered = build_roster(model, staff, available, eligible, scenario['roster'])
+    if scenario['absence'] > 0:
+        rng = np.random.default_rng([scenario['seed'], scenario['id']])
+        rostered &= rng.random(rostered.shape) >= scenario['absence']
+
+    demand = model['demand'] * scenario['demand_scale']
+    capacity = rostered.T * (SHIFT_HOURS * 60)  # [slot, staff]
+    served, busy = allocate(demand, eligible, capacity)
+    unserved = demand - served
+
+    hours = np.zeros((len(staff), model['slot_week'].max() + 1))
+    np.add.at(hours.T, model['slot_week'], rostered.T * SHIFT_HOURS)
+    max_hours = np.array([s['max_hours'] for s in staff])
+    overtime = np.maximum(hours - max_hours[:, None], 0)
+
+    total_demand, total_served = demand.sum(), served.sum()
+    by_role = {role: round(float(unserved[:, model['service_roles'] == role].sum()), 1) for role in ROLES}
+    by_weekday = np.bincount(model['slot_weekday'], unserved.sum(axis=1), minlength=7)
+    return dict(scenario, **{
+        'staff': len(staff),
+        'demand_minutes': round(float(total_demand), 1),
+        'served_minutes': round(float(total_served), 1),
+        'coverage': round(float(total_served / total_demand), 4) if total_demand else 1.0,
+        'unserved_minutes': round(float(total_demand - total_served), 1),
+        'unserved_by_role': by_role,
+        'unserved_by_weekday': {WEEKDAY_NAMES[d]: round(float(v), 1) for d, v in enumerate(by_weekday) if v > 0},
+        'rostered_hours': float(rostered.sum() * SHIFT_HOURS),
+        'overtime_hours': float(overtime.sum()),
+        'overtime_staff_weeks': int((overtime > 0).sum()),
+        'utilization': round(float(busy.sum() / capacity.sum()), 4) if capacity.sum() else 0.0,
+    })
+
+
+def _init_worker(model):
+    global _MODEL
+    _MODEL = model
+
+
+def parse_floats(value):
+    return [float(v) for v in value.split(',') if v.strip()]
+
+
+def parse_hire(value):
+    role, _, counts = value.partition('=')
+    return role.strip().lower(), [int(c) for c in counts.split(',') if c.strip()] or [0]
+
+
+def scenario_grid(args):
+    hire_axes = dict(parse_hire(h) for h in (args.hire or DEFAULT_HIRES))
+    roles = sorted(hire_axes)
+    grid = itertools.product(parse_floats(args.demand_scale), itertools.product(*(hire_axes[r] for r in roles)),
+                             parse_floats(args.absence), args.roster.split(','), args.transfer.split(','))
+    scenarios = []
+    for scale, counts, absence, roster, transfer in grid:
+        # Replicas only differ when shifts are randomly lost
+        for replica in range(args.replicas if absence > 0 else 1):
+            scenarios.append({'id': len(scenarios), 'demand_scale': scale, 'hires': dict(zip(roles, counts)),
+                              'absence': absence, 'roster': roster.strip(), 'transfer': transfer.strip(),
+                              'seed': args.seed + replica})
+    return scenarios
+
+
+def write_csv(path, results):
+    columns = ['id', 'demand_scale', 'hires', 'absence', 'roster', 'transfer', 'seed', 'staff', 'coverage',
+               'unserved_minutes', 'overtime_hours', 'overtime_staff_weeks', 'rostered_hours', 'utilization']
+    roles = [f"unserved_{r}" for r in ROLES]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns + roles)
+        for r in results:
+            writer.writerow([hires_label(r['hires']) if c == 'hires' else r[c] for c in columns] +
+                            [r['unserved_by_role'][role] for role in ROLES])
+
+
+def hires_label(hires):
+    return " ".join(f"{k}+{v}" for k, v in hires.items() if v) or "no hires"
+
+
+def rank_options(results):
+    """Compare the controllable choices (hires, roster, transfer) across the conditions (demand, absence).
+
+    Replicas are averaged per condition. Options are ranked by worst-case
+    coverage, then mean overtime, then number of hires.
+    """
+    cells = {}
+    for r in results:
+        option = (tuple(r['hires'].items()), r['roster'], r['transfer'])
+        cells.setdefault(option, {}).setdefault((r['demand_scale'], r['absence']), []).append(r)
+
+    options, by_condition = [], {}
+    for option, conditions in cells.items():
+        hires, roster, transfer = option
+        means = {}
+        for condition, runs in conditions.items():
+            means[condition] = (float(np.mean([r['coverage'] for r in runs])),
+                                float(np.mean([r['overtime_hours'] for r in runs])))
+            by_condition.setdefault(condition, []).append((means[condition], option))
+        options.append({
+            'hires': dict(hires),
+            'roster': roster,
+            'transfer': transfer,
+            'worst_coverage': round(min(c for c, _ in means.values()), 4),
+            'mean_coverage': round(float(np.mean([c for c, _ in means.values()])), 4),
+            'mean_overtime_hours': round(float(np.mean([o for _, o in means.values()])), 1),
+            'hired': sum(v for _, v in hires),
+        })
+    options.sort(key=lambda o: (-o['worst_coverage'], o['mean_overtime_hours'], o['hired']))
+
+    best = []
+    for (scale, absence), entries in sorted(by_condition.items()):
+        (coverage, overtime), (hires, roster, transfer) = min(
+            entries, key=lambda e: (-e[0][0], e[0][1], sum(v for _, v in e[1][0])))
+        best.append({'demand_scale': scale, 'absence': absence, 'hires': dict(hires), 'roster': roster,
+                     'transfer': transfer, 'coverage': round(coverage, 4), 'overtime_hours': round(overtime, 1)})
+    return options, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep staffing and roster scenarios against the forecast.")
+    parser.add_argument('--masters', default='public/data', help="Directory with staff.csv and services.csv")
+    parser.add_argument('--forecast', default='analysis_result.json')
+    parser.add_argument('--history', help="appointments.csv for the service mix and AM/PM split")
+    parser.add_argument('--demand-scale', default=DEFAULT_SCALES)
+    parser.add_argument('--hire', action='append', metavar='ROLE=N,N', help="Hire counts per role (repeatable)")
+    parser.add_argument('--absence', default=DEFAULT_ABSENCE)
+    parser.add_argument('--roster', default=",".join(ROSTERS))
+    parser.add_argument('--transfer', default=",".join(TRANSFERS))
+    parser.add_argument('--replicas', type=int, default=3, help="Random seeds per scenario with absence > 0")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--out', default='simulation')
+    args = parser.parse_args(argv)
+
+    for path in (os.path.join(args.masters, 'staff.csv'), os.path.join(args.masters, 'services.csv'), args.forecast):
+        if not os.path.exists(path):
+            print(f"Error: File not found at {path}")
+            return 1
+    bad = [v for v in args.roster.split(',') if v.strip() not in ROSTERS] + \
+        [v for v in args.transfer.split(',') if v.strip() not in TRANSFERS]
+    if bad:
+        print(f"Unknown roster/transfer policy: {', '.join(bad)}")
+        return 1
+
+    t0 = time.perf_counter()
+    model = build_model(args.masters, args.forecast, args.history)
+    scenarios = scenario_grid(args)
+    print(f"Evaluating {len(scenarios):,} scenarios over {len(model['days'])} forecast days "
+          f"({model['days'][0]} .. {model['days'][-1]}), {len(model['staff'])} staff")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(model,)) as pool:
+        results = list(pool.map(evaluate, scenarios, chunksize=max(1, len(scenarios) // 64)))
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(args.out, exist_ok=True)
+    write_csv(os.path.join(args.out, 'scenarios.csv'), results)
+    options, best = rank_options(results)
+    baseline = next((r for r in results if r['demand_scale'] == 1.0 and not any(r['hires'].values())
+                     and r['absence'] == 0 and r['roster'] == "within_limit" and r['transfer'] == "services"), None)
+    report = {
+        'forecast': args.forecast,
+        'days': [model['days'][0], model['days'][-1]],
+        'staff': len(model['staff']),
+        'shift_hours': SHIFT_HOURS,
+        'scenarios': len(results),
+        'seconds': round(elapsed, 2),
+        'baseline': baseline,
+        'options': options[:TOP_OPTIONS],
+        'best_by_condition': best,
+    }
+    with open(os.path.join(args.out, 'simulation_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"Done in {elapsed:.2f}s ({len(results) / elapsed:,.0f} scenarios/s)")
+    if baseline:
+        print(f"  Baseline: coverage {baseline['coverage']:.1%}, unserved {baseline['unserved_minutes']:,.0f} min, "
+              f"overtime {baseline['overtime_hours']:,.0f} h")
+    print("  Most robust options (worst-case coverage across demand/absence):")
+    for o in options[:5]:
+        print(f"    {hires_label(o['hires']):<44} {o['roster']:<13} {o['transfer']:<9} "
+              f"worst {o['worst_coverage']:.1%}  mean {o['mean_coverage']:.1%}  "
+              f"overtime {o['mean_overtime_hours']:,.0f} h")
+    print(f"Results written to {args.out}/scenarios.csv and {args.out}/simulation_report.json")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -7,5 +7,7 @@ declare global {
 
   interface ImportMeta {
     env: Record<string, string | undefined>;
+    // Vite import.meta.glob（eager 模式）
+    glob<T = unknown>(pattern: string, options?: { eager?: boolean; import?: string }): Record<string, T>;
   }
 }
@@ -27,6 +27,82 @@ interface LaunchCoverData {
     reminders?: Array<{ title: string, desc: string, diffDays?: number, type: 'task' | 'external', id?: string }>;
 }
 
+/**
+ * 響應式背景圖 manifest（由 optimize_images.py 產生）
+ * - placeholder：約 1 KB 的模糊 base64 佔位圖，可立即繪製
+ * - srcset：各格式的寬度階梯，由瀏覽器依螢幕寬度挑選
+ */
+interface ResponsiveImageManifest {
+    formats: string[];
+    images: Record<string, {
+        width: number;
+        height: number;
+        placeholder: string;
+        srcset: Record<string, string>;
+    }>;
+}
+
+/**
+ * manifest 於 build 時由 Vite 打包進 bundle，佔位圖與 srcset 不需等待額外請求
+ * 以 glob 匯入：檔案不存在（尚未執行 optimize_images.py）時得到空物件，build 不會失敗
+ */
+const responsiveManifests = import.meta.glob<ResponsiveImageManifest>(
+    "../../public/images/responsive/responsive_manifest.json",
+    { eager: true, import: "default" }
+);
+const RESPONSIVE_MANIFEST: ResponsiveImageManifest | undefined = Object.values(responsiveManifests)[0];
+const COVER_IMAGE_KEY = "ai_operations_center_bg";
+
+/**
+ * 響應式背景載入
+ * 1. 以 manifest 中的 base64 佔位圖立即繪製
+ * 2. 用隱藏的 <picture> 讓瀏覽器依 AVIF/WebP 支援度與螢幕寬度挑選 srcset
+ * 3. 載入完成後換成實際圖片
+ * manifest 不存在時，退回原本 200ms 後套用 .bg-loaded 的 CSS 背景
+ */
+function loadResponsiveBackground(container: HTMLElement): void {
+    const fallback = () => setTimeout(() => container.classList.add('bg-loaded'), 200);
+    try {
+        const manifest = RESPONSIVE_MANIFEST;
+        if (!manifest) throw new Error("responsive_manifest.json not bundled");
+        const entry = manifest.images?.[COVER_IMAGE_KEY];
+        if (!entry) throw new Error(`${COVER_IMAGE_KEY} not in manifest`);
+
+        // .bg-loaded 提供 size/position/attachment；inline 背景優先於 CSS 的 image-set
+        container.style.backgroundImage = `url("${entry.placeholder}")`;
+        container.classList.add('bg-loaded');
+
+        const picture = document.createElement('picture');
+        picture.style.display = 'none';
+        manifest.formats.forEach(format => {
+            if (!entry.srcset[format]) return;
+            const source = document.createElement('source');
+            source.type = `image/${format}`;
+            source.srcset = entry.srcset[format];
+            source.sizes = '100vw';
+            picture.appendChild(source);
+        });
+        const img = document.createElement('img');
+        img.alt = '';
+        img.decoding = 'async';
+        img.sizes = '100vw';
+        img.srcset = entry.srcset.webp ?? '';
+        img.onload = () => {
+            container.style.backgroundImage = `url("${img.currentSrc}")`;
+            picture.remove();
+        };
+        img.onerror = () => {
+            container.style.backgroundImage = '';
+            picture.remove();
+        };
+        picture.appendChild(img);
+        document.body.appendChild(picture);
+    } catch (e) {
+        console.warn("[Launch Cover] 響應式背景 manifest 無法使用，使用預設背景", e);
+        fallback();
+    }
+}
+
 /**
  * 初始化啟動封面頁
  */
@@ -87,10 +163,8 @@ export async function initLaunchCover(): Promise<void> {
     // [效能優化] 讓瀏覽器有機會先繪製 Skeleton (Yield to main thread)
     await new Promise(r => requestAnimationFrame(r));
     
-    // 1. 啟動背景圖片延遲載入 (200ms 後，不阻塞首屏)
-    setTimeout(() => {
-        coverContainer.classList.add('bg-loaded');
-    }, 200);
+    // 1. 背景圖：先畫模糊佔位圖，再載入符合螢幕寬度的尺寸 (不阻塞首屏)
+    loadResponsiveBackground(coverContainer);
 
     // 2. 啟動 AI 連線測試 (Non-blocking / Fire-and-forget)
     // 不等待結果，僅更新內部狀態，避免阻塞 UI
@@ -1,218 +1,248 @@
-import fs
+"""Apply marker-delimited source patches to the src/pages/*.ts files.
+
+Generated UI blocks are shipped as patches listed in a JSON manifest
+(patches/manifest.json by default):
+
+    {"version": 1, "patches": [
+        {"id": "launch-task-preview",
+         "file": "src/pages/launchCoverPage.ts",      (a glob such as src/pages/*.ts also works)
+         "start": "// 3. Sorting",
+         "end": "})()",
+         "replacement_file": "launchCoverPage.task_preview.txt",   (or inline "replacement")
+         "expect_sha256": "..."}                      (optional)
+    ]}
+
+A patch replaces the block from `start` up to and including the first `end`
+after it. The replacement must itself begin with `start` and end with `end`, so
+the patched file still contains the same block boundaries and the next run
+finds the same block. `start` must occur exactly once in a target file.
+
+Each target file is read once. All of its blocks are located against the
+original text, checked for overlaps, and spliced in one pass. Files are
+processed in a thread pool. Re-runs are safe:
+
+- a block whose SHA-256 already equals the replacement's is skipped,
+- when `expect_sha256` is given, a block that matches neither it nor the
+  replacement was edited since the patch was generated and is reported as a
+  conflict instead of being overwritten (--force overwrites),
+- a file whose content hash is unchanged after patching is not rewritten, so
+  its mtime is untouched and the dev server does not reload.
+
+Line endings of the target are kept. Writes are atomic (temporary file +
+os.replace). --check reports pending patches without writing and exits 1 if
+any are pending, e.g. for CI.
+
+Usage:
+    python update_launch_page.py
+    python update_launch_page.py --manifest patches/manifest.json --root . --check
+    python update_launch_page.py --only launch-task-preview --force
+"""
+import argparse
+import glob
+import hashlib
+import json
 import os
-
-file_path = 'd:/Backup/clinic_dashboard_ai/src/pages/launchCoverPage.ts'
-with open(file_path, 'r', encoding='utf-8') as f:
-    content = f.read()
-
-# Marker for start of replacement
-start_marker = '// 3. Sorting'
-# Marker for end (we want to replace up to the closing of the IIFE)
-# The IIFE ends with })() and is inside the template string.
-# We can look for the return statement's closing div and the })()
-end_marker = '})()'
-
-start_idx = content.find(start_marker)
-# Find the LAST instance of end_marker because there might be nested ones? 
-# No, })() is unique for the IIFE close.
-# But wait, step 63 shows `})()` at line 582, and there might be others?
-# Actually the `})()` usually appears at the end of the block.
-# Let's search from start_idx to be safe.
-end_idx = content.find(end_marker, start_idx)
-
-if start_idx == -1 or end_idx == -1:
-    print('Could not find markers')
-    print(f'Start found: {start_idx}, End found: {end_idx}')
-    exit(1)
-
-# Add length of end_marker to include it? No, we want to replace UP TO it if we include it in new_logic.
-# My new_logic ends with `})()`.
-# So I should include it in replacement or exclude it from preserved?
-# I will make new_logic include it.
-end_idx += len(end_marker)
-
-new_logic = """// 3. Sorting & Mixed Strategy (Task + Risks)
-                const internalTasks = sorted.filter(r => r.type === 'task');
-                const riskAlerts = sorted.filter(r => r.type !== 'task');
-
-                let primaryCards: any[] = [];
-                const usedIds = new Set<string>();
-
-                // Strategy: 1 Todo + Rest Risks
-                // Step A: Pick 1 Internal Task (if any)
-                if (internalTasks.length > 0) {
-                    const topTask = internalTasks[0];
-                    primaryCards.push(topTask);
-                    usedIds.add(JSON.stringify(topTask));
-                }
-
-                // Step B: Fill remaining slots with Top Risk Alerts
-                const slotsLeft = maxCards - primaryCards.length;
-                let addedRisks = 0;
-                for (const risk of riskAlerts) {
-                    if (addedRisks >= slotsLeft) break;
-                    primaryCards.push(risk);
-                    usedIds.add(JSON.stringify(risk));
-                    addedRisks++;
-                }
-
-                // Step C: If still have slots (e.g. no risks), fill with remaining sorted items
-                if (primaryCards.length < maxCards) {
-                    const remainingSlots = maxCards - primaryCards.length;
-                    const leftovers = sorted.filter(r => !usedIds.has(JSON.stringify(r)));
-                    for (let i = 0; i < remainingSlots && i < leftovers.length; i++) {
-                         primaryCards.push(leftovers[i]);
-                         usedIds.add(JSON.stringify(leftovers[i]));
-                    }
-                }
-                
-                // Sort Primary Cards by Priority Score
-                primaryCards.sort((a, b) => getScore(b) - getScore(a));
-
-                // Calculate Overflow
-                const overflowCards = sorted.filter(r => !usedIds.has(JSON.stringify(r)));
-                const overflowCount = overflowCards.length;
-                const totalRisk = sorted.filter(r => checkRisk(r)).length;
-
-                // 4. Prepare Data Structure
-                const launchTaskData = {
-                    headerBadges: [
-                        totalRisk > 0 ? { key: 'risk', label: `⚠️ 風險 ${totalRisk}`, count: totalRisk, style: 'background: rgba(220, 38, 38, 0.2); color: #f87171; border: 1px solid rgba(220, 38, 38, 0.4);' } : null,
-                        overflowCount > 0 ? { key: 'more', label: `+${overflowCount} 更多`, count: overflowCount, style: 'background: rgba(59, 130, 246, 0.2); color: #60a5fa; border: 1px solid rgba(59, 130, 246, 0.4);' } : null
-                    ].filter(Boolean) as any[]
-                };
-
-                // 5. Render Functions
-                const renderCard = (task: any) => {
-                    const t = task.id ? TaskStore.getTask(task.id) : null;
-                    const aiUnsafe = t?.aiSuggestion && !t.aiSuggestion.isSafe;
-                    const isHighRisk = aiUnsafe || checkRisk(task);
-                    const borderClass = isHighRisk ? 'task-card-risk' : 'task-card-normal';
-                    
-                    let cleanDesc = task.desc;
-                    if (aiUnsafe) cleanDesc = `⚖️ AI 建議：${t?.aiSuggestion?.suggestion}`;
-                    if (cleanDesc.length > 40) cleanDesc = cleanDesc.substring(0, 38) + '...';
-
-                    return `
-                        <div class="launch-task-card ${borderClass}" onclick="window.switchPage('tasks')">
-                            <div class="task-card-header">
-                                <div class="task-card-icon ${isHighRisk ? 'icon-risk' : 'icon-normal'}" style="${isHighRisk ? 'color: #ef4444;' : ''}">
-                                    <i class="fa-solid ${isHighRisk ? 'fa-triangle-exclamation' : 'fa-bell'}"></i>
-                                </div>
-                                <div class="task-card-title">
-                                    ${task.title}
-                                    ${isHighRisk ? `<span class="risk-tag" style="background:rgba(239,68,68,0.2); color:#fca5a5; border:1px solid rgba(239,68,68,0.5);">${aiUnsafe ? 'AI 警示' : '違規風險'}</span>` : ''}
-                                </div>
-                            </div>
-                            <div class="task-card-desc" style="${aiUnsafe ? 'color: #fca5a5;' : ''}">${cleanDesc}</div>
-                            ${task.diffDays !== undefined && task.diffDays !== 0 ? `<div class="task-card-meta"><i class="fa-regular fa-clock"></i> 剩 ${task.diffDays} 天</div>` : ''}
-                        </div>
-                    `;
-                };
-
-                const renderBadge = (b: any) => `
-                    <span class="launch-badge" 
-                          onclick="document.getElementById('launch-more-modal').classList.add('active')"
-                          style="cursor: pointer; padding: 2px 8px; border-radius: 12px; font-size: 0.8rem; display: flex; align-items: center; gap: 4px; ${b.style}">
-                        ${b.label}
-                    </span>
-                `;
-
-                return `
-                    <div class="launch-task-preview-section">
-                        <div class="task-preview-header">
-                            <i class="fa-solid fa-clipboard-check"></i>
-                            <span>即時任務預覽</span>
-                            
-                            <!-- Header Badges -->
-                            <div class="header-badges" style="margin-left: auto; display: flex; gap: 8px; align-items: center;">
-                                ${launchTaskData.headerBadges.map(renderBadge).join('')}
-                                ${launchTaskData.headerBadges.length === 0 ? `<span class="task-count" style="margin: 0; opacity: 0.6; font-size: 0.8rem;">暫無緊急事項</span>` : ''}
-                            </div>
-                        </div>
-                        
-                        <div class="task-preview-cards">
-                            ${primaryCards.map(renderCard).join('')}
-                        </div>
-
-                        <!-- Modal Structure -->
-                        <div id="launch-more-modal" class="launch-modal-overlay">
-                            <div class="launch-modal-content glass-panel">
-                                <div class="launch-modal-header">
-                                    <h3>🔔 所有提醒清單 (${sorted.length})</h3>
-                                    <button class="close-btn" onclick="document.getElementById('launch-more-modal').classList.remove('active')">
-                                        <i class="fa-solid fa-xmark"></i>
-                                    </button>
-                                </div>
-                                <div class="launch-modal-body">
-                                    ${sorted.map(task => {
-                                        const isHighRisk = checkRisk(task);
-                                        return `
-                                            <div class="modal-list-item ${isHighRisk ? 'item-risk' : ''}" onclick="window.switchPage('tasks')">
-                                                <div class="item-icon">
-                                                    <i class="fa-solid ${isHighRisk ? 'fa-triangle-exclamation' : 'fa-circle-info'}"></i>
-                                                </div>
-                                                <div class="item-info">
-                                                    <div class="item-title">${task.title}</div>
-                                                    <div class="item-desc">${task.desc}</div>
-                                                </div>
-                                                ${task.type !== 'task' ? `<span class="item-tag">外部</span>` : ''}
-                                            </div>
-                                        `;
-                                    }).join('')}
-                                </div>
-                            </div>
-                        </div>
-                        
-                        <style>
-                            .launch-modal-overlay {
-                                position: fixed; top: 0; left: 0; width: 100%; height: 100%;
-                                background: rgba(0,0,0,0.6); backdrop-filter: blur(4px);
-                                z-index: 9999;
-                                display: flex; align-items: center; justify-content: center;
-                                opacity: 0; pointer-events: none; transition: opacity 0.3s;
-                            }
-                            .launch-modal-overlay.active {
-                                opacity: 1; pointer-events: auto;
-                            }
-                            .launch-modal-content {
-                                width: 90%; max-width: 500px; max-height: 80vh;
-                                background: rgba(17, 24, 39, 0.95);
-                                border: 1px solid rgba(255,255,255,0.1);
-                                border-radius: 16px;
-                                display: flex; flex-direction: column;
-                                box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.5);
-                            }
-                            .launch-modal-header {
-                                padding: 16px; border-bottom: 1px solid rgba(255,255,255,0.1);
-                                display: flex; justify-content: space-between; align-items: center;
-                            }
-                            .launch-modal-header h3 { margin: 0; font-size: 1.1rem; color: #fff; }
-                            .close-btn { background: none; border: none; color: rgba(255,255,255,0.6); font-size: 1.2rem; cursor: pointer; }
-                            .close-btn:hover { color: #fff; }
-                            .launch-modal-body { padding: 16px; overflow-y: auto; }
-                            .modal-list-item {
-                                display: flex; gap: 12px; padding: 12px;
-                                border-radius: 8px; background: rgba(255,255,255,0.03);
-                                margin-bottom: 8px; cursor: pointer; transition: background 0.2s;
-                                align-items: flex-start;
-                            }
-                            .modal-list-item:hover { background: rgba(255,255,255,0.08); }
-                            .modal-list-item.item-risk { border-left: 3px solid #ef4444; background: rgba(239,68,68,0.05); }
-                            .item-icon { margin-top: 2px; color: rgba(255,255,255,0.5); font-size: 0.9rem; }
-                            .modal-list-item.item-risk .item-icon { color: #ef4444; }
-                            .item-info { flex: 1; min-width: 0; }
-                            .item-title { font-weight: 500; font-size: 0.95rem; margin-bottom: 2px; color: #e5e7eb; }
-                            .item-desc { font-size: 0.85rem; color: rgba(255,255,255,0.6); line-height: 1.4; }
-                            .item-tag { font-size: 0.7rem; padding: 2px 6px; border-radius: 4px; background: rgba(255,255,255,0.1); color: rgba(255,255,255,0.6); height: fit-content; margin-top: 2px; }
-                        </style>
-                    </div>
-                `;
-})()"""
-
-final_content = content[:start_idx] + new_logic + content[end_idx:]
-
-with open(file_path, 'w', encoding='utf-8') as f:
-    f.write(final_content)
-
-print('Update successful')
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST = os.path.join('patches', 'manifest.json')
+GLOB_CHARS = "*?["
+
+
+class PatchError(Exception):
+    pass
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def locate(content, start, end):
+    """(begin, stop) of the block from `start` through the first `end` after it, or None if `start` is absent."""
+    begin = content.find(start)
+    if begin == -1:
+        return None
+    if content.find(start, begin + 1) != -1:
+        raise PatchError(f"start marker {start!r} occurs more than once")
+    stop = content.find(end, begin + len(start))
+    if stop == -1:
+        raise PatchError(f"end marker {end!r} not found after {start!r}")
+    return begin, stop + len(end)
+
+
+def load_manifest(path):
+    """Validated patch list; replacement text is loaded once here, not per file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise PatchError(f"{path}: unsupported manifest version {manifest.get('version')!r}")
+    base = os.path.dirname(os.path.abspath(path))
+    patches, seen = [], set()
+    for i, entry in enumerate(manifest.get('patches', [])):
+        patch_id = entry.get('id') or f"patch-{i}"
+        if patch_id in seen:
+            raise PatchError(f"{path}: duplicate patch id {patch_id!r}")
+        seen.add(patch_id)
+        missing = [k for k in ('file', 'start', 'end') if not entry.get(k)]
+        if missing:
+            raise PatchError(f"{patch_id}: missing {', '.join(missing)}")
+        if 'replacement' in entry:
+            replacement = entry['replacement']
+        elif entry.get('replacement_file'):
+            with open(os.path.join(base, entry['replacement_file']), 'r', encoding='utf-8', newline='') as f:
+                replacement = f.read()
+        else:
+            raise PatchError(f"{patch_id}: needs 'replacement' or 'replacement_file'")
+        replacement = replacement.replace('\r\n', '\n')
+        # The patched block must be found again on the next run, or re-runs would not be no-ops
+        try:
+            found = locate(replacement, entry['start'], entry['end'])
+        except PatchError as e:
+            raise PatchError(f"{patch_id}: replacement is not self-delimiting ({e})")
+        if found != (0, len(replacement)):
+            raise PatchError(f"{patch_id}: replacement must start with {entry['start']!r} "
+                             f"and end at its first {entry['end']!r}")
+        patches.append({
+            'id': patch_id,
+            'file': entry['file'],
+            'start': entry['start'],
+            'end': entry['end'],
+            'replacement': replacement,
+            'replacement_sha256': sha256_text(replacement),
+            'expect_sha256': entry.get('expect_sha256'),
+        })
+    return patches
+
+
+def group_by_file(patches, root):
+    """{absolute path: [(patch, required), ...]}; glob targets skip files that lack the start marker."""
+    targets = {}
+    for patch in patches:
+        pattern = os.path.join(root, patch['file'])
+        is_glob = any(c in patch['file'] for c in GLOB_CHARS)
+        paths = sorted(glob.glob(pattern)) if is_glob else [pattern]
+        for path in paths:
+            entries = targets.setdefault(os.path.abspath(path), [])
+            entries.append((patch, not is_glob))
+    return targets
+
+
+def patch_file(path, entries, force, dry_run):
+    """Apply every patch for one file in a single read/splice/write."""
+    result = {'file': path, 'applied': [], 'current': [], 'skipped': [], 'conflicts': [], 'errors': []}
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            original = f.read()
+    except OSError as e:
+        result['errors'].append(f"cannot read: {e.strerror}")
+        return result
+    crlf = '\r\n' in original
+    content = original.replace('\r\n', '\n') if crlf else original
+    result['pre_sha256'] = sha256_text(original)
+
+    edits = []
+    for patch, required in entries:
+        try:
+            found = locate(content, patch['start'], patch['end'])
+        except PatchError as e:
+            result['errors'].append(f"{patch['id']}: {e}")
+            continue
+        if found is None:
+            if required:
+                result['errors'].append(f"{patch['id']}: start marker {patch['start']!r} not found")
+            else:
+                result['skipped'].append(patch['id'])
+            continue
+        block_sha = sha256_text(content[found[0]:found[1]])
+        if block_sha == patch['replacement_sha256']:
+            result['current'].append(patch['id'])
+        elif patch['expect_sha256'] and block_sha != patch['expect_sha256'] and not force:
+            result['conflicts'].append(patch['id'])
+        else:
+            edits.append((found[0], found[1], patch))
+
+    edits.sort(key=lambda e: e[0])
+    for (_, prev_stop, prev), (begin, _, patch) in zip(edits, edits[1:]):
+        if begin < prev_stop:
+            result['errors'].append(f"{patch['id']}: overlaps {prev['id']}")
+    if result['errors']:
+        return result
+
+    # Splice back to front so earlier offsets stay valid
+    patched = content
+    for begin, stop, patch in reversed(edits):
+        patched = patched[:begin] + patch['replacement'] + patched[stop:]
+    result['applied'] = [patch['id'] for _, _, patch in edits]
+    if crlf:
+        patched = patched.replace('\n', '\r\n')
+    result['post_sha256'] = sha256_text(patched)
+
+    if result['post_sha256'] != result['pre_sha256'] and not dry_run:
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8', newline='') as f:
+            f.write(patched)
+        os.replace(tmp, path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply marker-delimited patches to the page sources.")
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--root', default='.', help="Directory the manifest's file paths are relative to")
+    parser.add_argument('--only', default='', help="Comma-separated patch ids to apply (default: all)")
+    parser.add_argument('--check', action='store_true', help="Report pending patches without writing")
+    parser.add_argument('--force', action='store_true', help="Overwrite blocks that fail their expect_sha256")
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        patches = load_manifest(args.manifest)
+    except (OSError, ValueError, PatchError) as e:
+        print(f"Error: {e}")
+        return 1
+    only = {p.strip() for p in args.only.split(',') if p.strip()}
+    if only:
+        unknown = sorted(only - {p['id'] for p in patches})
+        if unknown:
+            print(f"Error: unknown patch ids: {', '.join(unknown)}")
+            return 1
+        patches = [p for p in patches if p['id'] in only]
+
+    targets = group_by_file(patches, args.root)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda item: patch_file(item[0], item[1], args.force, args.check),
+                                sorted(targets.items())))
+
+    failed = pending = unmatched = 0
+    for r in results:
+        name = os.path.relpath(r['file'], args.root)
+        if r['errors']:
+            failed += 1
+            print(f"{name}: FAILED")
+            for message in r['errors']:
+                print(f"    {message}")
+            continue
+        if not (r['applied'] or r['current'] or r['conflicts']):
+            unmatched += 1
+            continue
+        pending += len(r['applied'])
+        verb = "would apply" if args.check else "applied"
+        parts = [f"{len(r['applied'])} {verb}", f"{len(r['current'])} already current"]
+        if r['conflicts']:
+            failed += 1
+            parts.append(f"{len(r['conflicts'])} CONFLICT ({', '.join(r['conflicts'])}; use --force)")
+        if r['skipped']:
+            parts.append(f"{len(r['skipped'])} without markers")
+        print(f"{name}: {', '.join(parts)}  [{r['pre_sha256'][:12]} -> {r['post_sha256'][:12]}]")
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    print(f"{len(patches)} patches over {len(targets)} files ({unmatched} without markers) in {elapsed_ms:.1f} ms")
+    if failed or (args.check and pending):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,448 @@
+"""Streaming validator and profiler for the public/data CSVs.
+
+Replaces the debug_*.py scripts. Every CSV is streamed with the csv module in
+its own worker process, so memory stays bounded by the reference indexes and
+the per-column profiles rather than the file size. For each file it:
+
+- checks the header against the column sets in src/data/schema.ts and
+  flags a UTF-8 BOM (staff_workload.csv starts with one),
+- resolves doctor/assistant/service/room/equipment/staff references through
+  hash indexes built once from staff.csv, services.csv, rooms.csv and
+  equipment.csv (the same rules as src/logic/dataValidator.ts),
+- profiles every column: null rate, cardinality, min/max for date and numeric
+  columns,
+- writes rows with errors to `<name>.quarantine.csv` with the reasons attached.
+
+The report goes to validation_report.json. The exit status is non-zero when
+errors are found, so this can gate ingest.
+
+Usage:
+    python validate_data.py
+    python validate_data.py --src exports/ --out build/validation --fail-on warning
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIME_RE = re.compile(r"^\d{1,2}:\d{2}(:\d{2})?$")
+NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+BOM = "﻿"
+
+NULL_VALUES = {"", "nan", "null", "none", "n/a"}
+REVENUE_STATUSES = {"completed", "paid", "checked_in"}
+
+# Distinct values tracked exactly per column; beyond this cardinality is reported as a lower bound
+MAX_DISTINCT = 50_000
+# Issue examples kept per code
+MAX_EXAMPLES = 20
+
+# Required / optional columns per dataset, following src/data/schema.ts
+SCHEMAS = {
+    'appointments': {
+        'required': ["appointment_id", "date", "time", "doctor_name", "service_item", "status"],
+        'optional': ["customer_id", "age", "gender", "is_new", "purchased_services", "staff_role",
+                     "assistant_name", "assistant_role", "room", "equipment", "amount", "duration"],
+    },
+    'services': {
+        'required': ["service_name", "category", "price", "duration", "buffer_time", "executor_role"],
+        'optional': ["intensity_level", "transferable"],
+    },
+    'rooms': {'required': ["room_name", "room_type", "status"], 'optional': []},
+    'equipment': {'required': ["equipment_name", "equipment_type", "room_name", "status"], 'optional': []},
+    'staff': {
+        'required': ["staff_name", "staff_type", "specialty", "status"],
+        'optional': ["staff_id", "skill_level", "certified_services", "max_hours_per_week", "availability"],
+    },
+    'staff_workload': {
+        'required': ["date", "staff_name", "cases", "minutes"],
+        'optional': ["staff_id", "staff_type", "staff_role", "action_type", "count", "week"],
+    },
+    'equipment_log': {
+        'required': ["log_id", "date", "time", "equipment_name", "duration_min", "status"],
+        'optional': ["staff_name"],
+    },
+    'package_usage': {
+        'required': ["customer_id", "service_name", "total_sessions", "used_sessions", "remaining_sessions"],
+        'optional': ["customer_name", "last_used_date"],
+    },
+    'customers_profile': {
+        'required': ["customer_id", "gender", "age", "first_visit_date", "last_visit_date", "visit_count"],
+        'optional': ["birth_year", "age_group"],
+    },
+    'customer_visits': {
+        'required': ["customer_id", "visit_date", "status", "revenue"],
+        'optional': ["name", "gender", "age", "visit_time", "treatment_type", "doctor", "nurse", "room_id",
+                     "is_new", "source"],
+    },
+}
+SCHEMAS['customers'] = SCHEMAS['customer_visits']
+
+
+def dataset_of(filename):
+    """appointments_ref_fail.csv -> appointments; unknown names return None."""
+    name = os.path.splitext(filename)[0]
+    if name in SCHEMAS:
+        return name
+    for dataset in sorted(SCHEMAS, key=len, reverse=True):
+        if name.startswith(dataset + "_"):
+            return dataset
+    return None
+
+
+def is_null(value):
+    return value.strip().lower() in NULL_VALUES
+
+
+def valid_date(value):
+    if not DATE_RE.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+# ---------- Reference indexes ----------
+
+def read_small_csv(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return [{k.strip(): (v or "").strip() for k, v in row.items() if k} for row in csv.DictReader(f)]
+
+
+def build_indexes(src):
+    staff = {r['staff_name']: r.get('staff_type', "").lower()
+             for r in read_small_csv(os.path.join(src, 'staff.csv')) if r.get('staff_name')}
+    services = {r['service_name']: r.get('executor_role', "").lower()
+                for r in read_small_csv(os.path.join(src, 'services.csv')) if r.get('service_name')}
+    rooms = {r['room_name'] for r in read_small_csv(os.path.join(src, 'rooms.csv')) if r.get('room_name')}
+    equipment = {r['equipment_name'] for r in read_small_csv(os.path.join(src, 'equipment.csv'))
+                 if r.get('equipment_name')}
+    return {'staff': staff, 'services': services, 'rooms': rooms, 'equipment': equipment}
+
+
+# ---------- Row rules ----------
+
+def check_appointment(row, refs):
+    """[(severity, field, code, message)] for one appointment row."""
+    issues = []
+    day = row.get('date', "")
+    if not valid_date(day):
+        issues.append(('error', 'date', 'INVALID_DATE_FORMAT', f"Invalid date format: {day}"))
+    time_value = row.get('time', "")
+    if not TIME_RE.match(time_value):
+        issues.append(('error', 'time', 'INVALID_TIME_FORMAT', f"Invalid time format: {time_value}"))
+
+    status = row.get('status', "").lower()
+    service_item = row.get('service_item', "")
+    purchased = row.get('purchased_services', "")
+    if status in REVENUE_STATUSES and is_null(service_item) and is_null(purchased):
+        issues.append(('error', 'service_item', 'MISSING_SERVICE_IN_REVENUE', "Revenue status but no service recorded"))
+
+    staff, services = refs['staff'], refs['services']
+    doctor = row.get('doctor_name', "")
+    if not is_null(doctor):
+        doctor_type = staff.get(doctor)
+        if doctor_type is None:
+            issues.append(('error', 'doctor_name', 'UNKNOWN_DOCTOR', f"Doctor '{doctor}' not found in Staff Directory"))
+        elif doctor_type != 'doctor':
+            issues.append(('error', 'doctor_name', 'DOCTOR_TYPE_MISMATCH',
+                           f"Staff '{doctor}' is type '{doctor_type}', expected 'doctor'"))
+
+    if not is_null(service_item):
+        required_role = services.get(service_item)
+        if required_role is None:
+            issues.append(('warning', 'service_item', 'UNKNOWN_SERVICE', f"Service '{service_item}' not in services.csv"))
+        assistant = row.get('assistant_name', "")
+        if required_role and not is_null(assistant):
+            actual_role = staff.get(assistant)
+            if actual_role is None:
+                issues.append(('warning', 'assistant_name', 'UNKNOWN_ASSISTANT',
+                               f"Assistant '{assistant}' not found in Staff Directory"))
+            elif actual_role != required_role:
+                issues.append(('warning', 'assistant_name', 'ROLE_MISMATCH',
+                               f"Service '{service_item}' requires '{required_role}', "
+                               f"but assistant '{assistant}' is '{actual_role}'"))
+
+    room = row.get('room', "")
+    if refs['rooms'] and not is_null(room) and room not in refs['rooms']:
+        issues.append(('warning', 'room', 'UNKNOWN_ROOM', f"Room '{room}' not in rooms.csv"))
+    equipment = row.get('equipment', "")
+    if refs['equipment'] and not is_null(equipment) and equipment not in refs['equipment']:
+        issues.append(('warning', 'equipment', 'UNKNOWN_EQUIPMENT', f"Equipment '{equipment}' not in equipment.csv"))
+    return issues
+
+
+def check_workload(row, refs):
+    issues = []
+    day = row.get('date', "")
+    if not valid_date(day):
+        issues.append(('error', 'date', 'INVALID_DATE_FORMAT', f"Invalid date format: {day}"))
+    name = row.get('staff_name', "")
+    if name not in refs['staff']:
+        issues.append(('error', 'staff_name', 'UNKNOWN_STAFF', f"Staff '{name}' not found in Staff Directory"))
+    for field in ('cases', 'minutes'):
+        value = row.get(field, "")
+        if not value.isdigit():
+            issues.append(('error', field, 'INVALID_NUMBER', f"{field} must be a non-negative integer: {value}"))
+    return issues
+
+
+def check_equipment_log(row, refs):
+    issues = []
+    day = row.get('date', "")
+    if not valid_date(day):
+        issues.append(('error', 'date', 'INVALID_DATE_FORMAT', f"Invalid date format: {day}"))
+    name = row.get('equipment_name', "")
+    if refs['equipment'] and name not in refs['equipment']:
+        issues.append(('warning', 'equipment_name', 'UNKNOWN_EQUIPMENT', f"Equipment '{name}' not in equipment.csv"))
+    if not row.get('duration_min', "").isdigit():
+        issues.append(('error', 'duration_min', 'INVALID_NUMBER', "duration_min must be a non-negative integer"))
+    return issues
+
+
+ROW_RULES = {
+    'appointments': check_appointment,
+    'staff_workload': check_workload,
+    'equipment_log': check_equipment_log,
+}
+
+# Dataset -> column holding the row id used for duplicate detection
+ID_COLUMNS = {'appointments': 'appointment_id', 'equipment_log': 'log_id', 'customers_profile': 'customer_id'}
+
+
+# ---------- Profiling ----------
+
+class ColumnStats:
+    def __init__(self):
+        self.nulls = 0
+        self.distinct = set()
+        self.overflow = False
+        self.numeric = True
+        self.dates = True
+        self.min = self.max = None
+
+    def add(self, value):
+        if is_null(value):
+            self.nulls += 1
+            return
+        if not self.overflow:
+            self.distinct.add(value)
+            if len(self.distinct) > MAX_DISTINCT:
+                self.overflow = True
+                self.distinct = set()
+        if self.dates and not DATE_RE.match(value):
+            self.dates = False
+        if self.numeric and not NUMBER_RE.match(value):
+            self.numeric = False
+        if self.dates:
+            key = value
+        elif self.numeric:
+            key = float(value)
+        else:
+            return
+        if self.min is None or key < self.min:
+            self.min = key
+        if self.max is None or key > self.max:
+            self.max = key
+
+    def summary(self, rows):
+        kind = 'date' if self.dates and self.min is not None else 'number' if self.numeric and self.min is not None \
+            else 'text'
+        stats = {
+            'type': kind,
+            'null_rate': round(self.nulls / rows, 4) if rows else 0.0,
+            'distinct': MAX_DISTINCT if self.overflow else len(self.distinct),
+            'distinct_is_lower_bound': self.overflow,
+        }
+        if kind != 'text':
+            stats['min'], stats['max'] = self.min, self.max
+        return stats
+
+
+class IssueLog:
+    def __init__(self):
+        self.counts = {}
+        self.by_severity = {'error': 0, 'warning': 0, 'info': 0}
+        self.examples = {}
+
+    def add(self, severity, line, row_id, field, code, message):
+        self.counts[code] = self.counts.get(code, 0) + 1
+        self.by_severity[severity] += 1
+        examples = self.examples.setdefault(code, [])
+        if len(examples) < MAX_EXAMPLES:
+            examples.append({'severity': severity, 'line': line, 'id': row_id, 'field': field, 'message': message})
+
+
+# ---------- Per-file worker ----------
+
+def duplicate_count(hashes):
+    if not hashes:
+        return 0
+    values = np.frombuffer(hashes, dtype=np.int64)
+    return int(len(values) - len(np.unique(values)))
+
+
+def validate_file(job):
+    path, out_dir, refs = job
+    filename = os.path.basename(path)
+    dataset = dataset_of(filename)
+    schema = SCHEMAS.get(dataset)
+    rule = ROW_RULES.get(dataset)
+    id_column = ID_COLUMNS.get(dataset)
+
+    t0 = time.perf_counter()
+    log = IssueLog()
+    with open(path, 'rb') as f:
+        has_bom = f.read(3) == BOM.encode('utf-8')
+    if has_bom:
+        log.add('warning', 1, "", "", 'BOM_PRESENT', "File starts with a UTF-8 BOM; strip it or read as utf-8-sig")
+
+    quarantine_path = os.path.join(out_dir, os.path.splitext(filename)[0] + '.quarantine.csv')
+    quarantine = writer = None
+    quarantined = 0
+    rows = 0
+    id_hashes = array('q')
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        missing = unknown = []
+        if schema:
+            known = set(schema['required']) | set(schema['optional'])
+            missing = [c for c in schema['required'] if c not in header]
+            unknown = [c for c in header if c not in known]
+            for column in missing:
+                log.add('error', 1, "", column, 'MISSING_COLUMN', f"Required column '{column}' is missing")
+            for column in unknown:
+                log.add('info', 1, "", column, 'UNKNOWN_COLUMN', f"Column '{column}' is not in schema.ts")
+        if len(set(header)) != len(header):
+            log.add('error', 1, "", "", 'DUPLICATE_COLUMN', "Header repeats a column name")
+
+        stats = [ColumnStats() for _ in header]
+        width = len(header)
+        for line, values in enumerate(reader, start=2):
+            if not values:
+                continue
+            rows += 1
+            values = [v.strip() for v in values]
+            record = dict(zip(header, values))
+            row_id = record.get(id_column, "") if id_column else ""
+            reasons = []
+
+            if len(values) != width:
+                log.add('error', line, row_id, "", 'COLUMN_COUNT',
+                        f"Expected {width} fields, found {len(values)}")
+                reasons.append(f"Expected {width} fields, found {len(values)}")
+            for column_stats, value in zip(stats, values):
+                column_stats.add(value)
+            if id_column and row_id:
+                id_hashes.append(hash(row_id))
+            if rule and not missing:
+                for severity, field, code, message in rule(record, refs):
+                    log.add(severity, line, row_id, field, code, message)
+                    if severity == 'error':
+                        reasons.append(message)
+
+            if reasons:
+                if quarantine is None:
+                    quarantine = open(quarantine_path, 'w', encoding='utf-8', newline='')
+                    writer = csv.writer(quarantine)
+                    writer.writerow(header + ['_line', '_reasons'])
+                writer.writerow(values + [line, "; ".join(reasons)])
+                quarantined += 1
+
+    if quarantine is not None:
+        quarantine.close()
+    elif os.path.exists(quarantine_path):
+        os.remove(quarantine_path)
+
+    # Duplicate ids are found from 8-byte hashes at the end, so ids never need to stay in memory
+    duplicates = duplicate_count(id_hashes)
+    if duplicates:
+        log.add('error', 0, "", id_column, 'DUPLICATE_ID', f"{duplicates:,} rows repeat an existing {id_column}")
+
+    return {
+        'file': filename,
+        'dataset': dataset,
+        'rows': rows,
+        'bom': has_bom,
+        'missing_columns': missing,
+        'unknown_columns': unknown,
+        'errors': log.by_severity['error'],
+        'warnings': log.by_severity['warning'],
+        'quarantined': quarantined,
+        'quarantine_file': os.path.basename(quarantine_path) if quarantined else None,
+        'issues': {code: {'count': log.counts[code], 'examples': log.examples[code]} for code in log.counts},
+        'columns': {name: s.summary(rows) for name, s in zip(header, stats)},
+        'seconds': round(time.perf_counter() - t0, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and profile the dashboard CSVs.")
+    parser.add_argument('--src', default='public/data')
+    parser.add_argument('--refs', help="Directory with staff/services/rooms/equipment.csv (default: --src)")
+    parser.add_argument('--out', default='validation', help="Directory for the report and quarantine files")
+    parser.add_argument('--files', default='', help="Comma-separated file names (default: every *.csv)")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--fail-on', choices=['error', 'warning', 'never'], default='error')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    refs = build_indexes(args.refs or args.src)
+    names = [n.strip() for n in args.files.split(',') if n.strip()] or \
+        sorted(n for n in os.listdir(args.src) if n.endswith('.csv'))
+    jobs = [(os.path.join(args.src, name), args.out, refs) for name in names]
+
+    # Largest files first so the longest job starts immediately
+    jobs.sort(key=lambda job: os.path.getsize(job[0]), reverse=True)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = sorted(pool.map(validate_file, jobs), key=lambda r: r['file'])
+
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': args.src,
+        'references': {k: len(v) for k, v in refs.items()},
+        'files': results,
+        'totals': {
+            'rows': sum(r['rows'] for r in results),
+            'errors': sum(r['errors'] for r in results),
+            'warnings': sum(r['warnings'] for r in results),
+            'quarantined': sum(r['quarantined'] for r in results),
+        },
+    }
+    report_path = os.path.join(args.out, 'validation_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for r in results:
+        flags = " BOM" if r['bom'] else ""
+        print(f"{r['file']:<28} {r['rows']:>10,} rows  {r['errors']:>7,} errors  {r['warnings']:>7,} warnings"
+              f"  {r['quarantined']:>7,} quarantined{flags}")
+        for code, issue in r['issues'].items():
+            print(f"    {code}: {issue['count']:,}  e.g. {issue['examples'][0]['message']}")
+    totals = report['totals']
+    print(f"{totals['rows']:,} rows in {time.perf_counter() - t0:.2f}s; report written to {report_path}")
+
+    if args.fail_on == 'never':
+        return 0
+    if totals['errors'] or (args.fail_on == 'warning' and totals['warnings']):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())